@@ -0,0 +1,165 @@
+"""
+Async client for the screenshot capture service API (localhost:5001).
+
+One connection-pooled httpx.AsyncClient is shared by all requests (closed
+on application shutdown), so calls never block the event loop and reuse
+keep-alive connections.
+
+GET /status is cached for STATUS_CACHE_SECONDS, and concurrent callers
+share one in-flight request, so the frontend's status polling costs at most
+one call to the service per TTL whatever the number of open tabs.
+
+A circuit breaker stops calling a service that is down: after
+FAILURE_THRESHOLD consecutive failures the circuit opens and status is
+reported as "not running" without any network call; after OPEN_SECONDS one
+probe is let through (half-open), and its outcome closes the circuit or
+opens it again with a doubled wait (up to MAX_OPEN_SECONDS).
+
+Configuration (environment variables):
+- CAPTURE_SERVICE_URL: capture service base URL (default: http://localhost:5001)
+"""
+
+import asyncio
+import os
+import time
+from typing import Dict, Optional
+
+import httpx
+
+SERVICE_URL = os.environ.get("CAPTURE_SERVICE_URL", "http://localhost:5001")
+STATUS_TIMEOUT = httpx.Timeout(2.0, connect=0.5)
+STOP_TIMEOUT = httpx.Timeout(5.0, connect=0.5)
+STATUS_CACHE_SECONDS = 1.0
+FAILURE_THRESHOLD = 2
+OPEN_SECONDS = 2.0
+MAX_OPEN_SECONDS = 30.0
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker with exponential back-off."""
+
+    def __init__(self, failure_threshold: int = FAILURE_THRESHOLD, open_seconds: float = OPEN_SECONDS,
+                 max_open_seconds: float = MAX_OPEN_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.open_seconds = open_seconds
+        self.max_open_seconds = max_open_seconds
+        self.failures = 0
+        self.opened_until = 0.0
+        self._current_open_seconds = open_seconds
+
+    @property
+    def state(self) -> str:
+        """"closed" (calls allowed), "open" (calls refused) or "half-open" (one probe allowed)."""
+        if self.failures < self.failure_threshold:
+            return "closed"
+        return "open" if time.monotonic() < self.opened_until else "half-open"
+
+    def allow(self) -> bool:
+        """Whether a call may be made now."""
+        return self.state != "open"
+
+    def record_success(self):
+        self.failures = 0
+        self._current_open_seconds = self.open_seconds
+
+    def record_failure(self):
+        was_half_open = self.state == "half-open"
+        self.failures += 1
+        if self.failures >= self.failure_threshold:
+            if was_half_open:
+                self._current_open_seconds = min(self._current_open_seconds * 2, self.max_open_seconds)
+            self.opened_until = time.monotonic() + self._current_open_seconds
+
+    def reset(self):
+        self.failures = 0
+        self.opened_until = 0.0
+        self._current_open_seconds = self.open_seconds
+
+
+breaker = CircuitBreaker()
+
+_client: Optional[httpx.AsyncClient] = None
+_client_loop = None
+_status_cache = None  # (monotonic time, status dict or None)
+_status_task: Optional[asyncio.Task] = None
+
+
+def get_client() -> httpx.AsyncClient:
+    """Return the shared client (created on first use)."""
+    global _client, _client_loop
+    loop = asyncio.get_running_loop()
+    # Pooled connections belong to the event loop that opened them
+    if _client is None or _client.is_closed or _client_loop is not loop:
+        _client_loop = loop
+        _client = httpx.AsyncClient(
+            base_url=SERVICE_URL,
+            limits=httpx.Limits(max_connections=10, max_keepalive_connections=5),
+            timeout=STATUS_TIMEOUT
+        )
+    return _client
+
+
+async def aclose():
+    """Close the shared client (application shutdown)."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def invalidate_status():
+    """Forget the cached status and close the circuit (e.g. after starting or stopping the service)."""
+    global _status_cache
+    _status_cache = None
+    breaker.reset()
+
+
+async def _fetch_status() -> Optional[Dict]:
+    global _status_cache
+    try:
+        response = await get_client().get("/status", timeout=STATUS_TIMEOUT)
+        status = response.json() if response.status_code == 200 else None
+    except (httpx.HTTPError, ValueError):
+        status = None
+
+    if status is None:
+        breaker.record_failure()
+    else:
+        breaker.record_success()
+    _status_cache = (time.monotonic(), status)
+    return status
+
+
+async def get_status() -> Optional[Dict]:
+    """
+    Return the capture service's /status payload, or None if the service is not running.
+
+    Cached for STATUS_CACHE_SECONDS; concurrent callers share one request;
+    answered without a network call while the circuit is open.
+    """
+    global _status_task
+    cached = _status_cache
+    if cached is not None and time.monotonic() - cached[0] < STATUS_CACHE_SECONDS:
+        return cached[1]
+    if not breaker.allow():
+        return None
+
+    if _status_task is None or _status_task.done() or _status_task.get_loop() is not asyncio.get_running_loop():
+        _status_task = asyncio.ensure_future(_fetch_status())
+    return await asyncio.shield(_status_task)
+
+
+async def is_service_running() -> bool:
+    """Check if the capture service API is running (see get_status)."""
+    return await get_status() is not None
+
+
+async def request_stop() -> bool:
+    """Ask the capture service to stop its watcher. Returns False if the call failed."""
+    try:
+        response = await get_client().post("/stop", timeout=STOP_TIMEOUT)
+        return response.status_code == 200
+    except httpx.HTTPError:
+        return False
+    finally:
+        invalidate_status()
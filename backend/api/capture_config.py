@@ -0,0 +1,72 @@
+"""
+Cached access to the screenshot capture service configuration.
+
+screenshot-capture-service/config.py is executed once and the module and
+its resolved SCREENSHOTS_DIR are kept in memory. Every call stats the file
+and reloads it only when its mtime or size changed, so edits to the config
+are picked up without restarting the API while the per-request cost stays
+one stat() (the file used to be executed for every request, including one
+/get-file request per thumbnail in the Load Step modal).
+"""
+
+import importlib.util
+import threading
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent.parent
+
+CAPTURE_CONFIG_PATH = project_root / "screenshot-capture-service" / "config.py"
+
+_lock = threading.Lock()
+_cached = None  # (path, (mtime_ns, size), config module, resolved SCREENSHOTS_DIR)
+
+
+def _load():
+    """Return the cache entry for the current config file, reloading it if it changed."""
+    global _cached
+    path = Path(CAPTURE_CONFIG_PATH)
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        raise FileNotFoundError("Config file not found")
+    key = (stat.st_mtime_ns, stat.st_size)
+
+    cached = _cached
+    if cached is not None and cached[0] == path and cached[1] == key:
+        return cached
+
+    with _lock:
+        cached = _cached
+        if cached is None or cached[0] != path or cached[1] != key:
+            spec = importlib.util.spec_from_file_location("capture_service_config", path)
+            config = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(config)
+            cached = _cached = (path, key, config, config.SCREENSHOTS_DIR.expanduser().resolve())
+        return cached
+
+
+def load_capture_config():
+    """
+    Return the capture service config module (cached; reloaded when the file changes).
+
+    Raises:
+        FileNotFoundError: config.py does not exist
+    """
+    return _load()[2]
+
+
+def get_capture_dir() -> Path:
+    """
+    Return the resolved capture directory (SCREENSHOTS_DIR, e.g. ~/Desktop/Capture_TC).
+
+    Raises:
+        FileNotFoundError: config.py does not exist
+    """
+    return _load()[3]
+
+
+def clear_cache():
+    """Forget the loaded config (the next call reloads it)."""
+    global _cached
+    with _lock:
+        _cached = None
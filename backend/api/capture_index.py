@@ -0,0 +1,184 @@
+"""
+In-process index of the capture directory (Capture_TC).
+
+The Load Step modal and the screenshot picker poll the capture file list, and
+the folder grows to thousands of files between cleanups, so listing it must
+not stat and sort every file on each call. The index keeps one entry per
+image / description file (name, size, mtime, image <-> description pairing
+by file stem, e.g. TC05_login.png + TC05_login.txt) and the list sorted
+newest first, and revalidates cheaply:
+
+- directory mtime unchanged: no rescan; only files modified in the last
+  SETTLE_SECONDS are re-stat'ed (the capture service writes the description
+  right after moving the image in)
+- directory mtime changed (files added, removed or renamed) or recent: one
+  scandir; known, settled files keep their cached stat, new files are stat'ed
+- every FULL_RESCAN_SECONDS: every file is re-stat'ed, catching in-place
+  edits of older files
+
+Each change bumps the index version, which the list endpoint uses as its
+ETag so unchanged polls are answered with 304.
+
+Configuration (environment variables):
+- CAPTURE_INDEX_FULL_RESCAN_SECONDS: interval between full re-stats (default: 60)
+"""
+
+import os
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, List, Optional
+
+IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".gif", ".bmp"}
+TEXT_EXTENSIONS = {".txt"}
+SETTLE_SECONDS = 5.0
+FULL_RESCAN_SECONDS = float(os.environ.get("CAPTURE_INDEX_FULL_RESCAN_SECONDS", "60"))
+
+
+def file_kind(name: str) -> Optional[str]:
+    """Return "image" or "text" for indexed files, None for anything else."""
+    suffix = os.path.splitext(name)[1].lower()
+    if suffix in IMAGE_EXTENSIONS:
+        return "image"
+    if suffix in TEXT_EXTENSIONS:
+        return "text"
+    return None
+
+
+class CaptureIndex:
+    """Index of one capture directory, revalidated on access (thread-safe)."""
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        self.version = 0
+        self.files: List[Dict] = []
+        self._stats: Dict[str, tuple] = {}  # name -> (size, mtime)
+        self._dir_mtime_ns = None
+        self._last_full_scan = 0.0
+        self._instance = uuid.uuid4().hex[:8]
+        self._lock = threading.Lock()
+
+    @property
+    def etag(self) -> str:
+        """Validator for the current contents (changes on every change and on restart)."""
+        return f'"{self._instance}-{self.version}"'
+
+    def refresh(self) -> "CaptureIndex":
+        """Bring the index up to date with the directory (see module docstring)."""
+        with self._lock:
+            now = time.time()
+            try:
+                dir_mtime_ns = self.directory.stat().st_mtime_ns
+            except FileNotFoundError:
+                dir_mtime_ns = None
+
+            full = now - self._last_full_scan >= FULL_RESCAN_SECONDS
+            # A directory changed within the mtime resolution of our last scan looks unchanged
+            dir_recent = dir_mtime_ns is not None and now - dir_mtime_ns / 1e9 <= SETTLE_SECONDS
+            if dir_mtime_ns is None:
+                stats = {}
+            elif full or dir_recent or dir_mtime_ns != self._dir_mtime_ns:
+                stats = self._scan(now, restat_all=full)
+            else:
+                stats = self._restat_recent(now)
+
+            if full:
+                self._last_full_scan = now
+            self._dir_mtime_ns = dir_mtime_ns
+            if stats != self._stats:
+                self._stats = stats
+                self.files = self._build_entries(stats)
+                self.version += 1
+            return self
+
+    def _scan(self, now: float, restat_all: bool) -> Dict[str, tuple]:
+        stats = {}
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if file_kind(entry.name) is None:
+                    continue
+                known = self._stats.get(entry.name)
+                if known is not None and not restat_all and now - known[1] > SETTLE_SECONDS:
+                    stats[entry.name] = known
+                    continue
+                try:
+                    if not entry.is_file():
+                        continue
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                stats[entry.name] = (stat.st_size, stat.st_mtime)
+        return stats
+
+    def _restat_recent(self, now: float) -> Dict[str, tuple]:
+        stats = dict(self._stats)
+        for name, (_, mtime) in self._stats.items():
+            if now - mtime > SETTLE_SECONDS:
+                continue
+            try:
+                stat = (self.directory / name).stat()
+            except FileNotFoundError:
+                del stats[name]
+                continue
+            stats[name] = (stat.st_size, stat.st_mtime)
+        return stats
+
+    def _build_entries(self, stats: Dict[str, tuple]) -> List[Dict]:
+        by_stem = {}
+        for name in stats:
+            stem, _ = os.path.splitext(name)
+            by_stem.setdefault(stem, {})[file_kind(name)] = name
+
+        files = []
+        for name, (size, mtime) in stats.items():
+            kind = file_kind(name)
+            partners = by_stem[os.path.splitext(name)[0]]
+            files.append({
+                "name": name,
+                "path": str(self.directory / name),
+                "size": size,
+                "modified": mtime,
+                "kind": kind,
+                "pair": partners.get("text" if kind == "image" else "image"),
+            })
+        # Newest first (the order the endpoint has always returned)
+        files.sort(key=lambda f: (-f["modified"], f["name"]))
+        return files
+
+    def query(self, prefix: Optional[str] = None, kind: Optional[str] = None,
+              offset: int = 0, limit: Optional[int] = None) -> Dict:
+        """
+        Return one page of the (already refreshed) index.
+
+        Args:
+            prefix: Only files whose name starts with this (case-insensitive), e.g. "TC05"
+            kind: Only "image" or "text" files
+            offset: Entries to skip
+            limit: Page size (all remaining entries if None)
+
+        Returns:
+            dict: {"files", "total"} where total counts all matching entries
+        """
+        files = self.files
+        if prefix:
+            prefix = prefix.lower()
+            files = [f for f in files if f["name"].lower().startswith(prefix)]
+        if kind:
+            files = [f for f in files if f["kind"] == kind]
+        end = None if limit is None else offset + limit
+        return {"files": files[offset:end], "total": len(files)}
+
+
+_indexes: Dict[Path, CaptureIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_capture_index(directory: Path) -> CaptureIndex:
+    """Return the refreshed index for directory (one index per directory, kept for the process)."""
+    directory = Path(directory)
+    with _indexes_lock:
+        index = _indexes.get(directory)
+        if index is None:
+            index = _indexes[directory] = CaptureIndex(directory)
+    return index.refresh()
@@ -0,0 +1,47 @@
+"""
+Liveness of the screenshot capture service processes, from their PID files.
+
+The capture service and its watcher register themselves in
+screenshot-capture-service/process_registry.py (RUN_DIR/<name>.pid, with a
+heartbeat). Checking whether the service process exists reads that one file
+and verifies the PID's create time, instead of scanning every process on
+the machine on each status poll.
+"""
+
+import importlib.util
+from pathlib import Path
+
+from api.capture_config import load_capture_config
+
+project_root = Path(__file__).parent.parent.parent
+
+REGISTRY_MODULE_PATH = project_root / "screenshot-capture-service" / "process_registry.py"
+DEFAULT_RUN_DIR = Path.home() / "Documents" / "TestCaseScreenshots" / "run"
+
+_spec = importlib.util.spec_from_file_location("capture_process_registry", REGISTRY_MODULE_PATH)
+process_registry = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(process_registry)
+
+_registries = {}
+
+
+def get_registry():
+    """ProcessRegistry for the RUN_DIR of the capture service config."""
+    try:
+        run_dir = Path(getattr(load_capture_config(), "RUN_DIR", DEFAULT_RUN_DIR)).expanduser()
+    except FileNotFoundError:
+        run_dir = DEFAULT_RUN_DIR
+    registry = _registries.get(run_dir)
+    if registry is None:
+        registry = _registries[run_dir] = process_registry.ProcessRegistry(run_dir)
+    return registry
+
+
+def get_service_process():
+    """Registry entry of the running service process (pid, heartbeat_age, responsive), or None."""
+    return get_registry().lookup(process_registry.SERVICE)
+
+
+def is_service_process_running() -> bool:
+    """Check if the service process is running (O(1): PID file + create time)."""
+    return get_service_process() is not None
@@ -0,0 +1,42 @@
+"""
+Request-scoped database connection.
+
+get_db is a FastAPI dependency that opens one connection per request and
+runs the request in one transaction: committed when the endpoint returns,
+rolled back if it raises (HTTPException included). Endpoints pass it to the
+shared.models functions (conn=db), which then run in savepoints on it
+instead of opening, committing and closing a connection each, so a
+create/update endpoint costs one connection and one commit, and its
+read-after-write checks see its own writes.
+
+Declare it with Depends(get_db, scope="function"): the transaction then
+ends before the response is sent, so a 2xx means the write is committed
+(and a failed commit is reported as an error). With the default "request"
+scope FastAPI would commit only after the response has gone out.
+"""
+
+import sqlite3
+import sys
+from pathlib import Path
+from typing import Iterator
+
+# Add project root to path to import shared modules
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from shared import models
+
+
+def get_db() -> Iterator[sqlite3.Connection]:
+    """Yield the request's connection, inside a transaction (FastAPI dependency)."""
+    # FastAPI runs this dependency and the endpoint in different threads
+    conn = models.get_db_connection(check_same_thread=False)
+    try:
+        conn.execute("BEGIN")
+        yield conn
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
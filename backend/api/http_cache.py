@@ -0,0 +1,83 @@
+"""
+HTTP caching for files served by the API.
+
+Screenshot files never change once uploaded (a new upload gets a new
+screenshot ID), so they are served with a strong validator and a long-lived
+Cache-Control, and conditional requests are answered with 304 without
+touching the file. Range and If-Range requests are handled by Starlette's
+FileResponse using the same validators.
+
+The ETag is derived from inode, modification time and size rather than the
+content hash: it only needs a stat, and any rewrite of the file changes it.
+"""
+
+import os
+from email.utils import formatdate, parsedate_to_datetime
+
+from fastapi import Request, Response
+from fastapi.responses import FileResponse
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+def file_etag(stat_result: os.stat_result) -> str:
+    """Strong ETag for a file from its inode, modification time (ns) and size."""
+    return f'"{stat_result.st_ino:x}-{stat_result.st_mtime_ns:x}-{stat_result.st_size:x}"'
+
+
+def etag_matches(header: str, etag: str) -> bool:
+    """If-None-Match comparison (weak, as RFC 9110 requires for this header)."""
+    if header.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == opaque for candidate in header.split(","))
+
+
+def is_not_modified(request: Request, etag: str, mtime: float) -> bool:
+    """
+    Decide whether a GET/HEAD can be answered with 304 Not Modified.
+
+    If-None-Match takes precedence; If-Modified-Since is only consulted
+    when the client sent no entity tags.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return etag_matches(if_none_match, etag)
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            since = parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+        # HTTP dates have one-second resolution
+        return int(mtime) <= since
+    return False
+
+
+def cached_file_response(request: Request, path, media_type=None,
+                         cache_control: str = IMMUTABLE_CACHE_CONTROL, headers=None) -> Response:
+    """
+    Serve a file with ETag, Last-Modified and Cache-Control, honouring conditional requests.
+
+    Args:
+        request: The incoming request (for If-None-Match / If-Modified-Since)
+        path: File to serve
+        media_type: Content type (guessed from the file name if None)
+        cache_control: Cache-Control header value
+        headers: Extra response headers (e.g. Vary)
+
+    Returns:
+        304 response without a body, or a FileResponse (which also handles Range / If-Range)
+    """
+    stat_result = os.stat(path)
+    validators = {
+        "ETag": file_etag(stat_result),
+        "Last-Modified": formatdate(stat_result.st_mtime, usegmt=True),
+        "Cache-Control": cache_control,
+        **(headers or {}),
+    }
+
+    if is_not_modified(request, validators["ETag"], stat_result.st_mtime):
+        return Response(status_code=304, headers=validators)
+    return FileResponse(path, media_type=media_type, headers=validators, stat_result=stat_result)
@@ -0,0 +1,154 @@
+"""
+Ingestion of capture files (Capture_TC) into the uploads directory.
+
+Files are brought in without copying data where the filesystem allows it,
+in this order of preference:
+1. reflink: a copy-on-write clone (clonefile on APFS, FICLONE on Btrfs /
+   XFS): instant, and independent of the source if it is edited later
+2. hard link (same filesystem): instant, but shares the source's data, so an
+   in-place edit of the Capture_TC file would show in the stored screenshot
+   (set INGEST_HARD_LINKS=0 to skip)
+3. copy (shutil.copyfile, which uses the kernel's copy path where available)
+   to a temporary file that is renamed into place
+
+Several files are ingested concurrently in worker threads.
+
+Configuration (environment variables):
+- INGEST_WORKERS: files ingested at the same time (default: 4)
+- INGEST_HARD_LINKS: "0" disables hard links (default: enabled)
+"""
+
+import asyncio
+import ctypes
+import errno
+import os
+import shutil
+import sys
+import uuid
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+from api.uploads import claim_name
+
+INGEST_WORKERS = int(os.environ.get("INGEST_WORKERS", "4"))
+HARD_LINKS = os.environ.get("INGEST_HARD_LINKS", "1") != "0"
+
+FICLONE = 0x40049409  # Linux ioctl: share the source's extents (reflink)
+# Errors meaning "not possible here", as opposed to real I/O failures
+UNSUPPORTED_ERRNOS = {errno.EXDEV, errno.EPERM, errno.EACCES, errno.EINVAL, errno.ENOTTY,
+                      errno.EOPNOTSUPP, errno.ENOTSUP, errno.EMLINK, errno.ENOSYS}
+
+_clonefile = None
+if sys.platform == "darwin":
+    try:
+        _clonefile = ctypes.CDLL(None, use_errno=True).clonefile
+    except (OSError, AttributeError):  # macOS < 10.12
+        _clonefile = None
+
+
+def reflink(source: Path, dest: Path) -> bool:
+    """
+    Create dest as a copy-on-write clone of source.
+
+    Returns False if the platform or filesystem does not support it (dest is
+    then left absent). dest must not exist.
+    """
+    if _clonefile is not None:
+        if _clonefile(os.fsencode(source), os.fsencode(dest), 0) == 0:
+            return True
+        error = ctypes.get_errno()
+        if error in UNSUPPORTED_ERRNOS:
+            return False
+        raise OSError(error, os.strerror(error), str(dest))
+
+    if not sys.platform.startswith("linux"):
+        return False
+    import fcntl
+    with open(source, "rb") as src, open(dest, "xb") as dst:
+        try:
+            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+            return True
+        except OSError as e:
+            if e.errno not in UNSUPPORTED_ERRNOS:
+                raise
+    os.remove(dest)
+    return False
+
+
+def _hard_link(source: Path, target_dir: Path, stem: str, extension: str) -> Optional[Path]:
+    """Hard-link source as <stem><extension> (numbered if taken); None if links are not possible."""
+    final_path = target_dir / f"{stem}{extension}"
+    counter = 1
+    while True:
+        try:
+            os.link(source, final_path)
+            return final_path
+        except FileExistsError:
+            final_path = target_dir / f"{stem}_{counter}{extension}"
+            counter += 1
+        except OSError as e:
+            if e.errno in UNSUPPORTED_ERRNOS:
+                return None
+            raise
+
+
+def ingest_file(source: Path, target_dir: Path, stem: str, extension: Optional[str] = None) -> Dict:
+    """
+    Bring source into target_dir as <stem><extension> (or <stem>_<n><extension> if taken).
+
+    Blocking: call it from a worker thread (see ingest_files).
+
+    Args:
+        source: File to ingest
+        target_dir: Destination directory (created if needed)
+        stem: File name without extension
+        extension: Extension (default: the source's, or .png)
+
+    Returns:
+        dict: {"file_path", "method"} with method "reflink", "link" or "copy"
+    """
+    source = Path(source)
+    target_dir = Path(target_dir)
+    target_dir.mkdir(parents=True, exist_ok=True)
+    extension = extension or source.suffix or ".png"
+
+    temp_path = str(target_dir / f".ingest_{uuid.uuid4().hex}.part")
+    try:
+        if reflink(source, Path(temp_path)):
+            method = "reflink"
+        else:
+            if HARD_LINKS:
+                linked = _hard_link(source, target_dir, stem, extension)
+                if linked is not None:
+                    return {"file_path": str(linked), "method": "link"}
+            shutil.copyfile(source, temp_path)
+            method = "copy"
+        shutil.copystat(source, temp_path)
+        final_path = claim_name(temp_path, target_dir, stem, extension)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    return {"file_path": str(final_path), "method": method}
+
+
+async def ingest_files(items: List[Tuple[Path, Path, str]], workers: Optional[int] = None) -> List:
+    """
+    Ingest several files concurrently (at most workers at a time).
+
+    Args:
+        items: (source, target_dir, stem) per file
+        workers: Concurrency limit (default INGEST_WORKERS)
+
+    Returns:
+        Per item, in order: the ingest_file result dict, or the exception it raised
+    """
+    semaphore = asyncio.Semaphore(workers or INGEST_WORKERS)
+
+    async def ingest(source, target_dir, stem):
+        async with semaphore:
+            return await run_in_threadpool(ingest_file, source, target_dir, stem)
+
+    return await asyncio.gather(*(ingest(*item) for item in items), return_exceptions=True)
@@ -0,0 +1,55 @@
+"""
+Logging for the Test Case Documentation API.
+
+Same structured line format as the screenshot capture service:
+[timestamp] [level] [component] message | Data: {json}
+"""
+
+import json
+import logging
+from datetime import datetime
+
+
+class StructuredFormatter(logging.Formatter):
+    """Custom formatter for structured logging"""
+
+    def format(self, record):
+        timestamp = datetime.fromtimestamp(record.created).strftime('%Y-%m-%d %H:%M:%S')
+        component = getattr(record, 'component', 'GENERAL')
+        log_line = f"[{timestamp}] [{record.levelname}] [{component}] {record.getMessage()}"
+
+        # Append extra data as JSON if present
+        data = getattr(record, 'data', None)
+        if data:
+            log_line += f" | Data: {json.dumps(data)}"
+        return log_line
+
+
+def _setup_logger(name="test-case-api"):
+    """Create the API logger with a console handler (once)."""
+    logger = logging.getLogger(name)
+    if not logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(StructuredFormatter())
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+    return logger
+
+
+class ComponentAdapter(logging.LoggerAdapter):
+    """Add the component name to every record."""
+
+    def process(self, msg, kwargs):
+        kwargs.setdefault('extra', {})['component'] = self.extra['component']
+        return msg, kwargs
+
+
+def get_logger(component="GENERAL"):
+    """
+    Get the API logger for a component (EXPORT, CAPTURE, ...).
+
+    Usage:
+        logger.info("Export finished", extra={'data': {...}})
+    """
+    return ComponentAdapter(_setup_logger(), {'component': component})
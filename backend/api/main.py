@@ -2,15 +2,29 @@
 FastAPI main application for Test Case Documentation Tool API.
 """
 
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from api.routes import test_cases, steps, screenshots, export, capture_service, projects
+from api.routes import test_cases, steps, screenshots, export, capture_service, projects, imports
+from api.compression import CompressionMiddleware
+from api.responses import FastJSONResponse
+from api import metrics, capture_client
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Release shared clients on shutdown."""
+    yield
+    await capture_client.aclose()
+
 
 # Create FastAPI app
 app = FastAPI(
     title="Test Case Documentation API",
     description="REST API for managing SimCorp Dimension test case documentation",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse
 )
 
 # Configure CORS (for React frontend)
@@ -22,13 +36,21 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress JSON / CSV / HTML responses (Brotli or gzip, negotiated per request)
+app.add_middleware(CompressionMiddleware)
+
+# Request latency / status metrics, served at /metrics (outermost, so it times everything)
+app.add_middleware(metrics.RequestMetricsMiddleware)
+
 # Include routers
 app.include_router(projects.router)
 app.include_router(test_cases.router)
 app.include_router(steps.router)
 app.include_router(screenshots.router)
 app.include_router(export.router)
+app.include_router(imports.router)
 app.include_router(capture_service.router)
+app.include_router(metrics.router)
 
 
 @app.get("/")
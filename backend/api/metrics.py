@@ -0,0 +1,77 @@
+"""
+Request metrics for the API and the /metrics endpoint.
+
+RequestMetricsMiddleware records, per route template (e.g.
+/api/test-cases/{test_case_id}/steps, so ids do not explode the label set):
+- http_requests_total{method,route,status}
+- http_request_duration_seconds{method,route} (histogram; includes streaming the body)
+- http_requests_in_flight{method} (the route is only known once the request is routed)
+
+Requests that match no route are labelled route="unmatched". Together with
+the database metrics recorded by shared.models, everything in
+shared.metrics.REGISTRY is served at GET /metrics in the Prometheus text
+format.
+"""
+
+import sys
+import time
+from pathlib import Path
+
+from fastapi import APIRouter
+from fastapi.responses import Response
+
+# Add project root to path
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from shared import metrics
+
+UNMATCHED_ROUTE = "unmatched"
+
+HTTP_REQUESTS = metrics.REGISTRY.counter(
+    "http_requests_total", "HTTP requests handled, by route and status", ("method", "route", "status"))
+HTTP_REQUEST_SECONDS = metrics.REGISTRY.histogram(
+    "http_request_duration_seconds", "HTTP request latency in seconds, by route", ("method", "route"))
+HTTP_IN_FLIGHT = metrics.REGISTRY.gauge(
+    "http_requests_in_flight", "HTTP requests currently being handled", ("method",))
+
+router = APIRouter(tags=["metrics"])
+
+
+class RequestMetricsMiddleware:
+    """ASGI middleware timing every HTTP request and counting responses by status."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc(method)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            HTTP_IN_FLIGHT.dec(method)
+            route = scope.get("route")
+            route_path = getattr(route, "path", None) or UNMATCHED_ROUTE
+            HTTP_REQUESTS.inc(method, route_path, status)
+            HTTP_REQUEST_SECONDS.observe(method, route_path, value=elapsed)
+
+
+@router.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    """Serve all metrics in the Prometheus text exposition format."""
+    return Response(metrics.REGISTRY.render(), media_type=metrics.CONTENT_TYPE)
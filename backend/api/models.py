@@ -104,7 +104,40 @@ class ExportRequest(BaseModel):
     """Model for export request."""
     test_case_ids: Optional[List[int]] = None
     project_ids: Optional[List[int]] = None
-
+    format: Optional[str] = "xlsx"  # xlsx, jsonl, csv or html
+    split_by_project: Optional[bool] = False  # xlsx only: one workbook per project, zipped
+    since: Optional[datetime] = None  # Delta export: only test cases changed at or after this time
+    image_mode: Optional[str] = "full"  # xlsx only: full, thumbnail, linked or none
+    image_base_url: Optional[str] = None  # Link target for thumbnail/linked; else images/ side folder
+
+
+class ExportEstimateResponse(BaseModel):
+    """Model for an Excel export size estimate."""
+    test_cases: int
+    steps: int
+    screenshots: int
+    images: int
+    image_bytes: int
+    missing_images: int
+    estimated_output_bytes: int
+    estimated_peak_memory_bytes: int
+    max_workbook_bytes: int
+    memory_budget_bytes: int
+    workbooks: int  # Number of workbooks the export will produce
+    split: bool  # True when the export is split because it exceeds a limit
+
+
+
+# Import Models
+class WorkbookImportResult(BaseModel):
+    """Model for the result of importing one Excel workbook."""
+    filename: str
+    test_cases: int  # Test cases created
+    steps: int
+    screenshots: int
+    images_stored: int  # Distinct images copied out of the workbook
+    skipped: List[str] = []  # Test numbers that already existed in their project
+    error: Optional[str] = None
 
 # Load Step Models
 class LoadStepRequest(BaseModel):
@@ -114,6 +147,13 @@ class LoadStepRequest(BaseModel):
     description_file_path: Optional[str] = None
 
 
+class LoadPendingRequest(BaseModel):
+    """Model for loading every pending capture of Capture_TC/ as steps."""
+    project_id: Optional[int] = None
+    archive: bool = False
+    dry_run: bool = False
+
+
 # Project Models
 class ProjectBase(BaseModel):
     """Base model for project."""
@@ -0,0 +1,193 @@
+"""
+Grouping of pending capture files (Capture_TC) into test steps.
+
+The watcher saves each capture as {test_case}_{screenshot_name}.png with the
+description typed in its dialog in {test_case}_{screenshot_name}.txt. After
+a capture session the folder holds many such pairs for several test cases;
+plan_steps turns them into steps:
+
+- each image is matched to the test case whose number is the longest prefix
+  of its name ("TC05" for TC05_login.png, "TC05_A" for TC05_A_login.png);
+  names matching no test case, or a number shared by several test cases
+  (same number in different projects), are left in place and reported
+- per test case, images are taken in capture order (file mtime); an image
+  starts a new step when its description differs from the current step's,
+  or when it was captured more than STEP_GAP_SECONDS after the previous one.
+  Images without a description are added to the current step
+- a step with no description at all is described by its first screenshot
+  name ("login page" for TC05_login_page.png)
+- images already loaded into their test case (see is_loaded) are skipped and
+  reported, so loading again without archiving does not duplicate steps
+
+Consumed files can be archived to ARCHIVE_DIR_NAME/<timestamp>/ inside the
+capture directory (the capture index only lists the top level), so that
+they are not loaded again.
+
+Configuration (environment variables):
+- CAPTURE_STEP_GAP_SECONDS: pause that separates two steps (default: 120)
+"""
+
+import os
+import shutil
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from api.logger import get_logger
+from api.thumbnails import content_hash
+
+logger = get_logger("CAPTURE")
+
+STEP_GAP_SECONDS = float(os.environ.get("CAPTURE_STEP_GAP_SECONDS", "120"))
+ARCHIVE_DIR_NAME = "archive"
+
+
+def match_test_number(stem: str, test_numbers: List[str]) -> Optional[str]:
+    """Return the longest test number that prefixes stem (case-insensitive), or None."""
+    lowered = stem.lower()
+    best = None
+    for test_number in test_numbers:
+        candidate = test_number.lower()
+        if lowered == candidate or lowered.startswith(candidate + "_"):
+            if best is None or len(test_number) > len(best):
+                best = test_number
+    return best
+
+
+def read_description(path: Optional[Path]) -> str:
+    """Content of a description file ("" if missing or unreadable)."""
+    if path is None:
+        return ""
+    try:
+        return path.read_text(encoding="utf-8").strip()
+    except (OSError, UnicodeDecodeError) as e:
+        logger.warning("Failed to read description file", extra={'data': {"path": str(path), "error": str(e)}})
+        return ""
+
+
+def make_loaded_check(get_screenshot_files: Callable[[int], List[str]]) -> Callable[[Dict, Dict], bool]:
+    """
+    Build an is_loaded check for plan_steps that compares content hashes.
+
+    Args:
+        get_screenshot_files: Returns the screenshot file paths of a test case
+            (read once per test case)
+    """
+    known = {}
+
+    def file_hash(path: str) -> Optional[str]:
+        try:
+            return content_hash(path)
+        except OSError:
+            return None
+
+    def is_loaded(test_case: Dict, image: Dict) -> bool:
+        hashes = known.get(test_case["id"])
+        if hashes is None:
+            hashes = {file_hash(path) for path in get_screenshot_files(test_case["id"])} - {None}
+            known[test_case["id"]] = hashes
+        return file_hash(image["path"]) in hashes
+
+    return is_loaded
+
+
+def plan_steps(files: List[Dict], test_cases: List[Dict], gap_seconds: Optional[float] = None,
+               is_loaded: Optional[Callable[[Dict, Dict], bool]] = None) -> Dict:
+    """
+    Group capture index entries into steps.
+
+    Args:
+        files: Capture index entries (see api.capture_index)
+        test_cases: Candidate test cases ({id, test_number, ...})
+        gap_seconds: Pause that separates two steps (default STEP_GAP_SECONDS)
+        is_loaded: Optional check (test case, image entry) -> True when the
+            image is already among the test case's screenshots
+
+    Returns:
+        dict: {"steps", "unmatched", "ambiguous", "loaded"} where each step has
+        test_case_id, test_number, description and files (image entries, with
+        "description_path" for their description file), in test case then
+        capture order; unmatched / ambiguous / loaded are image file names
+    """
+    gap_seconds = STEP_GAP_SECONDS if gap_seconds is None else gap_seconds
+
+    by_number = {}
+    for test_case in test_cases:
+        by_number.setdefault(test_case["test_number"].lower(), []).append(test_case)
+    test_numbers = [matches[0]["test_number"] for matches in by_number.values()]
+
+    images = sorted((f for f in files if f["kind"] == "image"), key=lambda f: (f["modified"], f["name"]))
+    grouped = {}
+    unmatched = []
+    ambiguous = []
+    loaded = []
+    for image in images:
+        stem = os.path.splitext(image["name"])[0]
+        test_number = match_test_number(stem, test_numbers)
+        if test_number is None:
+            unmatched.append(image["name"])
+            continue
+        matches = by_number[test_number.lower()]
+        if len(matches) > 1:
+            ambiguous.append(image["name"])
+            continue
+        if is_loaded is not None and is_loaded(matches[0], image):
+            loaded.append(image["name"])
+            continue
+        grouped.setdefault(matches[0]["id"], []).append((matches[0], stem[len(test_number) + 1:], image))
+
+    steps = []
+    for entries in grouped.values():
+        current = None
+        last_modified = None
+        for test_case, screenshot_name, image in entries:
+            directory = Path(image["path"]).parent
+            description_path = directory / image["pair"] if image.get("pair") else None
+            description = read_description(description_path)
+
+            new_step = (
+                current is None
+                or image["modified"] - last_modified > gap_seconds
+                or (description and current["description"] and description != current["description"])
+            )
+            if new_step:
+                current = {
+                    "test_case_id": test_case["id"],
+                    "test_number": test_case["test_number"],
+                    "description": description,
+                    "fallback_description": screenshot_name.replace("_", " ").strip() or test_case["test_number"],
+                    "files": [],
+                }
+                steps.append(current)
+            elif description and not current["description"]:
+                current["description"] = description
+            current["files"].append({**image, "description_path": str(description_path) if description_path else None})
+            last_modified = image["modified"]
+
+    for step in steps:
+        fallback = step.pop("fallback_description")
+        step["description"] = step["description"] or fallback
+    return {"steps": steps, "unmatched": unmatched, "ambiguous": ambiguous, "loaded": loaded}
+
+
+def archive_files(paths: List[Path], archive_dir: Path) -> int:
+    """
+    Move files into archive_dir (numbered if the name is taken). Blocking.
+
+    Returns:
+        Number of files moved (failures are logged and skipped)
+    """
+    archive_dir.mkdir(parents=True, exist_ok=True)
+    moved = 0
+    for path in paths:
+        path = Path(path)
+        target = archive_dir / path.name
+        counter = 1
+        while target.exists():
+            target = archive_dir / f"{path.stem}_{counter}{path.suffix}"
+            counter += 1
+        try:
+            shutil.move(str(path), str(target))
+            moved += 1
+        except OSError as e:
+            logger.warning("Failed to archive capture file", extra={'data': {"path": str(path), "error": str(e)}})
+    return moved
@@ -0,0 +1,23 @@
+"""
+Default JSON response class for the API.
+
+Renders with orjson when it is installed (several times faster than the
+standard library encoder on the long description / calculation text our
+list endpoints return) and falls back to Starlette's JSONResponse otherwise.
+"""
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; the standard encoder is used instead
+    orjson = None
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson when available."""
+
+    def render(self, content) -> bytes:
+        if orjson is None:
+            return super().render(content)
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
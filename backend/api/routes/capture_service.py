@@ -2,52 +2,34 @@
 Routes for capture service management (start/stop/status).
 """
 
-from fastapi import APIRouter, HTTPException, Body, UploadFile, File
+from fastapi import APIRouter, HTTPException, UploadFile, File, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
 import sys
 import subprocess
-import psutil
-import requests
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from pydantic import BaseModel
-import shutil
-from datetime import datetime
 
 # Add project root to path to import shared modules
 project_root = Path(__file__).parent.parent.parent.parent
 sys.path.insert(0, str(project_root))
 
+from api import capture_client
+from api.capture_processes import is_service_process_running
+from api.uploads import store_upload, timestamped_stem, UploadTooLarge, UnsupportedUpload
+from api.capture_config import load_capture_config, get_capture_dir
+from api.capture_index import get_capture_index
+from api.http_cache import etag_matches
+from api.responses import FastJSONResponse
+
 router = APIRouter(prefix="/api/capture-service", tags=["capture-service"])
 
 # Configuration
-SERVICE_URL = "http://localhost:5001"
 SERVICE_SCRIPT = project_root / "screenshot-capture-service" / "screenshot-service.py"
 START_SCRIPT = project_root / "screenshot-capture-service" / "start-service.py"
 STOP_SCRIPT = project_root / "screenshot-capture-service" / "stop-service.py"
-
-
-def is_service_running() -> bool:
-    """Check if the capture service API is running."""
-    try:
-        response = requests.get(f"{SERVICE_URL}/status", timeout=2)
-        return response.status_code == 200
-    except requests.exceptions.RequestException:
-        return False
-
-
-def is_service_process_running() -> bool:
-    """Check if the service process is running."""
-    try:
-        for proc in psutil.process_iter(['pid', 'name', 'cmdline']):
-            try:
-                cmdline = proc.info.get('cmdline', [])
-                if cmdline and 'screenshot-service.py' in ' '.join(cmdline):
-                    return True
-            except (psutil.NoSuchProcess, psutil.AccessDenied):
-                continue
-    except Exception:
-        pass
-    return False
+TEXT_UPLOAD_EXTENSIONS = {".txt"}  # Step descriptions uploaded next to the screenshots
+MAX_CAPTURE_FILES_PAGE = 1000
 
 
 @router.get("/status")
@@ -60,18 +42,11 @@ async def get_service_status() -> Dict[str, Any]:
         - watcher_running: bool - Whether the watcher is running
         - service_process_running: bool - Whether the service process exists
     """
-    service_running = is_service_running()
+    # One (cached) call to the service's /status; the process check reads its PID file
+    service_status = await capture_client.get_status()
     service_process_running = is_service_process_running()
-    
-    watcher_running = False
-    if service_running:
-        try:
-            response = requests.get(f"{SERVICE_URL}/status", timeout=2)
-            if response.status_code == 200:
-                data = response.json()
-                watcher_running = data.get('watcher_running', False)
-        except requests.exceptions.RequestException:
-            pass
+    service_running = service_status is not None
+    watcher_running = bool(service_status.get('watcher_running', False)) if service_running else False
     
     return {
         "service_running": service_running,
@@ -90,20 +65,8 @@ async def get_capture_directory() -> Dict[str, Any]:
         - capture_directory: str - Path to the capture directory
     """
     try:
-        # Import config from screenshot-capture-service
-        config_path = project_root / "screenshot-capture-service" / "config.py"
-        if not config_path.exists():
-            raise HTTPException(
-                status_code=500,
-                detail="Config file not found"
-            )
-        
-        # Read config to get SCREENSHOTS_DIR
-        import importlib.util
-        spec = importlib.util.spec_from_file_location("config", config_path)
-        config = importlib.util.module_from_spec(spec)
-        spec.loader.exec_module(config)
-        
+        # Capture service config (cached, reloaded when config.py changes)
+        config = load_capture_config()
         capture_dir = config.SCREENSHOTS_DIR.expanduser()
         
         return {
@@ -200,16 +163,13 @@ async def get_file(path: str, _t: str = None):
             )
         
         # Security check: ensure file is in capture directory
-        config_path = project_root / "screenshot-capture-service" / "config.py"
-        if config_path.exists():
-            import importlib.util
-            spec = importlib.util.spec_from_file_location("config", config_path)
-            config = importlib.util.module_from_spec(spec)
-            spec.loader.exec_module(config)
-            capture_dir = config.SCREENSHOTS_DIR.expanduser().resolve()
-            
+        try:
+            capture_dir = get_capture_dir()
+        except FileNotFoundError:
+            capture_dir = None
+        if capture_dir is not None:
             try:
-                file_path.resolve().relative_to(capture_dir.resolve())
+                file_path.relative_to(capture_dir)
             except ValueError:
                 raise HTTPException(
                     status_code=403,
@@ -253,42 +213,50 @@ async def upload_file(file: UploadFile = File(...)) -> Dict[str, Any]:
     
     Returns:
         - file_path: str - Path to the uploaded file in Capture_TC/
+        - filename: str - Its name, <original name>_<timestamp><extension>
+        - sha256: str - Content hash
+        - size: int - Size in bytes
     """
     try:
         # Get capture directory from config
-        config_path = project_root / "screenshot-capture-service" / "config.py"
-        if not config_path.exists():
-            raise HTTPException(
-                status_code=500,
-                detail="Config file not found"
-            )
-        
-        import importlib.util
-        spec = importlib.util.spec_from_file_location("config", config_path)
-        config = importlib.util.module_from_spec(spec)
-        spec.loader.exec_module(config)
-        capture_dir = config.SCREENSHOTS_DIR.expanduser().resolve()
+        try:
+            capture_dir = get_capture_dir()
+        except FileNotFoundError as e:
+            raise HTTPException(status_code=500, detail=str(e))
         
         # Ensure directory exists
         capture_dir.mkdir(parents=True, exist_ok=True)
         
-        # Generate filename (preserve original name but add timestamp if needed)
-        original_filename = file.filename or "uploaded_file"
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        # Generate filename (preserve original name but add timestamp); an image
+        # and its .txt description uploaded together keep the same stem
+        original_filename = Path(file.filename or "uploaded_file").name
         file_extension = Path(original_filename).suffix
         base_name = Path(original_filename).stem
-        new_filename = f"{base_name}_{timestamp}{file_extension}"
-        file_path = capture_dir / new_filename
         
-        # Save the file
-        with open(file_path, "wb") as f:
-            content = await file.read()
-            f.write(content)
+        # Stream to disk in chunks; images must match their signature,
+        # description files (.txt) are only size-checked
+        try:
+            stored = await run_in_threadpool(
+                store_upload,
+                file.file,
+                capture_dir,
+                timestamped_stem(base_name),
+                validate_image=file_extension.lower() not in TEXT_UPLOAD_EXTENSIONS,
+                extension=file_extension
+            )
+        except UploadTooLarge as e:
+            raise HTTPException(status_code=413, detail=str(e))
+        except UnsupportedUpload as e:
+            raise HTTPException(status_code=415, detail=str(e))
         
         return {
-            "file_path": str(file_path),
-            "filename": new_filename
+            "file_path": stored["file_path"],
+            "filename": Path(stored["file_path"]).name,
+            "sha256": stored["sha256"],
+            "size": stored["size"]
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -297,60 +265,47 @@ async def upload_file(file: UploadFile = File(...)) -> Dict[str, Any]:
 
 
 @router.get("/capture-files")
-async def list_capture_files() -> Dict[str, Any]:
+async def list_capture_files(
+    request: Request,
+    prefix: Optional[str] = None,
+    kind: Optional[str] = Query(None, pattern="^(image|text)$"),
+    offset: int = Query(0, ge=0),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_CAPTURE_FILES_PAGE)
+):
     """
-    List all image files in the capture directory.
+    List image and description files in the capture directory (newest first).
+    
+    Served from an in-process index of the directory (see api.capture_index),
+    with an ETag: polling with If-None-Match returns 304 while nothing changed.
+    
+    Query params:
+        - prefix: str (optional) - Only files whose name starts with this, e.g. a test case "TC05"
+        - kind: str (optional) - "image" or "text"
+        - offset: int - Files to skip (default 0)
+        - limit: int (optional) - Page size (default: all files)
     
     Returns:
-        - files: List of file information (name, path, size, modified)
+        - files: List of file information (name, path, size, modified, kind, pair)
+        - total: Number of files matching the filters
     """
     try:
-        # Import config from screenshot-capture-service
-        config_path = project_root / "screenshot-capture-service" / "config.py"
-        if not config_path.exists():
-            raise HTTPException(
-                status_code=500,
-                detail="Config file not found"
-            )
+        # Capture service config (cached, reloaded when config.py changes)
+        capture_dir = load_capture_config().SCREENSHOTS_DIR.expanduser()
         
-        # Read config to get SCREENSHOTS_DIR
-        import importlib.util
-        spec = importlib.util.spec_from_file_location("config", config_path)
-        config = importlib.util.module_from_spec(spec)
-        spec.loader.exec_module(config)
+        index = await run_in_threadpool(get_capture_index, capture_dir)
+        headers = {"ETag": index.etag, "Cache-Control": "no-cache"}
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match is not None and etag_matches(if_none_match, index.etag):
+            return Response(status_code=304, headers=headers)
         
-        capture_dir = config.SCREENSHOTS_DIR.expanduser()
-        
-        if not capture_dir.exists():
-            return {
-                "files": [],
-                "directory": str(capture_dir)
-            }
-        
-        # List all image and text files
-        image_extensions = ['.png', '.jpg', '.jpeg', '.gif', '.bmp']
-        text_extensions = ['.txt']
-        files = []
-        
-        for file_path in capture_dir.iterdir():
-            if file_path.is_file():
-                suffix = file_path.suffix.lower()
-                if suffix in image_extensions or suffix in text_extensions:
-                    stat = file_path.stat()
-                    files.append({
-                        "name": file_path.name,
-                        "path": str(file_path),
-                        "size": stat.st_size,
-                        "modified": stat.st_mtime
-                    })
-        
-        # Sort by modified time (newest first)
-        files.sort(key=lambda x: x['modified'], reverse=True)
-        
-        return {
-            "files": files,
+        page = index.query(prefix=prefix, kind=kind, offset=offset, limit=limit)
+        return FastJSONResponse({
+            "files": page["files"],
+            "total": page["total"],
+            "offset": offset,
+            "limit": limit,
             "directory": str(capture_dir)
-        }
+        }, headers=headers)
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -368,7 +323,7 @@ async def start_service() -> Dict[str, Any]:
         - message: str
     """
     # Check if already running
-    if is_service_running():
+    if await capture_client.is_service_running():
         return {
             "success": True,
             "message": "Service is already running"
@@ -396,6 +351,8 @@ async def start_service() -> Dict[str, Any]:
             stdout=subprocess.DEVNULL,
             stderr=subprocess.DEVNULL
         )
+        # Let the next status poll reach the service as soon as it is up
+        capture_client.invalidate_status()
         
         return {
             "success": True,
@@ -417,13 +374,9 @@ async def stop_service() -> Dict[str, Any]:
         - success: bool
         - message: str
     """
-    # First stop the watcher if running
-    if is_service_running():
-        try:
-            response = requests.post(f"{SERVICE_URL}/stop", timeout=5)
-            # Continue even if this fails
-        except requests.exceptions.RequestException:
-            pass
+    # First stop the watcher if running (continue even if this fails)
+    if await capture_client.is_service_running():
+        await capture_client.request_stop()
     
     # Stop the service process
     try:
@@ -433,13 +386,15 @@ async def stop_service() -> Dict[str, Any]:
                 detail=f"Stop script not found: {STOP_SCRIPT}"
             )
         
-        result = subprocess.run(
+        result = await run_in_threadpool(
+            subprocess.run,
             ["python3", str(STOP_SCRIPT)],
             cwd=str(STOP_SCRIPT.parent),
             capture_output=True,
             text=True,
             timeout=10
         )
+        capture_client.invalidate_status()
         
         if result.returncode == 0:
             return {
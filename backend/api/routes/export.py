@@ -1,77 +1,286 @@
 """
-Routes for Excel export operations.
+Routes for export operations (Excel, JSON Lines, CSV, HTML bundle).
 """
 
 from fastapi import APIRouter, HTTPException
-from fastapi.responses import FileResponse
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 import sys
 from pathlib import Path
-import os
-import tempfile
 
 # Add project root to path to import shared modules
 project_root = Path(__file__).parent.parent.parent.parent
 sys.path.insert(0, str(project_root))
 
-from shared.excel_export import create_excel_export
-from api.models import ExportRequest
+from shared.excel_export import (
+    create_excel_export,
+    iter_project_workbooks_zip,
+    iter_workbook_bundle_zip,
+    iter_split_workbooks_zip,
+    IMAGE_MODES,
+    LINKED_IMAGE_MODES
+)
+from shared.text_export import iter_jsonl_export, iter_csv_export
+from shared.html_export import iter_html_export
+from shared.export_profile import ExportProfile
+from shared import export_estimate
+from shared.export_estimate import estimate_export, split_into_workbooks
+from api.models import ExportRequest, ExportEstimateResponse
+from api.spool import open_spool_file, iter_spool_file
+from api.logger import get_logger
 
 router = APIRouter(prefix="/api", tags=["export"])
+logger = get_logger("EXPORT")
+
+# Streamed export formats: format -> (chunk generator, media type, file extension)
+STREAMED_EXPORT_FORMATS = {
+    "jsonl": (iter_jsonl_export, "application/x-ndjson", "jsonl"),
+    "csv": (iter_csv_export, "text/csv; charset=utf-8", "csv"),
+    "html": (iter_html_export, "application/zip", "zip"),
+}
+
+
+def stream_export(export_request: ExportRequest) -> StreamingResponse:
+    """
+    Stream an export that is generated chunk by chunk (JSON Lines, CSV or HTML bundle).
+    
+    No file is written: chunks are sent as soon as the generator produces them.
+    """
+    generator, media_type, extension = STREAMED_EXPORT_FORMATS[export_request.format]
+    
+    from datetime import datetime
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    filename = f"test_cases_export_{timestamp}.{extension}"
+    
+    return StreamingResponse(
+        generator(
+            selected_test_case_ids=export_request.test_case_ids,
+            selected_project_ids=export_request.project_ids,
+            since=export_request.since
+        ),
+        media_type=media_type,
+        headers={
+            "Content-Disposition": f"attachment; filename={filename}"
+        }
+    )
+
+
+def validate_export_request(export_request: ExportRequest):
+    """Raise a 400 HTTPException for an export request without a selection or with an unknown image mode."""
+    # Validate that at least one of test_case_ids or project_ids is provided
+    # (a delta export may cover all test cases changed since the given time)
+    if not export_request.test_case_ids and not export_request.project_ids and export_request.since is None:
+        raise HTTPException(status_code=400, detail="No test case IDs, project IDs or since timestamp provided")
+    
+    image_mode = export_request.image_mode or "full"
+    if image_mode not in IMAGE_MODES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unsupported image mode '{image_mode}' (expected {', '.join(IMAGE_MODES)})"
+        )
+
+
+def count_workbooks(estimate, split_by_project: bool):
+    """
+    Number of workbooks an Excel export will produce after automatic splitting.
+    
+    Returns:
+        tuple: (workbooks, split) where split is True when limits add workbooks
+    """
+    if split_by_project:
+        groups = {}
+        for entry in estimate["per_test_case"]:
+            groups.setdefault(entry["project_id"], []).append(entry)
+        groups = list(groups.values())
+    else:
+        groups = [estimate["per_test_case"]]
+    
+    workbooks = sum(len(split_into_workbooks(entries)) if entries else 1 for entries in groups)
+    return workbooks, workbooks > len(groups)
+
+
+@router.post("/export/estimate", response_model=ExportEstimateResponse)
+async def estimate_export_size(export_request: ExportRequest):
+    """
+    Estimate the size and build memory of an Excel export without building it.
+    
+    Uses row counts and screenshot file sizes. When the estimate exceeds the
+    workbook size limit or the memory budget, POST /api/export splits the
+    export into several workbooks (returned as a ZIP); "workbooks" says how many.
+    
+    Args:
+        export_request: Same body as POST /api/export
+        
+    Returns:
+        Counts, estimated output size and memory, the limits and the number of workbooks
+    """
+    try:
+        validate_export_request(export_request)
+        
+        estimate = await run_in_threadpool(
+            estimate_export,
+            export_request.test_case_ids,
+            export_request.project_ids,
+            export_request.since,
+            export_request.image_mode or "full"
+        )
+        workbooks, split = count_workbooks(estimate, bool(export_request.split_by_project))
+        
+        response = {key: value for key, value in estimate.items() if key != "per_test_case"}
+        response.update({
+            "max_workbook_bytes": export_estimate.MAX_WORKBOOK_BYTES,
+            "memory_budget_bytes": export_estimate.MEMORY_BUDGET_BYTES,
+            "workbooks": workbooks,
+            "split": split,
+        })
+        return response
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error estimating export: {str(e)}")
 
 
 @router.post("/export")
 async def export_test_cases(export_request: ExportRequest):
     """
-    Export selected test cases or projects to Excel.
+    Export selected test cases or projects to Excel, JSON Lines, CSV or a zipped HTML site.
     
     Args:
-        export_request: Request containing list of test case IDs or project IDs to export
+        export_request: Request containing list of test case IDs or project IDs to export,
+            and the output format (xlsx by default)
         
     Returns:
-        Excel file download
+        Excel file download, or a streamed JSON Lines / CSV / ZIP download
     """
     try:
-        # Validate that at least one of test_case_ids or project_ids is provided
-        if not export_request.test_case_ids and not export_request.project_ids:
-            raise HTTPException(status_code=400, detail="No test case IDs or project IDs provided")
+        validate_export_request(export_request)
         
-        # Create temporary file for Excel export
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.xlsx') as tmp_file:
-            tmp_path = tmp_file.name
-        
-        try:
-            # Generate Excel file
-            excel_path = create_excel_export(
-                output_path=tmp_path,
-                selected_test_case_ids=export_request.test_case_ids,
-                selected_project_ids=export_request.project_ids
+        export_format = export_request.format or "xlsx"
+        if export_format in STREAMED_EXPORT_FORMATS:
+            return stream_export(export_request)
+        if export_format != "xlsx":
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unsupported export format '{export_format}' (expected xlsx, jsonl, csv or html)"
             )
-            
-            if not excel_path or not os.path.exists(excel_path):
-                raise HTTPException(status_code=500, detail="Failed to generate Excel file")
-            
-            # Generate filename
+        
+        image_mode = export_request.image_mode or "full"
+        
+        if export_request.split_by_project:
+            # One workbook per project (oversized projects in parts), built in parallel
+            # and zipped as each finishes
             from datetime import datetime
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"test_cases_export_{timestamp}.xlsx"
-            
-            # Return file as download
-            return FileResponse(
-                excel_path,
-                media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                filename=filename,
+            filename = f"test_cases_export_{timestamp}.zip"
+            return StreamingResponse(
+                iter_project_workbooks_zip(
+                    selected_test_case_ids=export_request.test_case_ids,
+                    selected_project_ids=export_request.project_ids,
+                    since=export_request.since,
+                    image_mode=image_mode,
+                    image_base_url=export_request.image_base_url
+                ),
+                media_type="application/zip",
                 headers={
                     "Content-Disposition": f"attachment; filename={filename}"
                 }
             )
+        
+        # Too large for one workbook (file size limit or memory budget): split into parts
+        estimate = await run_in_threadpool(
+            estimate_export,
+            export_request.test_case_ids,
+            export_request.project_ids,
+            export_request.since,
+            image_mode
+        )
+        if len(split_into_workbooks(estimate["per_test_case"])) > 1:
+            from datetime import datetime
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            logger.info("Excel export split into parts", extra={'data': {
+                key: value for key, value in estimate.items() if key != "per_test_case"
+            }})
+            return StreamingResponse(
+                iter_split_workbooks_zip(
+                    selected_test_case_ids=export_request.test_case_ids,
+                    selected_project_ids=export_request.project_ids,
+                    since=export_request.since,
+                    image_mode=image_mode,
+                    image_base_url=export_request.image_base_url,
+                    estimate=estimate
+                ),
+                media_type="application/zip",
+                headers={
+                    "Content-Disposition": f"attachment; filename=test_cases_export_{timestamp}.zip"
+                }
+            )
+        
+        # Build the workbook into a spooled buffer (memory first, spool directory
+        # once it grows past the threshold) instead of a leaked temp file
+        spool_file = open_spool_file(suffix='.xlsx')
+        profile = ExportProfile()
+        
+        try:
+            # Generate Excel file (off the event loop: building is CPU and disk bound)
+            await run_in_threadpool(
+                create_excel_export,
+                output_path=spool_file,
+                selected_test_case_ids=export_request.test_case_ids,
+                selected_project_ids=export_request.project_ids,
+                profile=profile,
+                since=export_request.since,
+                image_mode=image_mode,
+                image_base_url=export_request.image_base_url
+            )
+            
+            size = spool_file.tell()
+            if not size:
+                raise HTTPException(status_code=500, detail="Failed to generate Excel file")
+        except HTTPException:
+            spool_file.close()
+            raise
         except Exception as e:
-            # Clean up temp file on error
-            if os.path.exists(tmp_path):
-                try:
-                    os.remove(tmp_path)
-                except:
-                    pass
+            # Release the buffer on error
+            spool_file.close()
             raise HTTPException(status_code=500, detail=f"Error generating Excel export: {str(e)}")
+        
+        # Generate filename
+        from datetime import datetime
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        filename = f"test_cases_export_{timestamp}.xlsx"
+        
+        # Per-phase timings: structured log + response header
+        timings = profile.to_dict()
+        timings["output_bytes"] = size
+        logger.info("Excel export built", extra={'data': timings})
+        
+        if image_mode in LINKED_IMAGE_MODES and not export_request.image_base_url:
+            # Relative links: ship the workbook with its images/ side folder
+            return StreamingResponse(
+                iter_workbook_bundle_zip(
+                    spool_file,
+                    filename,
+                    selected_test_case_ids=export_request.test_case_ids,
+                    selected_project_ids=export_request.project_ids,
+                    since=export_request.since
+                ),
+                media_type="application/zip",
+                headers={
+                    "Content-Disposition": f"attachment; filename=test_cases_export_{timestamp}.zip",
+                    "X-Export-Timings": profile.to_header()
+                }
+            )
+        
+        # Stream the buffer in chunks; it is closed (and deleted) once fully sent
+        return StreamingResponse(
+            iter_spool_file(spool_file),
+            media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            headers={
+                "Content-Disposition": f"attachment; filename={filename}",
+                "Content-Length": str(size),
+                "X-Export-Timings": profile.to_header()
+            }
+        )
     except HTTPException:
         raise
     except Exception as e:
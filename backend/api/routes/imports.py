@@ -0,0 +1,71 @@
+"""
+Routes for importing test cases from Excel workbooks.
+"""
+
+from fastapi import APIRouter, HTTPException, UploadFile, File, Form
+from fastapi.concurrency import run_in_threadpool
+import sys
+from pathlib import Path
+from typing import List, Optional
+
+# Add project root to path to import shared modules
+project_root = Path(__file__).parent.parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from shared.excel_import import import_workbook
+from shared.models import get_project_by_id
+from api.models import WorkbookImportResult
+from api.logger import get_logger
+
+router = APIRouter(prefix="/api/import", tags=["import"])
+logger = get_logger("IMPORT")
+
+
+@router.post("/excel", response_model=list[WorkbookImportResult])
+async def import_excel_workbooks(
+    files: List[UploadFile] = File(...),
+    project_id: Optional[int] = Form(None)
+):
+    """
+    Import test cases, steps and screenshots from Excel workbooks.
+    
+    Accepts workbooks written by POST /api/export (or the manual templates
+    that layout mirrors). Each workbook is imported in one transaction;
+    test cases whose number already exists in the target project are skipped.
+    
+    Args:
+        files: One or more .xlsx files
+        project_id: Optional project for all imported test cases. If omitted,
+            projects are taken (and created by name) from each workbook's Summary sheet
+        
+    Returns:
+        One result per workbook; a workbook that fails carries an error and
+        does not stop the others
+    """
+    try:
+        if project_id is not None and not get_project_by_id(project_id):
+            raise HTTPException(status_code=404, detail=f"Project {project_id} not found")
+        
+        results = []
+        for upload in files:
+            filename = upload.filename or "workbook.xlsx"
+            try:
+                # The upload is spooled to disk by Starlette; parse it off the event loop
+                summary = await run_in_threadpool(import_workbook, upload.file, project_id)
+                results.append({"filename": filename, **summary})
+                logger.info("Workbook imported", extra={'data': {
+                    "filename": filename,
+                    **{key: value for key, value in summary.items() if key != "created"}
+                }})
+            except Exception as e:
+                results.append({
+                    "filename": filename, "test_cases": 0, "steps": 0, "screenshots": 0,
+                    "images_stored": 0, "error": str(e)
+                })
+            finally:
+                await upload.close()
+        return results
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error importing workbooks: {str(e)}")
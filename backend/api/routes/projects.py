@@ -2,7 +2,8 @@
 Routes for project operations.
 """
 
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Depends, Query
+import sqlite3
 import sys
 from pathlib import Path
 from typing import Optional
@@ -20,6 +21,7 @@ from shared.models import (
     get_test_cases_by_project
 )
 from api.models import ProjectCreate, ProjectUpdate, ProjectResponse, TestCaseResponse
+from api.database import get_db
 
 router = APIRouter(prefix="/api/projects", tags=["projects"])
 
@@ -87,7 +89,7 @@ async def get_project_test_cases(project_id: int):
 
 
 @router.post("", response_model=ProjectResponse, status_code=201)
-async def create_project(project: ProjectCreate):
+async def create_project(project: ProjectCreate, db: sqlite3.Connection = Depends(get_db, scope="function")):
     """
     Create a new project.
     
@@ -98,12 +100,12 @@ async def create_project(project: ProjectCreate):
         Created project details
     """
     try:
-        project_id = create_project_db(project.name, project.description)
+        project_id = create_project_db(project.name, project.description, conn=db)
         if not project_id:
             raise HTTPException(status_code=400, detail="Failed to create project")
         
         # Fetch and return the created project
-        created = get_project_by_id(project_id)
+        created = get_project_by_id(project_id, conn=db)
         if not created:
             raise HTTPException(status_code=500, detail="Project created but could not be retrieved")
         return created
@@ -114,7 +116,8 @@ async def create_project(project: ProjectCreate):
 
 
 @router.put("/{project_id}", response_model=ProjectResponse)
-async def update_project(project_id: int, project: ProjectUpdate):
+async def update_project(project_id: int, project: ProjectUpdate,
+                         db: sqlite3.Connection = Depends(get_db, scope="function")):
     """
     Update an existing project.
     
@@ -127,7 +130,7 @@ async def update_project(project_id: int, project: ProjectUpdate):
     """
     try:
         # Verify project exists
-        existing = get_project_by_id(project_id)
+        existing = get_project_by_id(project_id, conn=db)
         if not existing:
             raise HTTPException(status_code=404, detail=f"Project {project_id} not found")
         
@@ -136,12 +139,12 @@ async def update_project(project_id: int, project: ProjectUpdate):
         description = project.description if project.description is not None else existing.get('description')
         
         # Update the project
-        success = update_project_db(project_id, name, description)
+        success = update_project_db(project_id, name, description, conn=db)
         if not success:
             raise HTTPException(status_code=400, detail="Failed to update project")
         
         # Fetch and return the updated project
-        updated = get_project_by_id(project_id)
+        updated = get_project_by_id(project_id, conn=db)
         if not updated:
             raise HTTPException(status_code=500, detail="Project updated but could not be retrieved")
         return updated
@@ -152,7 +155,8 @@ async def update_project(project_id: int, project: ProjectUpdate):
 
 
 @router.delete("/{project_id}", status_code=204)
-async def delete_project(project_id: int, move_to_project_id: Optional[int] = Query(None)):
+async def delete_project(project_id: int, move_to_project_id: Optional[int] = Query(None),
+                         db: sqlite3.Connection = Depends(get_db, scope="function")):
     """
     Delete a project.
     
@@ -165,7 +169,7 @@ async def delete_project(project_id: int, move_to_project_id: Optional[int] = Qu
     """
     try:
         # Verify project exists
-        project = get_project_by_id(project_id)
+        project = get_project_by_id(project_id, conn=db)
         if not project:
             raise HTTPException(status_code=404, detail=f"Project {project_id} not found")
         
@@ -175,12 +179,12 @@ async def delete_project(project_id: int, move_to_project_id: Optional[int] = Qu
         
         # If moving to another project, verify it exists
         if move_to_project_id is not None:
-            target_project = get_project_by_id(move_to_project_id)
+            target_project = get_project_by_id(move_to_project_id, conn=db)
             if not target_project:
                 raise HTTPException(status_code=404, detail=f"Target project {move_to_project_id} not found")
         
         # Delete the project
-        success = delete_project_db(project_id, move_to_project_id)
+        success = delete_project_db(project_id, move_to_project_id, conn=db)
         if not success:
             raise HTTPException(status_code=400, detail="Failed to delete project")
         
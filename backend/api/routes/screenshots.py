@@ -2,13 +2,13 @@
 Routes for screenshot operations.
 """
 
-from fastapi import APIRouter, HTTPException, UploadFile, File
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, HTTPException, UploadFile, File, Query, Request
+from fastapi.concurrency import run_in_threadpool
+import asyncio
 import sys
 from pathlib import Path
 import os
-from typing import List
-from datetime import datetime
+from typing import List, Optional
 
 # Add project root to path to import shared modules
 project_root = Path(__file__).parent.parent.parent.parent
@@ -17,18 +17,30 @@ sys.path.insert(0, str(project_root))
 from shared.models import (
     get_step_by_id,
     add_screenshot_to_step as add_screenshot_to_step_db,
+    add_screenshots_to_step as add_screenshots_to_step_db,
     get_screenshots_by_step,
-    delete_screenshot as delete_screenshot_db
+    get_screenshot_by_id,
+    delete_screenshot as delete_screenshot_db,
+    count_screenshots_using_file
 )
 from api.models import ScreenshotResponse
+from api import thumbnails
+from api.http_cache import cached_file_response
+from api.uploads import store_upload, timestamped_stem, UploadTooLarge, UnsupportedUpload
 
 router = APIRouter(prefix="/api", tags=["screenshots"])
 
+UPLOAD_ROOT = project_root / "uploads"
+
 
 def save_uploaded_file(uploaded_file: UploadFile, test_case_id: int, step_id: int) -> str:
     """
     Save uploaded file to the appropriate directory and return the file path.
     
+    The file is streamed to disk in chunks (see api/uploads.py): it must be
+    a supported image within the size limit, and appears under its final name
+    only once fully written. Blocking; run it in a worker thread.
+    
     Args:
         uploaded_file: The uploaded file
         test_case_id: The test case ID
@@ -36,23 +48,16 @@ def save_uploaded_file(uploaded_file: UploadFile, test_case_id: int, step_id: in
         
     Returns:
         Path to the saved file
+        
+    Raises:
+        UploadTooLarge, UnsupportedUpload: The upload was rejected
     """
     # Create directory structure: uploads/test_{id}/step_{id}/
-    upload_dir = project_root / f"uploads/test_{test_case_id}/step_{step_id}"
-    upload_dir.mkdir(parents=True, exist_ok=True)
-    
-    # Generate unique filename
-    file_extension = Path(uploaded_file.filename).suffix if uploaded_file.filename else ".png"
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename = f"screenshot_{timestamp}{file_extension}"
-    file_path = upload_dir / filename
+    upload_dir = UPLOAD_ROOT / f"test_{test_case_id}/step_{step_id}"
     
-    # Save the file
-    with open(file_path, "wb") as f:
-        content = uploaded_file.file.read()
-        f.write(content)
-    
-    return str(file_path)
+    # screenshot_<timestamp>.<detected extension>
+    stored = store_upload(uploaded_file.file, upload_dir, timestamped_stem("screenshot"))
+    return stored["file_path"]
 
 
 @router.post("/steps/{step_id}/screenshots", response_model=ScreenshotResponse, status_code=201)
@@ -75,8 +80,13 @@ async def upload_screenshot(step_id: int, file: UploadFile = File(...)):
         
         test_case_id = step['test_case_id']
         
-        # Save the file
-        file_path = save_uploaded_file(file, test_case_id, step_id)
+        # Save the file (streamed off the event loop)
+        try:
+            file_path = await run_in_threadpool(save_uploaded_file, file, test_case_id, step_id)
+        except UploadTooLarge as e:
+            raise HTTPException(status_code=413, detail=str(e))
+        except UnsupportedUpload as e:
+            raise HTTPException(status_code=415, detail=str(e))
         
         # Add to database
         screenshot_id = add_screenshot_to_step_db(step_id, file_path)
@@ -89,8 +99,7 @@ async def upload_screenshot(step_id: int, file: UploadFile = File(...)):
             raise HTTPException(status_code=500, detail="Failed to save screenshot to database")
         
         # Fetch and return the created screenshot
-        screenshots = get_screenshots_by_step(step_id)
-        created = next((s for s in screenshots if s['id'] == screenshot_id), None)
+        created = get_screenshot_by_id(screenshot_id)
         if not created:
             raise HTTPException(status_code=500, detail="Screenshot created but could not be retrieved")
         return created
@@ -100,6 +109,66 @@ async def upload_screenshot(step_id: int, file: UploadFile = File(...)):
         raise HTTPException(status_code=500, detail=f"Error uploading screenshot: {str(e)}")
 
 
+
+@router.post("/steps/{step_id}/screenshots/batch", response_model=List[ScreenshotResponse], status_code=201)
+async def upload_screenshots(step_id: int, files: List[UploadFile] = File(...)):
+    """
+    Upload several screenshots for a step in one request.
+    
+    Files are written concurrently in worker threads and all rows are
+    inserted in one transaction. The batch is all or nothing: if any file is
+    rejected (not an image, too large), none of them is kept.
+    
+    Args:
+        step_id: The ID of the step
+        files: The image files to upload, in display order
+        
+    Returns:
+        Created screenshot details, in upload order
+    """
+    try:
+        # Check if step exists
+        step = get_step_by_id(step_id)
+        if not step:
+            raise HTTPException(status_code=404, detail=f"Step {step_id} not found")
+        
+        test_case_id = step['test_case_id']
+        
+        # Save all files concurrently (the default threadpool bounds the concurrency)
+        results = await asyncio.gather(
+            *(run_in_threadpool(save_uploaded_file, file, test_case_id, step_id) for file in files),
+            return_exceptions=True
+        )
+        file_paths = [result for result in results if isinstance(result, str)]
+        
+        def discard_saved_files():
+            for file_path in file_paths:
+                try:
+                    os.remove(file_path)
+                except OSError:
+                    pass
+        
+        for file, result in zip(files, results):
+            if isinstance(result, BaseException):
+                discard_saved_files()
+                if isinstance(result, UploadTooLarge):
+                    raise HTTPException(status_code=413, detail=f"{file.filename}: {result}")
+                if isinstance(result, UnsupportedUpload):
+                    raise HTTPException(status_code=415, detail=f"{file.filename}: {result}")
+                raise result
+        
+        # Add all rows to the database in one transaction
+        try:
+            return add_screenshots_to_step_db(step_id, file_paths)
+        except Exception:
+            discard_saved_files()
+            raise
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error uploading screenshots: {str(e)}")
+
+
 @router.get("/steps/{step_id}/screenshots", response_model=List[ScreenshotResponse])
 async def list_screenshots(step_id: int):
     """
@@ -126,42 +195,23 @@ async def list_screenshots(step_id: int):
 
 
 @router.get("/screenshots/{screenshot_id}/file")
-async def get_screenshot_file(screenshot_id: int):
+async def get_screenshot_file(request: Request, screenshot_id: int):
     """
     Get the actual image file for a screenshot.
     
+    Screenshots never change once uploaded: the file is served with a strong
+    ETag, Last-Modified and an immutable Cache-Control; conditional requests
+    get 304 and Range requests a partial response.
+    
     Args:
         screenshot_id: The ID of the screenshot
         
     Returns:
-        The image file
+        The image file (or 304 Not Modified)
     """
     try:
-        # Get screenshot from any step (we need to find which step has this screenshot)
-        # This is a bit inefficient, but we don't have a get_screenshot_by_id function
-        # For now, we'll search through steps
-        # TODO: Add get_screenshot_by_id to models.py if needed
-        
-        # Get all test cases and search
-        from shared.models import get_all_test_cases, get_steps_by_test_case
-        
-        all_test_cases = get_all_test_cases()
-        screenshot = None
-        file_path = None
-        
-        for tc in all_test_cases:
-            steps = get_steps_by_test_case(tc['id'])
-            for step in steps:
-                screenshots = get_screenshots_by_step(step['id'])
-                for s in screenshots:
-                    if s['id'] == screenshot_id:
-                        screenshot = s
-                        file_path = s['file_path']
-                        break
-                if screenshot:
-                    break
-            if screenshot:
-                break
+        screenshot = get_screenshot_by_id(screenshot_id)
+        file_path = screenshot['file_path'] if screenshot else None
         
         if not screenshot or not file_path:
             raise HTTPException(status_code=404, detail=f"Screenshot {screenshot_id} not found")
@@ -169,13 +219,63 @@ async def get_screenshot_file(screenshot_id: int):
         if not os.path.exists(file_path):
             raise HTTPException(status_code=404, detail=f"Screenshot file not found: {file_path}")
         
-        return FileResponse(file_path)
+        return cached_file_response(request, file_path)
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching screenshot file: {str(e)}")
 
 
+@router.get("/screenshots/{screenshot_id}/thumbnail")
+async def get_screenshot_thumbnail(
+    request: Request,
+    screenshot_id: int,
+    w: int = Query(thumbnails.DEFAULT_WIDTH, ge=1, description="Thumbnail width in pixels"),
+    format: Optional[str] = Query(None, description="jpeg or webp (default: webp if accepted, else jpeg)")
+):
+    """
+    Get a resized preview of a screenshot.
+    
+    Thumbnails are generated once per image content and width and served
+    from the on-disk cache afterwards (see api/thumbnails.py).
+    
+    Args:
+        screenshot_id: The ID of the screenshot
+        w: Width in pixels (rounded up to a multiple of 32, at most 1600)
+        format: Output format; negotiated from the Accept header when omitted
+        
+    Returns:
+        The JPEG or WebP thumbnail
+    """
+    try:
+        try:
+            image_format = thumbnails.choose_format(format, request.headers.get("accept", ""))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        
+        screenshot = get_screenshot_by_id(screenshot_id)
+        if not screenshot:
+            raise HTTPException(status_code=404, detail=f"Screenshot {screenshot_id} not found")
+        
+        file_path = screenshot['file_path']
+        if not os.path.exists(file_path):
+            raise HTTPException(status_code=404, detail=f"Screenshot file not found: {file_path}")
+        
+        thumbnail_path = await thumbnails.get_thumbnail(file_path, thumbnails.normalize_width(w), image_format)
+        
+        return cached_file_response(
+            request,
+            thumbnail_path,
+            media_type=thumbnails.THUMBNAIL_FORMATS[image_format][1],
+            cache_control=thumbnails.THUMBNAIL_CACHE_CONTROL,
+            headers=None if format else {"Vary": "Accept"}
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error generating screenshot thumbnail: {str(e)}")
+
+
 @router.delete("/screenshots/{screenshot_id}", status_code=204)
 async def delete_screenshot(screenshot_id: int):
     """
@@ -189,25 +289,8 @@ async def delete_screenshot(screenshot_id: int):
     """
     try:
         # Get screenshot info before deleting (to delete the file)
-        from shared.models import get_all_test_cases, get_steps_by_test_case
-        
-        all_test_cases = get_all_test_cases()
-        screenshot = None
-        file_path = None
-        
-        for tc in all_test_cases:
-            steps = get_steps_by_test_case(tc['id'])
-            for step in steps:
-                screenshots = get_screenshots_by_step(step['id'])
-                for s in screenshots:
-                    if s['id'] == screenshot_id:
-                        screenshot = s
-                        file_path = s['file_path']
-                        break
-                if screenshot:
-                    break
-            if screenshot:
-                break
+        screenshot = get_screenshot_by_id(screenshot_id)
+        file_path = screenshot['file_path'] if screenshot else None
         
         if not screenshot:
             raise HTTPException(status_code=404, detail=f"Screenshot {screenshot_id} not found")
@@ -217,8 +300,9 @@ async def delete_screenshot(screenshot_id: int):
         if not success:
             raise HTTPException(status_code=500, detail="Failed to delete screenshot from database")
         
-        # Delete the file if it exists
-        if file_path and os.path.exists(file_path):
+        # Delete the file if it exists and no other screenshot uses it
+        # (imported images are shared by content, duplicated test cases share files)
+        if file_path and os.path.exists(file_path) and not count_screenshots_using_file(file_path):
             try:
                 os.remove(file_path)
             except Exception as e:
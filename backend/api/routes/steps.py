@@ -2,11 +2,13 @@
 Routes for test step operations.
 """
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Depends
+from fastapi.concurrency import run_in_threadpool
+import os
+import sqlite3
 import sys
 from pathlib import Path
-from typing import List
-import shutil
+from typing import Any, Dict, List
 from datetime import datetime
 
 # Add project root to path to import shared modules
@@ -20,11 +22,26 @@ from shared.models import (
     update_test_step as update_test_step_db,
     delete_test_step as delete_test_step_db,
     reorder_steps as reorder_steps_db,
-    add_screenshot_to_step as add_screenshot_to_step_db
+    create_steps_with_screenshots,
+    get_screenshot_files_by_test_case,
+    get_all_test_cases,
+    get_project_by_id,
+    get_test_cases_by_project
 )
-from api.models import TestStepCreate, TestStepUpdate, TestStepResponse, StepReorderRequest, LoadStepRequest
+from api.models import (
+    TestStepCreate, TestStepUpdate, TestStepResponse, StepReorderRequest, LoadStepRequest, LoadPendingRequest
+)
+from api.database import get_db
+from api.logger import get_logger
+from api.capture_config import get_capture_dir
+from api.capture_index import get_capture_index
+from api.ingest import ingest_files
+from api.pending_captures import plan_steps, make_loaded_check, archive_files, ARCHIVE_DIR_NAME
 
 router = APIRouter(prefix="/api", tags=["steps"])
+logger = get_logger("CAPTURE")
+
+UPLOAD_ROOT = project_root / "uploads"
 
 
 @router.get("/test-cases/{test_case_id}/steps", response_model=List[TestStepResponse])
@@ -68,7 +85,8 @@ async def get_step(step_id: int):
 
 
 @router.post("/test-cases/{test_case_id}/steps", response_model=TestStepResponse, status_code=201)
-async def create_step(test_case_id: int, step: TestStepCreate):
+async def create_step(test_case_id: int, step: TestStepCreate,
+                      db: sqlite3.Connection = Depends(get_db, scope="function")):
     """
     Create a new step for a test case.
     
@@ -86,13 +104,14 @@ async def create_step(test_case_id: int, step: TestStepCreate):
             description=step.description,
             modules=step.modules,
             calculation_logic=step.calculation_logic,
-            configuration=step.configuration
+            configuration=step.configuration,
+            conn=db
         )
         if not step_id:
             raise HTTPException(status_code=400, detail="Failed to create step")
         
         # Fetch and return the created step
-        created = get_step_by_id(step_id)
+        created = get_step_by_id(step_id, conn=db)
         if not created:
             raise HTTPException(status_code=500, detail="Step created but could not be retrieved")
         return created
@@ -103,7 +122,7 @@ async def create_step(test_case_id: int, step: TestStepCreate):
 
 
 @router.put("/steps/{step_id}", response_model=TestStepResponse)
-async def update_step(step_id: int, step: TestStepUpdate):
+async def update_step(step_id: int, step: TestStepUpdate, db: sqlite3.Connection = Depends(get_db, scope="function")):
     """
     Update an existing step.
     
@@ -116,7 +135,7 @@ async def update_step(step_id: int, step: TestStepUpdate):
     """
     try:
         # Check if step exists
-        existing = get_step_by_id(step_id)
+        existing = get_step_by_id(step_id, conn=db)
         if not existing:
             raise HTTPException(status_code=404, detail=f"Step {step_id} not found")
         
@@ -134,14 +153,15 @@ async def update_step(step_id: int, step: TestStepUpdate):
             description=description,
             modules=modules,
             calculation_logic=calculation_logic,
-            configuration=configuration
+            configuration=configuration,
+            conn=db
         )
         
         if not success:
             raise HTTPException(status_code=500, detail="Failed to update step")
         
         # Fetch and return the updated step
-        updated = get_step_by_id(step_id)
+        updated = get_step_by_id(step_id, conn=db)
         if not updated:
             raise HTTPException(status_code=500, detail="Step updated but could not be retrieved")
         return updated
@@ -161,6 +181,9 @@ async def load_step(test_case_id: int, request: LoadStepRequest):
     - Description from text file (or provided)
     - Screenshots from selected PNG files
     
+    All or nothing: if any image cannot be brought in, no step is created,
+    the images already copied are removed and the error names the failures.
+    
     Args:
         test_case_id: The ID of the test case
         request: Load step request with description, image paths, and optional description file path
@@ -169,25 +192,38 @@ async def load_step(test_case_id: int, request: LoadStepRequest):
         Created step details with screenshots
     """
     try:
-        # Get config to find Capture_TC/ directory
-        config_path = project_root / "screenshot-capture-service" / "config.py"
-        if not config_path.exists():
-            raise HTTPException(status_code=500, detail="Config file not found")
-        
-        import importlib.util
-        spec = importlib.util.spec_from_file_location("config", config_path)
-        config = importlib.util.module_from_spec(spec)
-        spec.loader.exec_module(config)
-        capture_dir = config.SCREENSHOTS_DIR.expanduser().resolve()
-        
-        # Calculate next step number
-        existing_steps = get_steps_by_test_case(test_case_id)
-        next_step_number = max([s['step_number'] for s in existing_steps], default=0) + 1
+        # Get config to find Capture_TC/ directory (cached)
+        try:
+            capture_dir = get_capture_dir()
+        except FileNotFoundError as e:
+            raise HTTPException(status_code=500, detail=str(e))
         
         # Validate that we have at least one image
         if not request.image_paths:
             raise HTTPException(status_code=400, detail="At least one image path is required")
         
+        # Validate every image before creating anything
+        image_paths = []
+        for image_path_str in request.image_paths:
+            image_path = Path(image_path_str).expanduser().resolve()
+            
+            # Security check: ensure file is in capture directory
+            try:
+                image_path.relative_to(capture_dir)
+            except ValueError:
+                raise HTTPException(
+                    status_code=403,
+                    detail=f"Image file is not in capture directory: {image_path}"
+                )
+            
+            if not image_path.exists():
+                raise HTTPException(status_code=404, detail=f"Image file not found: {image_path}")
+            
+            if not image_path.is_file():
+                raise HTTPException(status_code=400, detail=f"Path is not a file: {image_path}")
+            
+            image_paths.append(image_path)
+        
         # Get description from text file if provided, otherwise use provided description
         final_description = request.description.strip()
         
@@ -227,79 +263,37 @@ async def load_step(test_case_id: int, request: LoadStepRequest):
         if not final_description or not final_description.strip():
             raise HTTPException(status_code=400, detail="Description is required")
         
-        # Create the step
-        step_id = create_test_step_db(
-            test_case_id=test_case_id,
-            step_number=next_step_number,
-            description=final_description,
-            modules=None,
-            calculation_logic=None,
-            configuration=None
-        )
-        
-        if not step_id:
-            raise HTTPException(status_code=400, detail="Failed to create step")
-        
-        # Upload and associate screenshots
-        uploaded_screenshots = []
+        # Bring the images into uploads/ concurrently (reflink / hard link / copy, see api.ingest)
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        counter = 1
-        
-        for image_path_str in request.image_paths:
-            try:
-                # Resolve the image path
-                image_path = Path(image_path_str).expanduser().resolve()
-                
-                # Security check: ensure file is in capture directory
-                try:
-                    image_path.resolve().relative_to(capture_dir.resolve())
-                except ValueError:
-                    raise HTTPException(
-                        status_code=403,
-                        detail=f"Image file is not in capture directory: {image_path}"
+        upload_dir = UPLOAD_ROOT / f"test_{test_case_id}/captures_{timestamp}"
+        results = await ingest_files([
+            (image_path, upload_dir, f"screenshot_{timestamp}_{counter:03d}")
+            for counter, image_path in enumerate(image_paths, start=1)
+        ])
+        
+        file_paths = [result["file_path"] for result in results if not isinstance(result, BaseException)]
+        failed = [(image_path, result) for image_path, result in zip(image_paths, results)
+                  if isinstance(result, BaseException)]
+        try:
+            if failed:
+                # All or nothing: a step never silently misses a selected image
+                raise HTTPException(
+                    status_code=500,
+                    detail="Failed to load screenshots: " + "; ".join(
+                        f"{image_path.name} ({str(error)})" for image_path, error in failed
                     )
-                
-                if not image_path.exists():
-                    raise HTTPException(status_code=404, detail=f"Image file not found: {image_path}")
-                
-                if not image_path.is_file():
-                    raise HTTPException(status_code=400, detail=f"Path is not a file: {image_path}")
-                
-                # Copy file to uploads directory (similar to save_uploaded_file)
-                upload_dir = project_root / f"uploads/test_{test_case_id}/step_{step_id}"
-                upload_dir.mkdir(parents=True, exist_ok=True)
-                
-                # Generate unique filename with counter to avoid collisions
-                file_extension = image_path.suffix or ".png"
-                filename = f"screenshot_{timestamp}_{counter:03d}{file_extension}"
-                dest_path = upload_dir / filename
-                
-                # Ensure filename is unique (in case of rare collisions)
-                while dest_path.exists():
-                    counter += 1
-                    filename = f"screenshot_{timestamp}_{counter:03d}{file_extension}"
-                    dest_path = upload_dir / filename
-                
-                # Copy the file
-                shutil.copy2(str(image_path), str(dest_path))
-                
-                # Add screenshot to database
-                screenshot_id = add_screenshot_to_step_db(step_id, str(dest_path))
-                if screenshot_id:
-                    uploaded_screenshots.append(screenshot_id)
-                
-                # Increment counter for next screenshot
-                counter += 1
-                    
-            except HTTPException:
-                raise
-            except Exception as e:
-                # Log error but continue with other images
-                print(f"Warning: Failed to upload image {image_path_str}: {str(e)}")
-                counter += 1  # Still increment counter even on error
-        
-        if not uploaded_screenshots:
-            raise HTTPException(status_code=500, detail="Failed to upload any screenshots")
+                )
+            
+            # Create the step and its screenshots in one transaction
+            step_id = create_steps_with_screenshots([{
+                "test_case_id": test_case_id,
+                "description": final_description,
+                "file_paths": file_paths,
+            }])[0]["id"]
+        except BaseException:
+            for file_path in file_paths:
+                Path(file_path).unlink(missing_ok=True)
+            raise
         
         # Fetch and return the created step
         created = get_step_by_id(step_id)
@@ -313,8 +307,119 @@ async def load_step(test_case_id: int, request: LoadStepRequest):
         raise HTTPException(status_code=500, detail=f"Error loading step: {str(e)}")
 
 
+@router.post("/steps/load-pending")
+async def load_pending_steps(request: LoadPendingRequest) -> Dict[str, Any]:
+    """
+    Load every pending capture of the Capture_TC/ directory as steps.
+    
+    Images are matched to test cases by their name prefix and grouped into
+    steps by description and capture time (see api.pending_captures). All
+    steps are created in one transaction, appended to their test case.
+    
+    Args:
+        request: Optional project_id (only its test cases are matched), archive
+            (move the consumed files to Capture_TC/archive/) and dry_run (only
+            return the grouping)
+        
+    Returns:
+        - steps: created (or planned) steps with their screenshot files
+        - unmatched: image names matching no test case
+        - ambiguous: image names whose test number exists in several projects
+        - loaded: image names skipped because their test case already has a
+          screenshot with the same content (loaded before without archiving)
+        - failed: image names that could not be ingested
+        - archived: number of files moved to the archive
+    """
+    try:
+        try:
+            capture_dir = get_capture_dir()
+        except FileNotFoundError as e:
+            raise HTTPException(status_code=500, detail=str(e))
+        
+        if request.project_id is not None:
+            if not get_project_by_id(request.project_id):
+                raise HTTPException(status_code=404, detail=f"Project {request.project_id} not found")
+            test_cases = get_test_cases_by_project(request.project_id)
+        else:
+            test_cases = get_all_test_cases()
+        
+        index = await run_in_threadpool(get_capture_index, capture_dir)
+        # Images already among their test case's screenshots (same content) are not loaded again
+        is_loaded = make_loaded_check(get_screenshot_files_by_test_case)
+        plan = await run_in_threadpool(plan_steps, index.files, test_cases, None, is_loaded)
+        result = {"steps": [], "unmatched": plan["unmatched"], "ambiguous": plan["ambiguous"],
+                  "loaded": plan["loaded"], "failed": [], "archived": 0, "dry_run": request.dry_run}
+        
+        if request.dry_run:
+            result["steps"] = [{
+                "id": None,
+                "test_case_id": step["test_case_id"],
+                "test_number": step["test_number"],
+                "step_number": None,
+                "description": step["description"],
+                "files": [f["name"] for f in step["files"]],
+            } for step in plan["steps"]]
+            return result
+        
+        # Bring every image into uploads/ concurrently (reflink / hard link / copy, see api.ingest)
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        items = [
+            (Path(f["path"]), UPLOAD_ROOT / f"test_{step['test_case_id']}/captures_{timestamp}",
+             os.path.splitext(f["name"])[0])
+            for step in plan["steps"] for f in step["files"]
+        ]
+        results = iter(await ingest_files(items))
+        
+        new_steps = []
+        ingested = []
+        consumed = []
+        for step in plan["steps"]:
+            file_paths = []
+            for f in step["files"]:
+                outcome = next(results)
+                if isinstance(outcome, BaseException):
+                    # Log error but continue with other images (the file stays pending)
+                    logger.warning("Failed to ingest capture", extra={'data': {"path": f["path"], "error": str(outcome)}})
+                    result["failed"].append(f["name"])
+                    continue
+                file_paths.append(outcome["file_path"])
+                consumed.append(f["path"])
+                if f["description_path"]:
+                    consumed.append(f["description_path"])
+            if file_paths:
+                ingested.extend(file_paths)
+                new_steps.append({**step, "file_paths": file_paths})
+        
+        # Create all steps and their screenshots in one transaction
+        try:
+            created = create_steps_with_screenshots(new_steps)
+        except Exception:
+            for file_path in ingested:
+                Path(file_path).unlink(missing_ok=True)
+            raise
+        
+        result["steps"] = [{
+            "id": row["id"],
+            "test_case_id": row["test_case_id"],
+            "test_number": step["test_number"],
+            "step_number": row["step_number"],
+            "description": step["description"],
+            "files": [f["name"] for f in step["files"] if f["name"] not in result["failed"]],
+        } for row, step in zip(created, new_steps)]
+        
+        if request.archive and consumed:
+            archive_dir = capture_dir / ARCHIVE_DIR_NAME / timestamp
+            result["archived"] = await run_in_threadpool(archive_files, consumed, archive_dir)
+        
+        return result
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error loading pending captures: {str(e)}")
+
+
 @router.delete("/steps/{step_id}", status_code=204)
-async def delete_step(step_id: int):
+async def delete_step(step_id: int, db: sqlite3.Connection = Depends(get_db, scope="function")):
     """
     Delete a step.
     
@@ -326,12 +431,12 @@ async def delete_step(step_id: int):
     """
     try:
         # Check if step exists
-        existing = get_step_by_id(step_id)
+        existing = get_step_by_id(step_id, conn=db)
         if not existing:
             raise HTTPException(status_code=404, detail=f"Step {step_id} not found")
         
         # Delete the step
-        success = delete_test_step_db(step_id)
+        success = delete_test_step_db(step_id, conn=db)
         if not success:
             raise HTTPException(status_code=500, detail="Failed to delete step")
         
@@ -343,7 +448,8 @@ async def delete_step(step_id: int):
 
 
 @router.post("/steps/{step_id}/reorder", response_model=TestStepResponse)
-async def reorder_step(step_id: int, reorder_request: StepReorderRequest):
+async def reorder_step(step_id: int, reorder_request: StepReorderRequest,
+                       db: sqlite3.Connection = Depends(get_db, scope="function")):
     """
     Reorder a step to a new position.
     
@@ -356,14 +462,14 @@ async def reorder_step(step_id: int, reorder_request: StepReorderRequest):
     """
     try:
         # Get the step to find its test_case_id
-        step = get_step_by_id(step_id)
+        step = get_step_by_id(step_id, conn=db)
         if not step:
             raise HTTPException(status_code=404, detail=f"Step {step_id} not found")
         
         test_case_id = step['test_case_id']
         
         # Get all steps for this test case
-        all_steps = get_steps_by_test_case(test_case_id)
+        all_steps = get_steps_by_test_case(test_case_id, conn=db)
         
         # Create new order: move step_id to new_position
         step_ids = [s['id'] for s in all_steps]
@@ -384,12 +490,12 @@ async def reorder_step(step_id: int, reorder_request: StepReorderRequest):
         step_ids.insert(new_position - 1, step_id)
         
         # Reorder using the shared function
-        success = reorder_steps_db(test_case_id, step_ids)
+        success = reorder_steps_db(test_case_id, step_ids, conn=db)
         if not success:
             raise HTTPException(status_code=500, detail="Failed to reorder steps")
         
         # Fetch and return the updated step
-        updated = get_step_by_id(step_id)
+        updated = get_step_by_id(step_id, conn=db)
         if not updated:
             raise HTTPException(status_code=500, detail="Step reordered but could not be retrieved")
         return updated
@@ -2,7 +2,8 @@
 Routes for test case operations.
 """
 
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Depends, Query
+import sqlite3
 import sys
 from pathlib import Path
 from typing import Optional
@@ -22,6 +23,7 @@ from shared.models import (
     get_project_by_id
 )
 from api.models import TestCaseCreate, TestCaseUpdate, TestCaseResponse, TestCaseDuplicateRequest, TestCaseMoveRequest
+from api.database import get_db
 
 router = APIRouter(prefix="/api/test-cases", tags=["test-cases"])
 
@@ -67,7 +69,7 @@ async def get_test_case(test_case_id: int):
 
 
 @router.post("", response_model=TestCaseResponse, status_code=201)
-async def create_test_case(test_case: TestCaseCreate):
+async def create_test_case(test_case: TestCaseCreate, db: sqlite3.Connection = Depends(get_db, scope="function")):
     """
     Create a new test case.
     
@@ -80,20 +82,21 @@ async def create_test_case(test_case: TestCaseCreate):
     try:
         # Validate project_id if provided
         if test_case.project_id is not None:
-            project = get_project_by_id(test_case.project_id)
+            project = get_project_by_id(test_case.project_id, conn=db)
             if not project:
                 raise HTTPException(status_code=404, detail=f"Project {test_case.project_id} not found")
         
         test_case_id = create_test_case_db(
             test_number=test_case.test_number,
             description=test_case.description,
-            project_id=test_case.project_id
+            project_id=test_case.project_id,
+            conn=db
         )
         if not test_case_id:
             raise HTTPException(status_code=400, detail="Failed to create test case")
         
         # Fetch and return the created test case
-        created = get_test_case_by_id(test_case_id)
+        created = get_test_case_by_id(test_case_id, conn=db)
         if not created:
             raise HTTPException(status_code=500, detail="Test case created but could not be retrieved")
         return created
@@ -104,7 +107,8 @@ async def create_test_case(test_case: TestCaseCreate):
 
 
 @router.put("/{test_case_id}", response_model=TestCaseResponse)
-async def update_test_case(test_case_id: int, test_case: TestCaseUpdate):
+async def update_test_case(test_case_id: int, test_case: TestCaseUpdate,
+                           db: sqlite3.Connection = Depends(get_db, scope="function")):
     """
     Update an existing test case.
     
@@ -117,14 +121,14 @@ async def update_test_case(test_case_id: int, test_case: TestCaseUpdate):
     """
     try:
         # Check if test case exists
-        existing = get_test_case_by_id(test_case_id)
+        existing = get_test_case_by_id(test_case_id, conn=db)
         if not existing:
             raise HTTPException(status_code=404, detail=f"Test case {test_case_id} not found")
         
         # Validate project_id if provided
         project_id = test_case.project_id
         if project_id is not None:
-            project = get_project_by_id(project_id)
+            project = get_project_by_id(project_id, conn=db)
             if not project:
                 raise HTTPException(status_code=404, detail=f"Project {project_id} not found")
         
@@ -147,14 +151,15 @@ async def update_test_case(test_case_id: int, test_case: TestCaseUpdate):
             test_case_id=test_case_id,
             test_number=test_number,
             description=description,
-            project_id=project_id
+            project_id=project_id,
+            conn=db
         )
         
         if not success:
             raise HTTPException(status_code=500, detail="Failed to update test case")
         
         # Fetch and return the updated test case
-        updated = get_test_case_by_id(test_case_id)
+        updated = get_test_case_by_id(test_case_id, conn=db)
         if not updated:
             raise HTTPException(status_code=500, detail="Test case updated but could not be retrieved")
         return updated
@@ -165,7 +170,7 @@ async def update_test_case(test_case_id: int, test_case: TestCaseUpdate):
 
 
 @router.delete("/{test_case_id}", status_code=204)
-async def delete_test_case(test_case_id: int):
+async def delete_test_case(test_case_id: int, db: sqlite3.Connection = Depends(get_db, scope="function")):
     """
     Delete a test case.
     
@@ -177,12 +182,12 @@ async def delete_test_case(test_case_id: int):
     """
     try:
         # Check if test case exists
-        existing = get_test_case_by_id(test_case_id)
+        existing = get_test_case_by_id(test_case_id, conn=db)
         if not existing:
             raise HTTPException(status_code=404, detail=f"Test case {test_case_id} not found")
         
         # Delete the test case
-        success = delete_test_case_db(test_case_id)
+        success = delete_test_case_db(test_case_id, conn=db)
         if not success:
             raise HTTPException(status_code=500, detail="Failed to delete test case")
         
@@ -194,7 +199,8 @@ async def delete_test_case(test_case_id: int):
 
 
 @router.put("/{test_case_id}/move", response_model=TestCaseResponse)
-async def move_test_case(test_case_id: int, request: TestCaseMoveRequest):
+async def move_test_case(test_case_id: int, request: TestCaseMoveRequest,
+                         db: sqlite3.Connection = Depends(get_db, scope="function")):
     """
     Move a test case to another project.
     
@@ -207,23 +213,23 @@ async def move_test_case(test_case_id: int, request: TestCaseMoveRequest):
     """
     try:
         # Check if test case exists
-        existing = get_test_case_by_id(test_case_id)
+        existing = get_test_case_by_id(test_case_id, conn=db)
         if not existing:
             raise HTTPException(status_code=404, detail=f"Test case {test_case_id} not found")
         
         # Validate target project if provided
         if request.target_project_id is not None:
-            project = get_project_by_id(request.target_project_id)
+            project = get_project_by_id(request.target_project_id, conn=db)
             if not project:
                 raise HTTPException(status_code=404, detail=f"Target project {request.target_project_id} not found")
         
         # Move the test case
-        success = move_test_case_to_project(test_case_id, request.target_project_id)
+        success = move_test_case_to_project(test_case_id, request.target_project_id, conn=db)
         if not success:
             raise HTTPException(status_code=500, detail="Failed to move test case")
         
         # Fetch and return the updated test case
-        updated = get_test_case_by_id(test_case_id)
+        updated = get_test_case_by_id(test_case_id, conn=db)
         if not updated:
             raise HTTPException(status_code=500, detail="Test case moved but could not be retrieved")
         return updated
@@ -234,7 +240,8 @@ async def move_test_case(test_case_id: int, request: TestCaseMoveRequest):
 
 
 @router.post("/{test_case_id}/duplicate", response_model=TestCaseResponse, status_code=201)
-async def duplicate_test_case_endpoint(test_case_id: int, request: TestCaseDuplicateRequest):
+async def duplicate_test_case_endpoint(test_case_id: int, request: TestCaseDuplicateRequest,
+                                       db: sqlite3.Connection = Depends(get_db, scope="function")):
     """
     Duplicate a test case with all its steps and screenshots.
     
@@ -247,23 +254,23 @@ async def duplicate_test_case_endpoint(test_case_id: int, request: TestCaseDupli
     """
     try:
         # Check if test case exists
-        existing = get_test_case_by_id(test_case_id)
+        existing = get_test_case_by_id(test_case_id, conn=db)
         if not existing:
             raise HTTPException(status_code=404, detail=f"Test case {test_case_id} not found")
         
         # Validate target project if provided
         if request.target_project_id is not None:
-            project = get_project_by_id(request.target_project_id)
+            project = get_project_by_id(request.target_project_id, conn=db)
             if not project:
                 raise HTTPException(status_code=404, detail=f"Target project {request.target_project_id} not found")
         
         # Duplicate the test case (function handles project_id fallback internally)
-        new_test_case_id = duplicate_test_case(test_case_id, request.new_test_number, request.target_project_id)
+        new_test_case_id = duplicate_test_case(test_case_id, request.new_test_number, request.target_project_id, conn=db)
         if not new_test_case_id:
             raise HTTPException(status_code=500, detail="Failed to duplicate test case")
         
         # Fetch and return the created test case
-        created = get_test_case_by_id(new_test_case_id)
+        created = get_test_case_by_id(new_test_case_id, conn=db)
         if not created:
             raise HTTPException(status_code=500, detail="Test case duplicated but could not be retrieved")
         return created
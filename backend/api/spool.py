@@ -0,0 +1,60 @@
+"""
+Managed spool for export output.
+
+Exports are written into a SpooledTemporaryFile: small builds stay in memory,
+larger ones roll over to an anonymous file in the spool directory. The file
+is streamed to the client in chunks and closed once the last chunk is sent.
+
+The rolled-over file never has a name (O_TMPFILE, or unlinked as soon as it
+is created), so the kernel frees it when its descriptor is closed, including
+when the process crashes: nothing can be left behind in the spool directory
+and no cleanup sweep is needed.
+
+Configuration (environment variables):
+- EXPORT_SPOOL_DIR: spool directory (default: <system temp>/tc_export_spool)
+- EXPORT_SPOOL_MEMORY_MB: in-memory threshold before rolling over to disk (default: 32)
+"""
+
+import os
+import tempfile
+from pathlib import Path
+
+SPOOL_DIR = Path(os.environ.get("EXPORT_SPOOL_DIR", Path(tempfile.gettempdir()) / "tc_export_spool"))
+SPOOL_MEMORY_THRESHOLD = int(os.environ.get("EXPORT_SPOOL_MEMORY_MB", "32")) * 1024 * 1024
+STREAM_CHUNK_SIZE = 256 * 1024
+
+
+def open_spool_file(suffix: str = ""):
+    """
+    Open a spooled buffer for one export build.
+
+    The buffer lives in memory up to SPOOL_MEMORY_THRESHOLD bytes and then
+    rolls over to a temporary file in SPOOL_DIR.
+    """
+    SPOOL_DIR.mkdir(parents=True, exist_ok=True)
+    return tempfile.SpooledTemporaryFile(
+        max_size=SPOOL_MEMORY_THRESHOLD,
+        mode="w+b",
+        suffix=suffix,
+        prefix="export_",
+        dir=str(SPOOL_DIR)
+    )
+
+
+def iter_spool_file(spool_file, chunk_size: int = STREAM_CHUNK_SIZE):
+    """
+    Yield the content of a spooled buffer in chunks, then close it.
+
+    Closing happens even if the client disconnects mid-stream, so the
+    buffer (and any rolled-over file) is always released.
+    """
+    try:
+        spool_file.seek(0)
+        while True:
+            chunk = spool_file.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        spool_file.close()
+
@@ -0,0 +1,137 @@
+"""
+Screenshot thumbnails with an on-disk cache.
+
+Thumbnails are resized with Pillow in a small worker pool (off the event
+loop) and stored as <cache dir>/<sha256 of the original>_<width>.<format>.
+Keying by content rather than screenshot ID means identical screenshots
+share their thumbnails and a replaced file never serves a stale one.
+Requested widths are rounded up to a multiple of WIDTH_STEP so the cache
+holds a handful of sizes per image. Concurrent requests for the same
+thumbnail wait for a single generation.
+
+Configuration (environment variables):
+- THUMBNAIL_CACHE_DIR: cache directory (default: <project root>/uploads/.thumbnails)
+- THUMBNAIL_WORKERS: resize worker threads (default: 4)
+"""
+
+import asyncio
+import hashlib
+import os
+import sys
+import tempfile
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+# Add project root to path to import shared modules
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from shared.thumbnails import write_thumbnail
+
+THUMBNAIL_CACHE_DIR = Path(os.environ.get(
+    "THUMBNAIL_CACHE_DIR", Path(__file__).parent.parent.parent / "uploads" / ".thumbnails"
+))
+THUMBNAIL_WORKERS = int(os.environ.get("THUMBNAIL_WORKERS", "4"))
+
+DEFAULT_WIDTH = 256
+MIN_WIDTH = 32
+MAX_WIDTH = 1600
+WIDTH_STEP = 32
+# Format -> (Pillow format, media type, save options)
+THUMBNAIL_FORMATS = {
+    "jpeg": ("JPEG", "image/jpeg", {"quality": 80, "optimize": True}),
+    "webp": ("WEBP", "image/webp", {"quality": 80, "method": 4}),
+}
+# Thumbnail URLs are per screenshot and width; the rounding rules may change, so no "immutable"
+THUMBNAIL_CACHE_CONTROL = "public, max-age=86400"
+HASH_CHUNK_SIZE = 256 * 1024
+HASH_CACHE_SIZE = 4096
+
+_executor = ThreadPoolExecutor(max_workers=THUMBNAIL_WORKERS, thread_name_prefix="thumbnail")
+_hash_cache = OrderedDict()  # (path, mtime_ns, size) -> sha256, least recently used first
+_pending = {}  # (source path, width, format) -> future of a running generation
+
+
+def normalize_width(width) -> int:
+    """Clamp a requested width to [MIN_WIDTH, MAX_WIDTH], rounded up to a multiple of WIDTH_STEP."""
+    width = min(max(int(width or DEFAULT_WIDTH), MIN_WIDTH), MAX_WIDTH)
+    return -(-width // WIDTH_STEP) * WIDTH_STEP
+
+
+def choose_format(requested=None, accept_header: str = "") -> str:
+    """Use the requested format, else WebP when the client accepts it, else JPEG."""
+    if requested:
+        requested = requested.lower().replace("jpg", "jpeg")
+        if requested not in THUMBNAIL_FORMATS:
+            raise ValueError(f"Unsupported thumbnail format '{requested}' (expected jpeg or webp)")
+        return requested
+    return "webp" if "image/webp" in (accept_header or "") else "jpeg"
+
+
+def content_hash(path: str) -> str:
+    """SHA-256 of a file, remembered per (path, mtime, size) so unchanged files are read once."""
+    stat = os.stat(path)
+    key = (path, stat.st_mtime_ns, stat.st_size)
+    digest = _hash_cache.get(key)
+    if digest is not None:
+        _hash_cache.move_to_end(key)
+        return digest
+
+    sha256 = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            sha256.update(chunk)
+    digest = sha256.hexdigest()
+    _hash_cache[key] = digest
+    if len(_hash_cache) > HASH_CACHE_SIZE:
+        _hash_cache.popitem(last=False)
+    return digest
+
+
+def render_thumbnail(source_path: str, target_path: Path, width: int, image_format: str):
+    """Resize source_path to width (keeping the aspect ratio) and write it atomically to target_path."""
+    pil_format, _, options = THUMBNAIL_FORMATS[image_format]
+    target_path.parent.mkdir(parents=True, exist_ok=True)
+    handle, temp_path = tempfile.mkstemp(dir=target_path.parent, suffix=".part")
+    try:
+        with os.fdopen(handle, "wb") as out:
+            write_thumbnail(source_path, out, width, pil_format, **options)
+        os.replace(temp_path, target_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def _cached_thumbnail(source_path: str, width: int, image_format: str) -> Path:
+    """Worker: return the cache path of a thumbnail, generating it when missing."""
+    extension = "jpg" if image_format == "jpeg" else image_format
+    target_path = THUMBNAIL_CACHE_DIR / f"{content_hash(source_path)}_{width}.{extension}"
+    if not target_path.exists():
+        render_thumbnail(source_path, target_path, width, image_format)
+    return target_path
+
+
+async def get_thumbnail(source_path: str, width: int, image_format: str = "jpeg") -> Path:
+    """
+    Return the path of a cached thumbnail for an image, generating it in the worker pool if needed.
+
+    Args:
+        source_path: Path of the original image
+        width: Thumbnail width in pixels (normalized with normalize_width)
+        image_format: "jpeg" or "webp"
+
+    Returns:
+        Path of the thumbnail file in THUMBNAIL_CACHE_DIR
+    """
+    key = (source_path, width, image_format)
+    future = _pending.get(key)
+    if future is None:
+        loop = asyncio.get_running_loop()
+        future = asyncio.ensure_future(
+            loop.run_in_executor(_executor, _cached_thumbnail, source_path, width, image_format)
+        )
+        _pending[key] = future
+        future.add_done_callback(lambda _: _pending.pop(key, None))
+    return await asyncio.shield(future)
@@ -0,0 +1,151 @@
+"""
+Streaming storage for uploaded files.
+
+Uploads are copied to disk in fixed-size chunks (never read whole into
+memory). While copying, the content is hashed and its size checked against
+the limit, and the first bytes are matched against known image signatures.
+Data goes to a temporary file in the target directory that is renamed into
+place only once complete, so a failed or rejected upload never leaves a
+partial file under its final name.
+
+Configuration (environment variables):
+- UPLOAD_MAX_MB: largest accepted upload (default: 200, the limit the frontend enforces)
+"""
+
+import errno
+import hashlib
+import os
+import tempfile
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional
+
+MAX_UPLOAD_BYTES = int(os.environ.get("UPLOAD_MAX_MB", "200")) * 1024 * 1024
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Leading bytes -> file extension
+IMAGE_SIGNATURES = (
+    (b"\x89PNG\r\n\x1a\n", ".png"),
+    (b"\xff\xd8\xff", ".jpg"),
+    (b"GIF87a", ".gif"),
+    (b"GIF89a", ".gif"),
+    (b"BM", ".bmp"),
+)
+SIGNATURE_BYTES = 12
+
+# os.link errors meaning the filesystem cannot hard-link (rather than a real failure)
+NO_HARD_LINK_ERRNOS = {errno.EPERM, errno.ENOTSUP, errno.EOPNOTSUPP, errno.EXDEV}
+
+
+class UploadTooLarge(ValueError):
+    """The upload exceeds MAX_UPLOAD_BYTES."""
+
+
+class UnsupportedUpload(ValueError):
+    """The upload is not one of the accepted image types."""
+
+
+def detect_image_type(head: bytes) -> Optional[str]:
+    """Return the file extension for the image signature at the start of head, or None."""
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return ".webp"
+    for signature, extension in IMAGE_SIGNATURES:
+        if head.startswith(signature):
+            return extension
+    return None
+
+
+def claim_name(temp_path: str, target_dir: Path, stem: str, extension: str) -> Path:
+    """
+    Move a finished temporary file to <stem><extension>, or <stem>_<n><extension> if taken.
+
+    Hard-linking fails when the name exists, so concurrent uploads of the
+    same content never end up sharing (or overwriting) one file. Where the
+    filesystem has no hard links the name is reserved by creating it
+    exclusively, then the temporary file is renamed over that placeholder.
+    """
+    final_path = target_dir / f"{stem}{extension}"
+    counter = 1
+    use_links = True
+    while True:
+        try:
+            if use_links:
+                os.link(temp_path, final_path)
+            else:
+                os.close(os.open(final_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+        except FileExistsError:
+            final_path = target_dir / f"{stem}_{counter}{extension}"
+            counter += 1
+            continue
+        except OSError as e:
+            if not use_links or e.errno not in NO_HARD_LINK_ERRNOS:
+                raise
+            use_links = False
+            continue
+        if use_links:
+            os.remove(temp_path)
+        else:
+            os.replace(temp_path, final_path)
+        return final_path
+
+
+def store_upload(source, target_dir: Path, filename_stem: str, validate_image: bool = True,
+                 extension: Optional[str] = None, max_bytes: Optional[int] = None) -> Dict:
+    """
+    Copy an uploaded file to target_dir in chunks, hashing and validating as it goes.
+
+    Blocking: call it from a worker thread (run_in_threadpool).
+
+    Args:
+        source: Readable binary file object (e.g. UploadFile.file)
+        target_dir: Directory for the stored file (created if needed)
+        filename_stem: File name without extension (numbered if the name is taken, see claim_name)
+        validate_image: Require a PNG / JPEG / GIF / BMP / WebP signature; the
+            extension then comes from the detected type
+        extension: Extension to use when validate_image is False
+        max_bytes: Size limit (default MAX_UPLOAD_BYTES)
+
+    Returns:
+        dict: {"file_path", "sha256", "size"}
+
+    Raises:
+        UploadTooLarge: The upload exceeds the limit
+        UnsupportedUpload: validate_image is set and the content is not a supported image
+    """
+    max_bytes = max_bytes or MAX_UPLOAD_BYTES
+    target_dir = Path(target_dir)
+    target_dir.mkdir(parents=True, exist_ok=True)
+
+    digest = hashlib.sha256()
+    size = 0
+    handle, temp_path = tempfile.mkstemp(dir=target_dir, prefix=".upload_", suffix=".part")
+    try:
+        with os.fdopen(handle, "wb") as dest:
+            head = source.read(max(SIGNATURE_BYTES, UPLOAD_CHUNK_SIZE))
+            if validate_image:
+                extension = detect_image_type(head[:SIGNATURE_BYTES])
+                if extension is None:
+                    raise UnsupportedUpload("Unsupported file type (expected PNG, JPEG, GIF, BMP or WebP)")
+
+            chunk = head
+            while chunk:
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadTooLarge(f"File exceeds the {max_bytes // (1024 * 1024)} MB upload limit")
+                digest.update(chunk)
+                dest.write(chunk)
+                chunk = source.read(UPLOAD_CHUNK_SIZE)
+
+        content_hash = digest.hexdigest()
+        final_path = claim_name(temp_path, target_dir, filename_stem, extension or "")
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+    return {"file_path": str(final_path), "sha256": content_hash, "size": size}
+
+
+def timestamped_stem(prefix: str) -> str:
+    """File name stem with the upload time, e.g. screenshot_20260131_221500."""
+    return f"{prefix}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Test script for response compression and the orjson response class.
+Runs against a throwaway database through FastAPI's TestClient (no server needed).
+"""
+
+import json
+import sys
+
+from testing_utils import seed_once, use_temp_database, get_client, run_tests
+from shared import models
+
+
+@seed_once
+def seed_database():
+    """Create an isolated database with enough test cases for a compressible list."""
+    use_temp_database("tc_api_responses_")
+
+    project_id = models.create_project("Responses", "Compression test project")
+    test_case_ids = [
+        models.create_test_case(f"TC-RESP-{i}", f"Check the market value of position {i} ü€", project_id)
+        for i in range(50)
+    ]
+    return {"project_id": project_id, "test_case_ids": test_case_ids}
+
+
+def test_encoding_negotiation():
+    """Accept-Encoding q-values decide; ties go to the server's preference."""
+    print("=" * 60)
+    print("TEST: Encoding negotiation")
+    print("=" * 60)
+
+    from api import compression
+    preferred = "br" if compression.brotli is not None else "gzip"
+    assert compression.choose_encoding("gzip, deflate, br") == preferred
+    assert compression.choose_encoding("br;q=0.5, gzip") == "gzip"
+    assert compression.choose_encoding("gzip;q=0") is None
+    assert compression.choose_encoding("*") == preferred
+    assert compression.choose_encoding("identity") is None
+    assert compression.choose_encoding("") is None
+    print(f"   ✅ Preferred encoding: {preferred}")
+
+
+def test_json_list_compressed():
+    """List responses are compressed when accepted; small ones and identity requests are not."""
+    print("\n" + "=" * 60)
+    print("TEST: Compressed JSON list")
+    print("=" * 60)
+
+    data = seed_database()
+    client = get_client()
+    url = f"/api/projects/{data['project_id']}/test-cases"
+
+    compressed = client.get(url, headers={"Accept-Encoding": "gzip"})
+    assert compressed.status_code == 200, compressed.text
+    assert compressed.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in compressed.headers["vary"]
+    assert int(compressed.headers["content-length"]) < len(compressed.content) / 3
+
+    plain = client.get(url, headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in plain.headers
+    assert "Accept-Encoding" in plain.headers["vary"]
+    assert plain.json() == compressed.json()
+    assert len(plain.json()) == len(data["test_case_ids"])
+    # orjson writes UTF-8 directly, like the standard encoder with ensure_ascii=False
+    assert "ü€" in plain.content.decode("utf-8")
+
+    small = client.get("/health", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in small.headers
+    print(f"   ✅ {len(plain.content)} bytes -> {compressed.headers['content-length']} bytes gzip")
+
+
+def test_streamed_export_compressed():
+    """Streamed text exports are compressed chunk by chunk; ZIP downloads are left alone."""
+    print("\n" + "=" * 60)
+    print("TEST: Compressed streamed export")
+    print("=" * 60)
+
+    data = seed_database()
+    client = get_client()
+    body = {"project_ids": [data["project_id"]], "format": "csv"}
+
+    response = client.post("/api/export", json=body, headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200, response.text
+    assert response.headers["content-encoding"] == "gzip"
+    assert "content-length" not in response.headers
+    plain = client.post("/api/export", json=body, headers={"Accept-Encoding": "identity"})
+    assert response.content == plain.content
+
+    bundle = client.post("/api/export", json={**body, "format": "html"}, headers={"Accept-Encoding": "gzip"})
+    assert bundle.headers["content-type"] == "application/zip"
+    assert "content-encoding" not in bundle.headers
+    print(f"   ✅ CSV {len(plain.content)} bytes streamed gzip; ZIP untouched")
+
+
+def test_fast_json_response():
+    """FastJSONResponse renders the same JSON as the standard encoder."""
+    print("\n" + "=" * 60)
+    print("TEST: FastJSONResponse")
+    print("=" * 60)
+
+    from fastapi.responses import JSONResponse
+    from api.responses import FastJSONResponse
+    content = {"id": 1, "text": "a = b * c\nü", "items": [1.5, None, True], 2: "non-string key"}
+    assert json.loads(FastJSONResponse(content).body) == json.loads(JSONResponse(content).body)
+    print("   ✅ Same JSON")
+
+
+def main():
+    """Run all tests"""
+    tests = [
+        ("Encoding negotiation", test_encoding_negotiation),
+        ("Compressed JSON list", test_json_list_compressed),
+        ("Compressed streamed export", test_streamed_export_compressed),
+        ("FastJSONResponse", test_fast_json_response),
+    ]
+    return run_tests(tests)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
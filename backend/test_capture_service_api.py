@@ -0,0 +1,501 @@
+#!/usr/bin/env python3
+"""
+Test script for the capture service file endpoints (config, capture directory files).
+Uses a throwaway capture directory and config through FastAPI's TestClient (no server
+and no running capture service needed).
+"""
+
+import os
+import sys
+from pathlib import Path
+
+from testing_utils import seed_once, use_temp_database, get_client, run_tests
+from shared import models
+
+PNG_BYTES = b"\x89PNG\r\n\x1a\n" + b"\x00" * 64
+
+
+def write_config(config_path: Path, capture_dir: Path):
+    """Write a minimal capture service config.py pointing at capture_dir."""
+    config_path.write_text(
+        "from pathlib import Path\n"
+        f"SCREENSHOTS_DIR = Path({str(capture_dir)!r})\n"
+        f"RUN_DIR = Path({str(config_path.parent / 'run')!r})\n"
+        "SCREENSHOTS_DIR.mkdir(parents=True, exist_ok=True)\n"
+    )
+
+
+@seed_once
+def seed_environment():
+    """Create an isolated database, capture directory and config.py."""
+    from api import capture_config
+
+    root = use_temp_database("tc_capture_")
+
+    capture_dir = (root / "Capture_TC").resolve()
+    config_path = root / "config.py"
+    write_config(config_path, capture_dir)
+    capture_config.CAPTURE_CONFIG_PATH = config_path
+    capture_config.clear_cache()
+
+    from api.routes import steps
+    steps.UPLOAD_ROOT = root / "uploads"
+
+    capture_dir.mkdir()
+    (capture_dir / "TC01_step1.png").write_bytes(PNG_BYTES)
+    (capture_dir / "TC01_step1.txt").write_text("Open the portfolio")
+    (root / "outside.png").write_bytes(PNG_BYTES)
+
+    return {"root": root, "capture_dir": capture_dir, "config_path": config_path}
+
+
+def test_config_cached():
+    """config.py is executed once and reloaded only when the file changes."""
+    print("=" * 60)
+    print("TEST: Cached capture config")
+    print("=" * 60)
+
+    from api import capture_config
+    env = seed_environment()
+    client = get_client()
+
+    first = capture_config.load_capture_config()
+    assert capture_config.load_capture_config() is first
+    response = client.get("/api/capture-service/capture-directory")
+    assert response.status_code == 200, response.text
+    assert response.json()["capture_directory_expanded"] == str(env["capture_dir"])
+    assert capture_config.load_capture_config() is first
+
+    # Point the config somewhere else: the change is picked up without a restart
+    other_dir = (env["root"] / "Other_TC").resolve()
+    write_config(env["config_path"], other_dir)
+    stat = env["config_path"].stat()
+    os.utime(env["config_path"], ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert capture_config.get_capture_dir() == other_dir
+    assert capture_config.load_capture_config() is not first
+
+    write_config(env["config_path"], env["capture_dir"])
+    os.utime(env["config_path"], ns=(stat.st_atime_ns, stat.st_mtime_ns + 2_000_000_000))
+    assert capture_config.get_capture_dir() == env["capture_dir"]
+    print("   ✅ Loaded once, reloaded on change")
+
+
+def test_get_file_restricted_to_capture_dir():
+    """/get-file serves files from the capture directory only."""
+    print("\n" + "=" * 60)
+    print("TEST: /get-file security check")
+    print("=" * 60)
+
+    env = seed_environment()
+    client = get_client()
+
+    inside = client.get("/api/capture-service/get-file", params={"path": str(env["capture_dir"] / "TC01_step1.png")})
+    assert inside.status_code == 200, inside.text
+    assert inside.content == PNG_BYTES
+    assert inside.headers["content-type"] == "image/png"
+
+    outside = client.get("/api/capture-service/get-file", params={"path": str(env["root"] / "outside.png")})
+    assert outside.status_code == 403
+    print("   ✅ Inside served, outside rejected")
+
+
+def test_capture_files_index():
+    """/capture-files pages, filters and pairs files, with an ETag that changes only on changes."""
+    print("\n" + "=" * 60)
+    print("TEST: Capture file index")
+    print("=" * 60)
+
+    env = seed_environment()
+    client = get_client()
+    capture_dir = env["capture_dir"]
+    url = "/api/capture-service/capture-files"
+    for i in range(2, 6):
+        (capture_dir / f"TC02_step{i}.png").write_bytes(PNG_BYTES)
+        os.utime(capture_dir / f"TC02_step{i}.png", (1_000_000 + i, 1_000_000 + i))
+    (capture_dir / "notes.md").write_text("not indexed")
+
+    response = client.get(url)
+    assert response.status_code == 200, response.text
+    data = response.json()
+    names = [f["name"] for f in data["files"]]
+    assert data["total"] == 6 and len(names) == 6
+    assert "notes.md" not in names
+    by_name = {f["name"]: f for f in data["files"]}
+    assert by_name["TC01_step1.png"]["pair"] == "TC01_step1.txt"
+    assert by_name["TC01_step1.txt"]["pair"] == "TC01_step1.png"
+    assert by_name["TC02_step2.png"]["pair"] is None
+    # Newest first
+    assert names[-4:] == ["TC02_step5.png", "TC02_step4.png", "TC02_step3.png", "TC02_step2.png"]
+
+    page = client.get(url, params={"prefix": "tc02", "kind": "image", "offset": 1, "limit": 2}).json()
+    assert page["total"] == 4
+    assert [f["name"] for f in page["files"]] == ["TC02_step4.png", "TC02_step3.png"]
+    assert client.get(url, params={"kind": "text"}).json()["total"] == 1
+    assert client.get(url, params={"kind": "pdf"}).status_code == 422
+
+    # Unchanged directory: conditional request answered with 304
+    etag = response.headers["etag"]
+    assert client.get(url).headers["etag"] == etag
+    not_modified = client.get(url, headers={"If-None-Match": etag})
+    assert not_modified.status_code == 304
+    assert not_modified.content == b""
+
+    # Added and removed files show up and change the ETag
+    (capture_dir / "TC03_step1.png").write_bytes(PNG_BYTES)
+    changed = client.get(url, headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+    assert changed.json()["files"][0]["name"] == "TC03_step1.png"
+    (capture_dir / "TC03_step1.png").unlink()
+    assert "TC03_step1.png" not in [f["name"] for f in client.get(url).json()["files"]]
+    print(f"   ✅ {data['total']} files indexed; filters, pages, pairs and 304 work")
+
+
+def test_upload_keeps_pairs():
+    """An image and its description uploaded together keep one stem, so they stay paired."""
+    print("\n" + "=" * 60)
+    print("TEST: Uploaded files stay paired")
+    print("=" * 60)
+
+    import hashlib
+    from unittest import mock
+    from api.routes import capture_service
+    env = seed_environment()
+    client = get_client()
+
+    uploaded = []
+    with mock.patch.object(capture_service, "timestamped_stem", lambda prefix: f"{prefix}_20260101_120000"):
+        for name, content in (("TC04_login.png", PNG_BYTES), ("TC04_login.txt", b"Log in")):
+            response = client.post("/api/capture-service/upload-file", files={"file": (name, content)})
+            assert response.status_code == 200, response.text
+            data = response.json()
+            assert data["sha256"] == hashlib.sha256(content).hexdigest() and data["size"] == len(content)
+            uploaded.append(data["filename"])
+    assert uploaded == ["TC04_login_20260101_120000.png", "TC04_login_20260101_120000.txt"]
+
+    files = client.get("/api/capture-service/capture-files", params={"prefix": "TC04"}).json()["files"]
+    pairs = {f["name"]: f["pair"] for f in files}
+    assert pairs == {uploaded[0]: uploaded[1], uploaded[1]: uploaded[0]}
+    for name in uploaded:
+        (env["capture_dir"] / name).unlink()
+    print("   ✅ Image and description stored under one stem and paired")
+
+
+def start_fake_service():
+    """Serve GET /status on a free local port; returns (server, hit counter)."""
+    import json
+    import threading
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    hits = {"status": 0}
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            hits["status"] += 1
+            body = json.dumps({"status": "running", "watcher_running": True}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, hits
+
+
+def test_status_cache_and_circuit_breaker():
+    """Status polls share one cached call; a down service opens the circuit."""
+    print("\n" + "=" * 60)
+    print("TEST: Status cache and circuit breaker")
+    print("=" * 60)
+
+    import time
+    from api import capture_client
+    seed_environment()
+    client = get_client()
+    url = "/api/capture-service/status"
+
+    server, hits = start_fake_service()
+    original_url = capture_client.SERVICE_URL
+    capture_client.SERVICE_URL = f"http://127.0.0.1:{server.server_address[1]}"
+    capture_client._client = None
+    capture_client.invalidate_status()
+    original_ttl = capture_client.STATUS_CACHE_SECONDS
+    try:
+        capture_client.STATUS_CACHE_SECONDS = 30
+        for _ in range(3):
+            data = client.get(url).json()
+            assert data["service_running"] is True and data["watcher_running"] is True
+            assert data["status"] == "on"
+        assert hits["status"] == 1, hits
+
+        # Service goes down: failures open the circuit, then polls make no calls
+        server.shutdown()
+        server.server_close()
+        capture_client.STATUS_CACHE_SECONDS = 0
+        capture_client.invalidate_status()
+        for _ in range(capture_client.FAILURE_THRESHOLD):
+            assert client.get(url).json()["service_running"] is False
+        assert capture_client.breaker.state == "open"
+        start = time.perf_counter()
+        data = client.get(url).json()
+        assert data["service_running"] is False and data["watcher_running"] is False
+        assert time.perf_counter() - start < 1.0
+
+        # After the open period, one probe is let through (half-open); failing it doubles the wait
+        capture_client.breaker.opened_until = 0.0
+        assert capture_client.breaker.state == "half-open"
+        client.get(url)
+        assert capture_client.breaker.state == "open"
+        assert capture_client.breaker._current_open_seconds == 2 * capture_client.OPEN_SECONDS
+    finally:
+        capture_client.STATUS_CACHE_SECONDS = original_ttl
+        capture_client.SERVICE_URL = original_url
+        capture_client._client = None
+        capture_client.invalidate_status()
+    print("   ✅ 3 polls -> 1 service call; open circuit answers without calling")
+
+
+def test_process_registry():
+    """Service liveness comes from its PID file, verified against the process create time."""
+    print("\n" + "=" * 60)
+    print("TEST: Process registry")
+    print("=" * 60)
+
+    import json
+    import subprocess
+    from api import capture_processes
+    env = seed_environment()
+    client = get_client()
+    registry = capture_processes.get_registry()
+    name = capture_processes.process_registry.SERVICE
+    assert registry.run_dir == env["root"] / "run"
+
+    assert capture_processes.is_service_process_running() is False
+    child = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(30)"])
+    try:
+        registry.register(name, pid=child.pid)
+        entry = capture_processes.get_service_process()
+        assert entry["pid"] == child.pid and entry["responsive"] is True
+        data = client.get("/api/capture-service/status").json()
+        assert data["service_process_running"] is True
+        assert data["status"] == "starting"  # process up, API not answering
+
+        # No heartbeat for a while: alive but not responsive
+        old = entry["started_at"] - 3600
+        os.utime(registry.path(name), (old, old))
+        assert capture_processes.get_service_process()["responsive"] is False
+    finally:
+        child.kill()
+        child.wait()
+
+    # Dead process: the stale PID file is removed
+    assert capture_processes.is_service_process_running() is False
+    assert not registry.path(name).exists()
+
+    # Reused PID (create time differs): not our process
+    registry.register(name, pid=os.getpid())
+    entry = json.loads(registry.path(name).read_text())
+    entry["create_time"] -= 100
+    registry.path(name).write_text(json.dumps(entry))
+    assert capture_processes.is_service_process_running() is False
+    assert not registry.path(name).exists()
+    print("   ✅ Live, unresponsive, dead and reused PIDs detected")
+
+
+def test_ingest_file():
+    """Files are linked or cloned when possible and copied otherwise, never overwriting."""
+    print("\n" + "=" * 60)
+    print("TEST: File ingestion")
+    print("=" * 60)
+
+    from api import ingest
+    env = seed_environment()
+    source = env["capture_dir"] / "TC01_step1.png"
+    target_dir = env["root"] / "ingest_test"
+
+    first = ingest.ingest_file(source, target_dir, "shot")
+    assert first["method"] in ("reflink", "link")
+    assert Path(first["file_path"]).name == "shot.png"
+    assert Path(first["file_path"]).read_bytes() == PNG_BYTES
+
+    original = ingest.HARD_LINKS
+    ingest.HARD_LINKS = False
+    try:
+        second = ingest.ingest_file(source, target_dir, "shot")
+    finally:
+        ingest.HARD_LINKS = original
+    assert second["method"] in ("reflink", "copy")
+    assert Path(second["file_path"]).name == "shot_1.png"
+    assert os.stat(second["file_path"]).st_ino != source.stat().st_ino
+    assert Path(second["file_path"]).read_bytes() == PNG_BYTES
+    assert not list(target_dir.glob(".ingest_*"))
+    print(f"   ✅ {first['method']} then {second['method']}")
+
+
+def test_load_step_ingests_images():
+    """Loading a step brings all selected images in and records them in order."""
+    print("\n" + "=" * 60)
+    print("TEST: Load step from capture files")
+    print("=" * 60)
+
+    env = seed_environment()
+    client = get_client()
+    capture_dir = env["capture_dir"]
+    project_id = models.create_project("Capture", "Load step test project")
+    test_case_id = models.create_test_case("TC-LOAD-1", "Load step", project_id)
+    images = []
+    for i in range(6):
+        path = capture_dir / f"TC-LOAD-1_shot{i}.png"
+        path.write_bytes(PNG_BYTES + bytes([i]))
+        images.append(str(path))
+
+    response = client.post(f"/api/test-cases/{test_case_id}/steps/load", json={
+        "description": "",
+        "image_paths": images,
+        "description_file_path": str(capture_dir / "TC01_step1.txt"),
+    })
+    assert response.status_code == 201, response.text
+    step = response.json()
+    assert step["description"] == "Open the portfolio"
+    screenshots = models.get_screenshots_by_step(step["id"])
+    assert len(screenshots) == 6
+    for i, screenshot in enumerate(screenshots):
+        stored = Path(screenshot["file_path"])
+        assert stored.is_relative_to(env["root"] / "uploads")
+        assert stored.read_bytes() == PNG_BYTES + bytes([i])
+
+    # Anything outside the capture directory is rejected before a step is created
+    rejected = client.post(f"/api/test-cases/{test_case_id}/steps/load", json={
+        "description": "Outside", "image_paths": [images[0], str(env["root"] / "outside.png")],
+    })
+    assert rejected.status_code == 403
+    assert len(models.get_steps_by_test_case(test_case_id)) == 1
+
+    # One image failing to copy: no step, and the images already copied are removed
+    from unittest import mock
+    from api.routes import steps
+    real_ingest = steps.ingest_files
+    linked = []
+
+    async def failing_ingest(items):
+        results = await real_ingest(items)
+        linked.extend(result["file_path"] for result in results[:-1])
+        return results[:-1] + [OSError("disk full")]
+
+    with mock.patch.object(steps, "ingest_files", failing_ingest):
+        failed = client.post(f"/api/test-cases/{test_case_id}/steps/load", json={
+            "description": "Partial", "image_paths": images[:3],
+        })
+    assert failed.status_code == 500
+    assert "TC-LOAD-1_shot2.png (disk full)" in failed.json()["detail"], failed.text
+    assert len(linked) == 2 and not any(Path(path).exists() for path in linked)
+    assert len(models.get_steps_by_test_case(test_case_id)) == 1
+    print(f"   ✅ Step {step['step_number']} loaded with {len(screenshots)} screenshots")
+
+
+def test_load_pending_captures():
+    """Pending captures are grouped into steps per test case, created together and archived."""
+    print("\n" + "=" * 60)
+    print("TEST: Load all pending captures")
+    print("=" * 60)
+
+    from api.pending_captures import plan_steps
+    env = seed_environment()
+    client = get_client()
+    capture_dir = env["capture_dir"]
+    project_id = models.create_project("Bulk", "Bulk load test project")
+    first_id = models.create_test_case("TC-BULK-1", "Bulk load", project_id)
+    second_id = models.create_test_case("TC-BULK-2", "Bulk load", project_id)
+    models.create_test_step(first_id, 1, "Existing step")
+
+    t0 = 1_700_000_000
+    captures = [
+        ("TC-BULK-1_login", "Log in", 0),
+        ("TC-BULK-1_login_1", "Log in", 10),
+        ("TC-BULK-1_menu", "", 20),
+        ("TC-BULK-1_report", "Open report", 30),
+        ("TC-BULK-1_report_2", None, 1000),
+        ("TC-BULK-2_home", "Home", 5),
+        ("TC-BULKX_other", "Unknown test case", 5),
+    ]
+    for stem, description, offset in captures:
+        image = capture_dir / f"{stem}.png"
+        image.write_bytes(PNG_BYTES)
+        os.utime(image, (t0 + offset, t0 + offset))
+        if description is not None:
+            (capture_dir / f"{stem}.txt").write_text(description)
+
+    preview = client.post("/api/steps/load-pending", json={"project_id": project_id, "dry_run": True})
+    assert preview.status_code == 200, preview.text
+    planned = preview.json()["steps"]
+    assert [(s["test_number"], s["description"], len(s["files"])) for s in planned] == [
+        ("TC-BULK-1", "Log in", 3),
+        ("TC-BULK-1", "Open report", 1),
+        ("TC-BULK-1", "report 2", 1),
+        ("TC-BULK-2", "Home", 1),
+    ]
+    assert "TC-BULKX_other.png" in preview.json()["unmatched"]
+    assert len(models.get_steps_by_test_case(first_id)) == 1
+
+    response = client.post("/api/steps/load-pending", json={"project_id": project_id, "archive": True})
+    assert response.status_code == 200, response.text
+    result = response.json()
+    assert [s["step_number"] for s in result["steps"]] == [2, 3, 4, 1]
+    assert result["failed"] == []
+    assert result["archived"] == 11
+    steps = models.get_steps_by_test_case(first_id)
+    assert [s["description"] for s in steps] == ["Existing step", "Log in", "Open report", "report 2"]
+    screenshots = models.get_screenshots_by_step(steps[1]["id"])
+    assert len(screenshots) == 3
+    assert all(Path(s["file_path"]).read_bytes() == PNG_BYTES for s in screenshots)
+
+    # Consumed files are archived (and no longer listed), the others stay pending
+    assert not list(capture_dir.glob("TC-BULK-*"))
+    assert (capture_dir / "TC-BULKX_other.png").exists()
+    assert len(list((capture_dir / "archive").glob("*/TC-BULK-*"))) == 11
+    listed = client.get("/api/capture-service/capture-files", params={"prefix": "TC-BULK-"}).json()
+    assert listed["files"] == []
+    again = client.post("/api/steps/load-pending", json={"project_id": project_id})
+    assert again.json()["steps"] == []
+
+    # The same test number in two projects cannot be attributed
+    plan = plan_steps(
+        [{"name": "TC9_a.png", "path": str(capture_dir / "TC9_a.png"), "modified": t0, "kind": "image", "pair": None}],
+        [{"id": 1, "test_number": "TC9"}, {"id": 2, "test_number": "TC9"}],
+    )
+    assert plan["steps"] == [] and plan["ambiguous"] == ["TC9_a.png"]
+
+    # Without archiving, loading again skips images the test case already has
+    (capture_dir / "TC-BULK-2_search.png").write_bytes(PNG_BYTES + b"search")
+    (capture_dir / "TC-BULK-2_search.txt").write_text("Search")
+    first = client.post("/api/steps/load-pending", json={"project_id": project_id}).json()
+    assert [(s["test_number"], s["files"]) for s in first["steps"]] == [("TC-BULK-2", ["TC-BULK-2_search.png"])]
+    second = client.post("/api/steps/load-pending", json={"project_id": project_id}).json()
+    assert second["steps"] == [] and second["loaded"] == ["TC-BULK-2_search.png"]
+    assert len(models.get_steps_by_test_case(second_id)) == 2
+    print(f"   ✅ {len(result['steps'])} steps created, {result['archived']} files archived, reloads skipped")
+
+
+def main():
+    """Run all tests"""
+    tests = [
+        ("Cached capture config", test_config_cached),
+        ("/get-file security check", test_get_file_restricted_to_capture_dir),
+        ("Capture file index", test_capture_files_index),
+        ("Uploaded files stay paired", test_upload_keeps_pairs),
+        ("Status cache and circuit breaker", test_status_cache_and_circuit_breaker),
+        ("Process registry", test_process_registry),
+        ("File ingestion", test_ingest_file),
+        ("Load step from capture files", test_load_step_ingests_images),
+        ("Load all pending captures", test_load_pending_captures),
+    ]
+    return run_tests(tests)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,623 @@
+#!/usr/bin/env python3
+"""
+Test script for the export formats (Excel via the spool, JSON Lines, CSV, HTML bundle).
+Runs against a throwaway database through FastAPI's TestClient (no server needed).
+"""
+
+import csv
+import io
+import json
+import sys
+import os
+import tempfile
+import time
+import zipfile
+from pathlib import Path
+
+from testing_utils import seed_once, use_temp_database, get_client, run_tests
+from shared import models
+
+
+@seed_once
+def seed_database():
+    """Create an isolated database with one project, two test cases, steps and screenshots."""
+    db_dir = use_temp_database("tc_export_formats_")
+
+    project_id = models.create_project("Export Formats", "Streaming export test project")
+    tc1 = models.create_test_case("TC-EXP-1", "First, with \"quotes\"", project_id)
+    tc2 = models.create_test_case("TC-EXP-2", "Second without steps", project_id)
+    step1 = models.create_test_step(tc1, 1, "Open the portfolio", modules="PM")
+    step2 = models.create_test_step(tc1, 2, "Check values\nacross lines", calculation_logic="a = b * c")
+
+    # Two files with identical bytes, plus one missing file
+    png_bytes = _make_png()
+    image_a = Path(db_dir) / "a.png"
+    image_b = Path(db_dir) / "b.png"
+    image_a.write_bytes(png_bytes)
+    image_b.write_bytes(png_bytes)
+    models.add_screenshot_to_step(step1, str(image_a), "first")
+    models.add_screenshot_to_step(step1, str(image_b), "second")
+    models.add_screenshot_to_step(step2, str(Path(db_dir) / "missing.png"), "missing")
+
+    return {
+        "project_id": project_id,
+        "test_case_ids": [tc1, tc2],
+        "step_ids": [step1, step2],
+    }
+
+
+def _make_png():
+    """Return the bytes of a small PNG image."""
+    from PIL import Image
+    out = io.BytesIO()
+    Image.new("RGB", (800, 600), "steelblue").save(out, format="PNG")
+    return out.getvalue()
+
+
+def test_xlsx_export_spooled():
+    """Excel export streams from the spool, rolls over to disk when large, and leaves nothing behind."""
+    print("=" * 60)
+    print("TEST: Excel export through the spool")
+    print("=" * 60)
+
+    from api import spool
+    data = seed_database()
+    spool_dir = Path(tempfile.mkdtemp(prefix="tc_export_spool_"))
+    original = (spool.SPOOL_DIR, spool.SPOOL_MEMORY_THRESHOLD)
+    # Tiny threshold: force the rollover to disk
+    spool.SPOOL_DIR, spool.SPOOL_MEMORY_THRESHOLD = spool_dir, 1024
+    try:
+        response = get_client().post("/api/export", json={"project_ids": [data["project_id"]]})
+    finally:
+        spool.SPOOL_DIR, spool.SPOOL_MEMORY_THRESHOLD = original
+
+    assert response.status_code == 200, response.text
+    assert int(response.headers["content-length"]) == len(response.content)
+    workbook = zipfile.ZipFile(io.BytesIO(response.content))
+    assert "xl/workbook.xml" in workbook.namelist()
+    assert list(spool_dir.iterdir()) == [], "spool file left behind"
+    timings = response.headers["x-export-timings"]
+    for phase in ("total=", "db_fetch=", "image_load=", "cell_styling=", "save=", "images=2", "image_bytes="):
+        assert phase in timings, timings
+    print(f"   ✅ {len(response.content)} bytes streamed, spool directory empty")
+
+
+def test_xlsx_split_by_project():
+    """split_by_project returns a ZIP with one workbook per project."""
+    print("\n" + "=" * 60)
+    print("TEST: Excel export split by project")
+    print("=" * 60)
+
+    data = seed_database()
+    other_project = models.create_project("Second Project")
+    models.create_test_case("TC-EXP-3", "In the second project", other_project)
+
+    response = get_client().post("/api/export", json={
+        "project_ids": [data["project_id"], other_project],
+        "split_by_project": True
+    })
+    assert response.status_code == 200, response.text
+    assert response.headers["content-type"] == "application/zip"
+
+    archive = zipfile.ZipFile(io.BytesIO(response.content))
+    names = sorted(archive.namelist())
+    assert names == sorted([f"Export Formats_{data['project_id']}.xlsx", f"Second Project_{other_project}.xlsx"]), names
+    for name in names:
+        workbook = zipfile.ZipFile(io.BytesIO(archive.read(name)))
+        assert "xl/workbook.xml" in workbook.namelist()
+    print(f"   ✅ {len(names)} workbooks in archive")
+
+
+def test_workbook_pool_stopped_on_disconnect():
+    """Closing the archive stream early stops the workbook workers before removing their directory."""
+    print("\n" + "=" * 60)
+    print("TEST: Workbook pool stopped on disconnect")
+    print("=" * 60)
+
+    import multiprocessing
+    import tempfile
+    from shared import excel_export
+    data = seed_database()
+    work_dirs = lambda: set(Path(tempfile.gettempdir()).glob("tc_export_projects_*"))
+    before = work_dirs()
+
+    chunks = excel_export.iter_split_workbooks_zip(selected_project_ids=[data["project_id"]], max_workers=1)
+    next(chunks)
+    chunks.close()
+
+    assert multiprocessing.active_children() == [], "workbook workers still running"
+    assert work_dirs() == before
+    print("   ✅ Workers stopped and work directory removed")
+
+
+def test_export_profile_phases():
+    """Nested phases record exclusive time, so phases add up to the total."""
+    print("\n" + "=" * 60)
+    print("TEST: Export profile phases")
+    print("=" * 60)
+
+    from shared.export_profile import ExportProfile
+    profile = ExportProfile()
+    with profile.phase("cell_styling"):
+        time.sleep(0.02)
+        with profile.phase("db_fetch"):
+            time.sleep(0.03)
+    profile.count("images")
+    profile.count("images")
+    data = profile.finish().to_dict()
+
+    assert 15 <= data["phases_ms"]["cell_styling"] < 30, data
+    assert data["phases_ms"]["db_fetch"] >= 30, data
+    assert abs(sum(data["phases_ms"].values()) - data["total_ms"]) < 1, data
+    assert data["counters"] == {"images": 2}
+    print(f"   ✅ {profile.to_header()}")
+
+
+def test_export_profile_memory():
+    """Peak RSS is sampled per export, not taken from the process lifetime peak."""
+    print("\n" + "=" * 60)
+    print("TEST: Export profile memory")
+    print("=" * 60)
+
+    from shared.export_profile import ExportProfile, get_rss_bytes, MEMORY_SAMPLE_SECONDS
+    if get_rss_bytes() is None:
+        print("   ⚠️  RSS not readable on this platform, skipped")
+        return
+
+    size = 64 * 1024 * 1024
+    large = ExportProfile()
+    with large.track_memory():
+        block = bytearray(size)
+        block[::4096] = b"x" * (size // 4096)  # Touch every page
+        time.sleep(MEMORY_SAMPLE_SECONDS * 3)
+        del block
+    small = ExportProfile()
+    with small.track_memory():
+        time.sleep(MEMORY_SAMPLE_SECONDS * 3)
+
+    assert large.rss_growth_bytes >= size * 0.9, large.to_dict()
+    assert small.rss_growth_bytes < size / 2, small.to_dict()
+    assert small.peak_rss_bytes < large.peak_rss_bytes - size / 2
+    assert "rss_growth=" in large.to_header()
+    print(f"   ✅ +{large.rss_growth_bytes:,} bytes, then +{small.rss_growth_bytes:,} bytes")
+
+
+def test_spool_rollover_leaves_nothing():
+    """A spool that rolls over to disk never leaves a named file in the spool directory."""
+    print("\n" + "=" * 60)
+    print("TEST: Spool rollover")
+    print("=" * 60)
+
+    from api import spool
+    spool_dir = Path(tempfile.mkdtemp(prefix="tc_export_spool_"))
+    original = (spool.SPOOL_DIR, spool.SPOOL_MEMORY_THRESHOLD)
+    spool.SPOOL_DIR, spool.SPOOL_MEMORY_THRESHOLD = spool_dir, 1024
+    try:
+        spool_file = spool.open_spool_file(".xlsx")
+        payload = os.urandom(64 * 1024)
+        spool_file.write(payload)
+        assert spool_file._rolled, "spool did not roll over to disk"
+        assert list(spool_dir.iterdir()) == []
+        chunks = spool.iter_spool_file(spool_file, chunk_size=4096)
+        assert next(chunks) == payload[:4096]
+        chunks.close()  # client disconnected
+        assert spool_file.closed
+    finally:
+        spool.SPOOL_DIR, spool.SPOOL_MEMORY_THRESHOLD = original
+
+    assert list(spool_dir.iterdir()) == []
+    print("   ✅ Rolled-over spool is anonymous and released on disconnect")
+
+
+def test_jsonl_export():
+    """JSON Lines export yields typed records in document order."""
+    print("\n" + "=" * 60)
+    print("TEST: JSON Lines export")
+    print("=" * 60)
+
+    data = seed_database()
+    response = get_client().post("/api/export", json={
+        "project_ids": [data["project_id"]],
+        "format": "jsonl"
+    })
+    assert response.status_code == 200, response.text
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    assert ".jsonl" in response.headers["content-disposition"]
+
+    records = [json.loads(line) for line in response.text.splitlines()]
+    types = [r["type"] for r in records]
+    assert types.count("test_case") == 2
+    assert types.count("step") == 2
+    assert types.count("screenshot") == 3
+
+    tc1_index = next(i for i, r in enumerate(records) if r["type"] == "test_case" and r["test_number"] == "TC-EXP-1")
+    assert [r["type"] for r in records[tc1_index:tc1_index + 5]] == [
+        "test_case", "step", "screenshot", "screenshot", "step"
+    ]
+    assert records[tc1_index + 4]["description"] == "Check values\nacross lines"
+    print(f"   ✅ {len(records)} records streamed")
+
+
+def test_csv_export():
+    """CSV export yields one row per screenshot, step without screenshots, or bare test case."""
+    print("\n" + "=" * 60)
+    print("TEST: CSV export")
+    print("=" * 60)
+
+    data = seed_database()
+    response = get_client().post("/api/export", json={
+        "test_case_ids": data["test_case_ids"],
+        "format": "csv"
+    })
+    assert response.status_code == 200, response.text
+    assert response.headers["content-type"].startswith("text/csv")
+
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    # 2 screenshot rows for step 1, 1 for step 2, 1 row for the test case without steps
+    assert len(rows) == 4, rows
+    bare = [r for r in rows if r["test_number"] == "TC-EXP-2"]
+    assert len(bare) == 1 and bare[0]["step_id"] == ""
+    assert any(r["test_case_description"] == 'First, with "quotes"' for r in rows)
+    print(f"   ✅ {len(rows)} rows streamed")
+
+
+def test_html_export():
+    """HTML export streams a ZIP with index, one page per test case and hashed images."""
+    print("\n" + "=" * 60)
+    print("TEST: HTML bundle export")
+    print("=" * 60)
+
+    data = seed_database()
+    response = get_client().post("/api/export", json={
+        "project_ids": [data["project_id"]],
+        "format": "html"
+    })
+    assert response.status_code == 200, response.text
+    assert response.headers["content-type"] == "application/zip"
+
+    archive = zipfile.ZipFile(io.BytesIO(response.content))
+    names = archive.namelist()
+    assert "index.html" in names and "style.css" in names
+    for test_case_id in data["test_case_ids"]:
+        assert f"test-cases/{test_case_id}.html" in names
+
+    # Identical screenshots are stored once
+    images = [n for n in names if n.startswith("images/")]
+    thumbs = [n for n in names if n.startswith("thumbs/")]
+    assert len(images) == 1 and len(thumbs) == 1, names
+
+    index = archive.read("index.html").decode("utf-8")
+    assert "Project: Export Formats" in index
+    page = archive.read(f"test-cases/{data['test_case_ids'][0]}.html").decode("utf-8")
+    assert page.count('loading="lazy"') == 2
+    assert f'href="../{images[0]}"' in page
+    assert "Image not found: missing.png" in page
+    print(f"   ✅ {len(names)} files in bundle")
+
+
+def test_xlsx_sheet_styles():
+    """Sheets get their white background from sheet defaults; cells use the shared named styles."""
+    print("\n" + "=" * 60)
+    print("TEST: Excel sheet defaults and named styles")
+    print("=" * 60)
+
+    from openpyxl import load_workbook
+    from openpyxl.utils import get_column_letter
+    from shared.excel_export import create_excel_export, SHEET_BACKGROUND_COLUMNS, WHITE_FILL
+    data = seed_database()
+
+    out = io.BytesIO()
+    create_excel_export(out, selected_test_case_ids=data["test_case_ids"], image_mode="none")
+    out.seek(0)
+    workbook = load_workbook(out)
+    summary, with_steps, without_steps = workbook.worksheets
+
+    assert [cell.style for cell in summary[5][2:6]] == ["TC Header"] * 4
+    assert summary["C3"].style == "TC Summary Title"
+    assert summary["C6"].style == "TC Project Header"
+    assert [summary[f"{col}7"].style for col in "CDEF"] == [
+        "TC Link Cell", "TC Wrapped Cell", "TC Centered Cell", "TC Centered Cell"
+    ]
+    assert with_steps["B2"].style == "TC Sheet Title"
+    assert with_steps["B6"].style == "TC Step Header"
+    assert without_steps["B6"].style == "TC Placeholder"
+
+    for sheet in workbook.worksheets:
+        assert sheet.sheet_view.showGridLines is False, sheet.title
+        for col in range(1, SHEET_BACKGROUND_COLUMNS + 1):
+            fill = sheet.column_dimensions[get_column_letter(col)].fill
+            assert fill.fgColor.rgb == WHITE_FILL.fgColor.rgb, (sheet.title, col)
+        # Only content and frame cells exist: no empty cells painted white
+        cells = list(sheet._cells.values())
+        assert not any(cell.value is None and cell.style == "Normal" and cell.fill.fill_type == "solid"
+                       for cell in cells), sheet.title
+        assert len(cells) < sheet.max_row * SHEET_BACKGROUND_COLUMNS / 2, (sheet.title, len(cells))
+    print(f"   ✅ Named styles, white column defaults, {sum(len(s._cells) for s in workbook.worksheets)} cells")
+
+
+def test_xlsx_deduplicates_images():
+    """
+    Identical screenshots (same bytes, or a duplicated test case) share one media part.
+
+    save_workbook relies on openpyxl writer internals; this guards the pinned
+    openpyxl range against duplicate or missing media parts.
+    """
+    print("\n" + "=" * 60)
+    print("TEST: Excel image deduplication")
+    print("=" * 60)
+
+    from openpyxl import load_workbook
+    data = seed_database()
+    copy_id = models.duplicate_test_case(data["test_case_ids"][0], "TC-EXP-1-COPY")
+    assert copy_id is not None
+
+    response = get_client().post("/api/export", json={"test_case_ids": [data["test_case_ids"][0], copy_id]})
+    assert response.status_code == 200, response.text
+    with zipfile.ZipFile(io.BytesIO(response.content)) as archive:
+        names = archive.namelist()
+        media = [name for name in names if name.startswith("xl/media/")]
+        drawing_rels = "".join(archive.read(name).decode() for name in names
+                               if name.startswith("xl/drawings/_rels/"))
+        assert archive.testzip() is None
+        assert archive.read(media[0]) == _make_png()
+    assert len(names) == len(set(names)), "duplicate archive entries"
+    assert len(media) == 1, media
+    assert drawing_rels.count(media[0].replace("xl/", "/xl/")) == 4, drawing_rels
+
+    timings = response.headers["x-export-timings"]
+    assert "images=4" in timings and "deduplicated_images=3" in timings, timings
+    assert f"deduplicated_bytes={3 * len(_make_png())}" in timings, timings
+
+    workbook = load_workbook(io.BytesIO(response.content))
+    assert [len(sheet._images) for sheet in workbook.worksheets[1:]] == [2, 2]
+    assert all(image._data() == _make_png() for sheet in workbook.worksheets[1:] for image in sheet._images)
+    models.delete_test_case(copy_id)
+    print(f"   ✅ 4 images, 1 media part")
+
+
+def test_export_estimate_and_auto_split():
+    """POST /api/export/estimate reports counts and sizes; oversized exports are split into parts."""
+    print("\n" + "=" * 60)
+    print("TEST: Export estimate and automatic split")
+    print("=" * 60)
+
+    from shared import export_estimate
+    data = seed_database()
+    client = get_client()
+    body = {"test_case_ids": data["test_case_ids"]}
+
+    response = client.post("/api/export/estimate", json=body)
+    assert response.status_code == 200, response.text
+    estimate = response.json()
+    assert (estimate["test_cases"], estimate["steps"], estimate["screenshots"]) == (2, 2, 3), estimate
+    assert (estimate["images"], estimate["missing_images"]) == (2, 1), estimate
+    assert estimate["image_bytes"] == 2 * len(_make_png())
+    assert estimate["estimated_output_bytes"] > estimate["image_bytes"]
+    assert (estimate["workbooks"], estimate["split"]) == (1, False), estimate
+
+    no_images = client.post("/api/export/estimate", json={**body, "image_mode": "none"}).json()
+    assert no_images["estimated_output_bytes"] < estimate["estimated_output_bytes"]
+
+    # A workbook limit below one test case: every test case gets its own workbook
+    original = export_estimate.MAX_WORKBOOK_BYTES
+    export_estimate.MAX_WORKBOOK_BYTES = export_estimate.OUTPUT_BASE_BYTES + 1
+    try:
+        estimate = client.post("/api/export/estimate", json=body).json()
+        assert (estimate["workbooks"], estimate["split"]) == (2, True), estimate
+        response = client.post("/api/export", json=body)
+    finally:
+        export_estimate.MAX_WORKBOOK_BYTES = original
+    assert response.status_code == 200, response.text
+    assert response.headers["content-type"] == "application/zip"
+    names = sorted(zipfile.ZipFile(io.BytesIO(response.content)).namelist())
+    assert names == ["test_cases_export_part1.xlsx", "test_cases_export_part2.xlsx"], names
+    print(f"   ✅ Estimated {estimate['estimated_output_bytes']} bytes, split into {len(names)} workbooks")
+
+
+def test_delta_export():
+    """since exports only test cases whose row, steps or screenshots changed."""
+    print("\n" + "=" * 60)
+    print("TEST: Delta export (since)")
+    print("=" * 60)
+
+    from openpyxl import load_workbook
+    seed_database()
+    project_id = models.create_project("Delta Project")
+    edited = models.create_test_case("TC-DELTA-1", "Step edited", project_id)
+    shot_removed = models.create_test_case("TC-DELTA-2", "Screenshot removed", project_id)
+    untouched = models.create_test_case("TC-DELTA-3", "Untouched", project_id)
+    edited_step = models.create_test_step(edited, 1, "Original step")
+    removed_step = models.create_test_step(shot_removed, 1, "Step with screenshot")
+    screenshot_id = models.add_screenshot_to_step(removed_step, "/nowhere/shot.png")
+    models.create_test_step(untouched, 1, "Never changes")
+
+    # Age everything, then change two of the three test cases
+    conn = models.get_db_connection()
+    for table in ("test_cases", "test_steps", "step_screenshots"):
+        conn.execute(f"UPDATE {table} SET updated_at = '2020-01-01 00:00:00'")
+    conn.commit()
+    conn.close()
+    models.update_test_step(edited_step, 1, "Edited step")
+    models.delete_screenshot(screenshot_id)
+
+    changed = models.get_changed_test_cases("2021-01-01T00:00:00Z")
+    assert set(changed) == {edited, shot_removed}, changed
+
+    response = get_client().post("/api/export", json={
+        "project_ids": [project_id],
+        "since": "2021-01-01T00:00:00Z"
+    })
+    assert response.status_code == 200, response.text
+    workbook = load_workbook(io.BytesIO(response.content))
+    summary = workbook["Summary"]
+    assert summary["C4"].value == "Changes since 2021-01-01 00:00:00 UTC"
+    assert summary["G5"].value == "Last Changed (UTC)"
+    rows = {summary.cell(row=r, column=3).value: summary.cell(row=r, column=7).value
+            for r in range(6, summary.max_row + 1)}
+    assert "TC-DELTA-1" in rows and "TC-DELTA-2" in rows and "TC-DELTA-3" not in rows, rows
+    assert rows["TC-DELTA-1"] == changed[edited]
+    assert len(workbook.sheetnames) == 3
+
+    response = get_client().post("/api/export", json={"since": "2021-01-01T00:00:00Z", "format": "jsonl"})
+    assert response.status_code == 200, response.text
+    exported_ids = {json.loads(line)["id"] for line in response.text.splitlines()
+                    if json.loads(line)["type"] == "test_case"}
+    assert edited in exported_ids and shot_removed in exported_ids and untouched not in exported_ids
+    print(f"   ✅ {len(changed)} of 3 test cases exported")
+
+
+def test_image_modes():
+    """image_mode: thumbnails with links, links into an images/ side folder, metadata only."""
+    print("\n" + "=" * 60)
+    print("TEST: Image embedding modes")
+    print("=" * 60)
+
+    from openpyxl import load_workbook
+    data = seed_database()
+    client = get_client()
+    step_screenshots = models.get_screenshots_by_step(data["step_ids"][0])
+
+    def export(**options):
+        response = client.post("/api/export", json={"test_case_ids": data["test_case_ids"], **options})
+        assert response.status_code == 200, response.text
+        return response
+
+    def media_bytes(xlsx_bytes):
+        with zipfile.ZipFile(io.BytesIO(xlsx_bytes)) as workbook:
+            return sum(info.file_size for info in workbook.infolist() if info.filename.startswith("xl/media/"))
+
+    full = export()
+    thumbnail = export(image_mode="thumbnail", image_base_url="http://docs.example:8000/")
+    assert 0 < media_bytes(thumbnail.content) < media_bytes(full.content)
+    sheet = load_workbook(io.BytesIO(thumbnail.content)).worksheets[1]
+    links = [cell.hyperlink.target for row in sheet.iter_rows() for cell in row if cell.hyperlink]
+    assert f"http://docs.example:8000/api/screenshots/{step_screenshots[0]['id']}/file" in links, links
+
+    # No base URL: ZIP with the workbook and the originals it links to
+    linked = export(image_mode="linked")
+    assert linked.headers["content-type"] == "application/zip"
+    bundle = zipfile.ZipFile(io.BytesIO(linked.content))
+    workbook_name = next(name for name in bundle.namelist() if name.endswith(".xlsx"))
+    image_names = sorted(name for name in bundle.namelist() if name.startswith("images/"))
+    assert image_names == sorted(f"images/{s['id']}_{Path(s['file_path']).name}" for s in step_screenshots)
+    workbook_bytes = bundle.read(workbook_name)
+    assert media_bytes(workbook_bytes) == 0
+    sheet = load_workbook(io.BytesIO(workbook_bytes)).worksheets[1]
+    links = [cell.hyperlink.target for row in sheet.iter_rows() for cell in row if cell.hyperlink]
+    assert set(image_names) <= set(links), links
+
+    none = export(image_mode="none")
+    assert media_bytes(none.content) == 0
+    sheet = load_workbook(io.BytesIO(none.content)).worksheets[1]
+    values = [cell.value for row in sheet.iter_rows() for cell in row if cell.value]
+    assert "[Screenshot: first (a.png)]" in values, values
+
+    response = client.post("/api/export", json={"test_case_ids": data["test_case_ids"], "image_mode": "tiny"})
+    assert response.status_code == 400
+    print(f"   ✅ full {len(full.content)} bytes, thumbnail {len(thumbnail.content)}, none {len(none.content)}")
+
+
+def test_excel_import_round_trip():
+    """An exported workbook imports back with steps, notes and screenshots; re-import skips."""
+    print("\n" + "=" * 60)
+    print("TEST: Excel import round trip")
+    print("=" * 60)
+
+    from shared import excel_import
+    data = seed_database()
+    client = get_client()
+    excel_import.IMPORT_DIR = Path(models.DB_DIR) / "imported"
+
+    exported = client.post("/api/export", json={"test_case_ids": data["test_case_ids"]})
+    assert exported.status_code == 200, exported.text
+    target = models.create_project("Imported", "Excel import test project")
+
+    def upload():
+        response = client.post(
+            "/api/import/excel",
+            files=[("files", ("export.xlsx", exported.content, "application/octet-stream"))],
+            data={"project_id": str(target)}
+        )
+        assert response.status_code == 200, response.text
+        return response.json()[0]
+
+    result = upload()
+    assert result["error"] is None, result["error"]
+    assert result["test_cases"] == 2 and result["steps"] == 2, result
+    # Two screenshots with identical bytes are stored once; the missing one is not in the workbook
+    assert result["screenshots"] == 2 and result["images_stored"] == 1, result
+
+    imported = {tc["test_number"]: tc for tc in models.get_test_cases_by_project(target)}
+    assert imported["TC-EXP-1"]["description"] == 'First, with "quotes"'
+    steps = models.get_steps_by_test_case(imported["TC-EXP-1"]["id"])
+    assert [step["step_number"] for step in steps] == [1, 2]
+    assert steps[0]["modules"] == "PM" and steps[1]["calculation_logic"] == "a = b * c"
+    assert steps[1]["description"] == "Check values\nacross lines"
+    screenshots = models.get_screenshots_by_step(steps[0]["id"])
+    assert len(screenshots) == 2 and all(os.path.isfile(s["file_path"]) for s in screenshots)
+
+    again = upload()
+    assert again["test_cases"] == 0 and sorted(again["skipped"]) == ["TC-EXP-1", "TC-EXP-2"], again
+
+    # Projects created for a workbook are rolled back with it
+    models.update_project(data["project_id"], "Export Formats (renamed)", None)
+    projects_before = len(models.get_all_projects())
+    original_bulk_import = models.bulk_import_test_cases
+
+    def failing_bulk_import(records, conn=None):
+        raise RuntimeError("insert failed")
+
+    models.bulk_import_test_cases = failing_bulk_import
+    try:
+        excel_import.import_workbook(io.BytesIO(exported.content))
+        assert False, "import did not fail"
+    except RuntimeError:
+        pass
+    finally:
+        models.bulk_import_test_cases = original_bulk_import
+        models.update_project(data["project_id"], "Export Formats", None)
+    assert len(models.get_all_projects()) == projects_before
+    print(f"   ✅ {result['test_cases']} test cases, {result['steps']} steps, "
+          f"{result['screenshots']} screenshots imported; re-import skipped")
+
+
+def test_unknown_format_rejected():
+    """Unknown formats are rejected with 400."""
+    print("\n" + "=" * 60)
+    print("TEST: Unknown export format")
+    print("=" * 60)
+
+    data = seed_database()
+    response = get_client().post("/api/export", json={
+        "test_case_ids": data["test_case_ids"],
+        "format": "pdf"
+    })
+    assert response.status_code == 400
+    print("   ✅ Rejected with 400")
+
+
+def main():
+    """Run all tests"""
+    tests = [
+        ("Excel export through the spool", test_xlsx_export_spooled),
+        ("Excel export split by project", test_xlsx_split_by_project),
+        ("Workbook pool stopped on disconnect", test_workbook_pool_stopped_on_disconnect),
+        ("Export profile phases", test_export_profile_phases),
+        ("Export profile memory", test_export_profile_memory),
+        ("Spool rollover", test_spool_rollover_leaves_nothing),
+        ("JSON Lines export", test_jsonl_export),
+        ("CSV export", test_csv_export),
+        ("HTML bundle export", test_html_export),
+        ("Excel sheet defaults and named styles", test_xlsx_sheet_styles),
+        ("Excel image deduplication", test_xlsx_deduplicates_images),
+        ("Export estimate and automatic split", test_export_estimate_and_auto_split),
+        ("Delta export", test_delta_export),
+        ("Image embedding modes", test_image_modes),
+        ("Excel import round trip", test_excel_import_round_trip),
+        ("Unknown format rejected", test_unknown_format_rejected),
+    ]
+    return run_tests(tests)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Test script for the /metrics endpoint (request and database metrics).
+Runs against a throwaway database through FastAPI's TestClient (no server needed).
+"""
+
+import sys
+
+from testing_utils import seed_once, use_temp_database, get_client, run_tests
+from shared import metrics, models
+
+
+@seed_once
+def seed_database():
+    """Create an isolated database with one project and a test case."""
+    use_temp_database("tc_metrics_")
+
+    project_id = models.create_project("Metrics", "Metrics test project")
+    test_case_id = models.create_test_case("TC-METRICS-1", "Check the metrics", project_id)
+    return {"project_id": project_id, "test_case_id": test_case_id}
+
+
+def scrape(client):
+    """GET /metrics and return {sample line without value: value}."""
+    response = client.get("/metrics")
+    assert response.status_code == 200, response.text
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    samples = {}
+    for line in response.text.splitlines():
+        if line and not line.startswith("#"):
+            name, _, value = line.rpartition(" ")
+            samples[name] = float(value)
+    return samples
+
+
+def test_text_format():
+    """Counters, gauges and histograms render in the Prometheus text format."""
+    print("=" * 60)
+    print("TEST: Text exposition format")
+    print("=" * 60)
+
+    registry = metrics.Registry()
+    counter = registry.counter("jobs_total", "Jobs", ("kind",))
+    histogram = registry.histogram("job_seconds", "Job time", buckets=(0.1, 1.0))
+    counter.inc('say "hi"\n')
+    counter.inc('say "hi"\n', amount=2)
+    histogram.observe(value=0.05)
+    histogram.observe(value=0.5)
+    histogram.observe(value=3)
+
+    lines = registry.render().splitlines()
+    assert "# TYPE jobs_total counter" in lines
+    assert 'jobs_total{kind="say \\"hi\\"\\n"} 3' in lines
+    assert 'job_seconds_bucket{le="0.1"} 1' in lines
+    assert 'job_seconds_bucket{le="1"} 2' in lines
+    assert 'job_seconds_bucket{le="+Inf"} 3' in lines
+    assert "job_seconds_sum 3.55" in lines
+    assert "job_seconds_count 3" in lines
+    print("   ✅ Escaped labels, cumulative buckets, sum and count")
+
+
+def test_request_metrics():
+    """Requests are counted per route template and status, with latency histograms."""
+    print("\n" + "=" * 60)
+    print("TEST: Request metrics")
+    print("=" * 60)
+
+    data = seed_database()
+    client = get_client()
+    route = 'method="GET",route="/api/test-cases/{test_case_id}"'
+
+    before = scrape(client)
+    assert client.get(f"/api/test-cases/{data['test_case_id']}").status_code == 200
+    assert client.get(f"/api/test-cases/{data['test_case_id']}").status_code == 200
+    assert client.get("/api/test-cases/999999").status_code == 404
+    assert client.get("/no/such/path").status_code == 404
+    after = scrape(client)
+
+    def delta(sample):
+        return after.get(sample, 0) - before.get(sample, 0)
+
+    assert delta(f"http_requests_total{{{route},status=\"200\"}}") == 2
+    assert delta(f"http_requests_total{{{route},status=\"404\"}}") == 1
+    assert delta('http_requests_total{method="GET",route="unmatched",status="404"}') == 1
+    assert delta(f"http_request_duration_seconds_count{{{route}}}") == 3
+    assert delta(f'http_request_duration_seconds_bucket{{{route},le="+Inf"}}') == 3
+    # Only the /metrics request itself is in flight while scraping
+    assert after['http_requests_in_flight{method="GET"}'] == 1
+    print("   ✅ Per-route counts, latency histogram and in-flight gauge")
+
+
+def test_database_metrics():
+    """Connection opens, statement counts and statement time are recorded by shared.models."""
+    print("\n" + "=" * 60)
+    print("TEST: Database metrics")
+    print("=" * 60)
+
+    data = seed_database()
+    client = get_client()
+
+    before = scrape(client)
+    assert client.get(f"/api/test-cases/{data['test_case_id']}/steps").status_code == 200
+    after = scrape(client)
+
+    def delta(sample):
+        return after.get(sample, 0) - before.get(sample, 0)
+
+    selects = delta('db_queries_total{statement="select"}')
+    assert delta("db_connections_opened_total") >= 1
+    assert selects >= 1
+    assert delta('db_query_duration_seconds_count{statement="select"}') == selects
+    assert delta('db_query_duration_seconds_sum{statement="select"}') > 0
+
+    assert metrics.statement_type("  SELECT 1") == "select"
+    assert metrics.statement_type("\n    INSERT INTO t VALUES (1)") == "insert"
+    assert metrics.statement_type("VACUUM") == "other"
+    print(f"   ✅ {int(selects)} SELECT statements recorded")
+
+    # sqlite3's own Connection.execute does not go through cursor()
+    conn = models.get_db_connection()
+    try:
+        before = metrics.DB_QUERIES.value("select")
+        conn.execute("SELECT 1").fetchone()
+        assert metrics.DB_QUERIES.value("select") - before == 1
+    finally:
+        conn.close()
+    print("   ✅ Statements run through conn.execute recorded")
+
+
+def main():
+    """Run all tests"""
+    tests = [
+        ("Text exposition format", test_text_format),
+        ("Request metrics", test_request_metrics),
+        ("Database metrics", test_database_metrics),
+    ]
+    return run_tests(tests)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Test script for the request-scoped database connection (api/database.py).
+Runs against a throwaway database through FastAPI's TestClient (no server needed).
+"""
+
+import sys
+
+from testing_utils import seed_once, use_temp_database, get_client, run_tests
+from shared import metrics, models
+
+
+@seed_once
+def seed_database():
+    """Create an isolated database with one project."""
+    use_temp_database("tc_request_db_")
+
+    project_id = models.create_project("Request DB", "Request-scoped connection test project")
+    return {"project_id": project_id}
+
+
+def test_one_connection_per_request():
+    """A create or update endpoint opens one connection and commits once."""
+    print("=" * 60)
+    print("TEST: One connection and one transaction per request")
+    print("=" * 60)
+
+    env = seed_database()
+    client = get_client()
+
+    opened = metrics.DB_CONNECTIONS_OPENED.value()
+    begins = metrics.DB_QUERIES.value("begin")
+    response = client.post("/api/test-cases", json={
+        "test_number": "TC-REQ-1", "description": "Created", "project_id": env["project_id"]
+    })
+    assert response.status_code == 201, response.text
+    test_case_id = response.json()["id"]
+    assert metrics.DB_CONNECTIONS_OPENED.value() - opened == 1
+    assert metrics.DB_QUERIES.value("begin") - begins == 1
+
+    opened = metrics.DB_CONNECTIONS_OPENED.value()
+    response = client.put(f"/api/test-cases/{test_case_id}", json={"description": "Updated"})
+    assert response.status_code == 200, response.text
+    assert response.json()["description"] == "Updated"
+    assert metrics.DB_CONNECTIONS_OPENED.value() - opened == 1
+
+    # Committed before the response: visible to the next request
+    assert models.get_test_case_by_id(test_case_id)["description"] == "Updated"
+    response = client.post(f"/api/test-cases/{test_case_id}/steps", json={
+        "step_number": 1, "description": "First step"
+    })
+    assert response.status_code == 201, response.text
+    assert len(models.get_steps_by_test_case(test_case_id)) == 1
+    print("   ✅ One connection per request, writes committed before the response")
+
+
+def test_error_rolls_back_request():
+    """An endpoint that fails after a write leaves nothing behind."""
+    print("\n" + "=" * 60)
+    print("TEST: Rollback on error")
+    print("=" * 60)
+
+    from api.database import get_db
+    env = seed_database()
+
+    session = get_db()
+    conn = next(session)
+    models.create_test_case("TC-REQ-ROLLBACK", "Never committed", env["project_id"], conn=conn)
+    assert any(tc["test_number"] == "TC-REQ-ROLLBACK"
+               for tc in models.get_all_test_cases(env["project_id"], conn=conn))
+    try:
+        session.throw(RuntimeError("endpoint failed"))
+    except RuntimeError:
+        pass
+    assert not any(tc["test_number"] == "TC-REQ-ROLLBACK" for tc in models.get_all_test_cases(env["project_id"]))
+
+    # A 404 raised by the endpoint rolls back too
+    client = get_client()
+    response = client.put("/api/test-cases/999999", json={"description": "Missing"})
+    assert response.status_code == 404
+    print("   ✅ Request writes rolled back on error")
+
+
+def test_failed_unit_keeps_earlier_writes():
+    """A model function that fails on a shared connection only undoes its own writes."""
+    print("\n" + "=" * 60)
+    print("TEST: Savepoints on a shared connection")
+    print("=" * 60)
+
+    from api.database import get_db
+    env = seed_database()
+
+    session = get_db()
+    conn = next(session)
+    first = models.create_test_case("TC-REQ-A", "Kept", env["project_id"], conn=conn)
+    second = models.create_test_case("TC-REQ-B", "Kept", env["project_id"], conn=conn)
+    try:
+        models.update_test_case(second, "TC-REQ-A", "Duplicate number", env["project_id"], conn=conn)
+        assert False, "duplicate test number accepted"
+    except ValueError:
+        pass
+    try:
+        next(session)
+    except StopIteration:
+        pass
+
+    assert models.get_test_case_by_id(first)["test_number"] == "TC-REQ-A"
+    assert models.get_test_case_by_id(second)["description"] == "Kept"
+    print("   ✅ Earlier writes of the request kept")
+
+
+def test_commit_before_response():
+    """The request's transaction is committed before the response starts."""
+    print("\n" + "=" * 60)
+    print("TEST: Commit before the response")
+    print("=" * 60)
+
+    from fastapi.testclient import TestClient
+    from api.main import app
+    env = seed_database()
+    seen = {}
+
+    async def recording_app(scope, receive, send):
+        async def checked_send(message):
+            if message["type"] == "http.response.start":
+                # Another connection must already see the write
+                seen["committed"] = any(tc["test_number"] == "TC-REQ-ORDER"
+                                        for tc in models.get_all_test_cases(env["project_id"]))
+            await send(message)
+        await app(scope, receive, checked_send)
+
+    client = TestClient(recording_app)
+    response = client.post("/api/test-cases", json={
+        "test_number": "TC-REQ-ORDER", "description": "Ordering", "project_id": env["project_id"]
+    })
+    assert response.status_code == 201, response.text
+    assert seen["committed"], "response started before the commit"
+    print("   ✅ Committed before http.response.start")
+
+
+def main():
+    """Run all tests"""
+    tests = [
+        ("One connection per request", test_one_connection_per_request),
+        ("Rollback on error", test_error_rolls_back_request),
+        ("Savepoints on a shared connection", test_failed_unit_keeps_earlier_writes),
+        ("Commit before the response", test_commit_before_response),
+    ]
+    return run_tests(tests)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+"""
+Test script for the screenshot endpoints (files and thumbnails).
+Runs against a throwaway database through FastAPI's TestClient (no server needed).
+"""
+
+import io
+import sys
+import tempfile
+from pathlib import Path
+
+from testing_utils import seed_once, use_temp_database, get_client, run_tests
+from shared import models
+
+
+@seed_once
+def seed_database():
+    """Create an isolated database with one step holding two screenshots with identical bytes."""
+    db_dir = use_temp_database("tc_screenshots_")
+
+    from api import thumbnails
+    from api.routes import screenshots
+    thumbnails.THUMBNAIL_CACHE_DIR = Path(db_dir) / "thumbnails"
+    screenshots.UPLOAD_ROOT = Path(db_dir) / "uploads"
+
+    test_case_id = models.create_test_case("TC-SHOT-1", "Screenshot endpoints")
+    step_id = models.create_test_step(test_case_id, 1, "Take screenshots")
+
+    png_bytes = _make_png()
+    image_a = Path(db_dir) / "a.png"
+    image_b = Path(db_dir) / "b.png"
+    image_a.write_bytes(png_bytes)
+    image_b.write_bytes(png_bytes)
+
+    return {
+        "db_dir": db_dir,
+        "step_id": step_id,
+        "png_bytes": png_bytes,
+        "screenshot_ids": [
+            models.add_screenshot_to_step(step_id, str(image_a)),
+            models.add_screenshot_to_step(step_id, str(image_b)),
+        ],
+    }
+
+
+def _make_png(size=(1600, 1000)):
+    """Return the bytes of a PNG image with some detail (so it does not compress to nothing)."""
+    from PIL import Image
+    img = Image.effect_noise(size, 64).convert("RGB")
+    out = io.BytesIO()
+    img.save(out, format="PNG")
+    return out.getvalue()
+
+
+def test_screenshot_file():
+    """The file endpoint looks the screenshot up by ID."""
+    print("=" * 60)
+    print("TEST: Screenshot file")
+    print("=" * 60)
+
+    data = seed_database()
+    client = get_client()
+    response = client.get(f"/api/screenshots/{data['screenshot_ids'][0]}/file")
+    assert response.status_code == 200, response.text
+    assert response.content == data["png_bytes"]
+    assert client.get("/api/screenshots/999999/file").status_code == 404
+    print(f"   ✅ {len(response.content)} bytes")
+
+
+def test_screenshot_file_caching():
+    """Screenshot files carry validators; conditional requests get 304, ranges 206."""
+    print("\n" + "=" * 60)
+    print("TEST: Screenshot file caching")
+    print("=" * 60)
+
+    data = seed_database()
+    client = get_client()
+    url = f"/api/screenshots/{data['screenshot_ids'][0]}/file"
+
+    response = client.get(url)
+    assert response.status_code == 200, response.text
+    etag = response.headers["etag"]
+    last_modified = response.headers["last-modified"]
+    assert etag.startswith('"') and "immutable" in response.headers["cache-control"]
+
+    not_modified = client.get(url, headers={"If-None-Match": etag})
+    assert not_modified.status_code == 304 and not not_modified.content
+    assert not_modified.headers["etag"] == etag
+    assert client.get(url, headers={"If-None-Match": f'"other", W/{etag}'}).status_code == 304
+    assert client.get(url, headers={"If-None-Match": '"other"'}).status_code == 200
+    assert client.get(url, headers={"If-Modified-Since": last_modified}).status_code == 304
+    assert client.get(url, headers={"If-Modified-Since": "Thu, 01 Jan 1970 00:00:00 GMT"}).status_code == 200
+    # If-None-Match wins over If-Modified-Since
+    assert client.get(url, headers={"If-None-Match": '"other"', "If-Modified-Since": last_modified}).status_code == 200
+
+    partial = client.get(url, headers={"Range": "bytes=0-99"})
+    assert partial.status_code == 206, partial.status_code
+    assert partial.content == data["png_bytes"][:100]
+    assert partial.headers["content-range"] == f"bytes 0-99/{len(data['png_bytes'])}"
+    # A stale If-Range validator gets the whole file
+    stale = client.get(url, headers={"Range": "bytes=0-99", "If-Range": '"other"'})
+    assert stale.status_code == 200 and len(stale.content) == len(data["png_bytes"])
+
+    thumbnail = client.get(f"/api/screenshots/{data['screenshot_ids'][0]}/thumbnail")
+    assert client.get(
+        f"/api/screenshots/{data['screenshot_ids'][0]}/thumbnail",
+        headers={"If-None-Match": thumbnail.headers["etag"]}
+    ).status_code == 304
+    print(f"   ✅ ETag {etag}, 304 on revalidation, 206 for ranges")
+
+
+def test_screenshot_thumbnail():
+    """Thumbnails are resized, negotiated, cached by content hash and width."""
+    print("\n" + "=" * 60)
+    print("TEST: Screenshot thumbnail")
+    print("=" * 60)
+
+    from PIL import Image
+    from api import thumbnails
+    data = seed_database()
+    client = get_client()
+    first, second = data["screenshot_ids"]
+
+    response = client.get(f"/api/screenshots/{first}/thumbnail?w=120")
+    assert response.status_code == 200, response.text
+    assert response.headers["content-type"] == "image/jpeg"
+    assert "max-age" in response.headers["cache-control"]
+    with Image.open(io.BytesIO(response.content)) as img:
+        # 120 is rounded up to 128; the aspect ratio is kept
+        assert img.size == (128, 80), img.size
+    assert len(response.content) < len(data["png_bytes"]) / 10
+
+    webp = client.get(f"/api/screenshots/{first}/thumbnail?w=120", headers={"Accept": "image/webp,*/*"})
+    assert webp.headers["content-type"] == "image/webp"
+    assert "Accept" in webp.headers["vary"]
+
+    # Same bytes, same width: the second screenshot reuses the cached files
+    def cached_files():
+        return sorted(path.name for path in thumbnails.THUMBNAIL_CACHE_DIR.glob("*_128.*"))
+
+    cached = cached_files()
+    assert len(cached) == 2, cached
+    again = client.get(f"/api/screenshots/{second}/thumbnail?w=128")
+    assert again.content == response.content
+    assert cached_files() == cached
+
+    assert client.get(f"/api/screenshots/{first}/thumbnail?format=gif").status_code == 400
+    assert client.get("/api/screenshots/999999/thumbnail").status_code == 404
+    print(f"   ✅ {len(response.content)} byte JPEG, {len(webp.content)} byte WebP, {len(cached)} cache files")
+
+
+def test_streaming_upload():
+    """Uploads are streamed to disk, checked for an image signature and a size limit."""
+    print("\n" + "=" * 60)
+    print("TEST: Streaming screenshot upload")
+    print("=" * 60)
+
+    from api import uploads
+    data = seed_database()
+    client = get_client()
+    url = f"/api/steps/{data['step_id']}/screenshots"
+
+    # Same second, different content: both files are kept
+    created = []
+    for content in (data["png_bytes"], _make_png((200, 100))):
+        response = client.post(url, files={"file": ("shot.bmp", content, "image/png")})
+        assert response.status_code == 201, response.text
+        created.append(response.json())
+        stored = Path(created[-1]["file_path"])
+        # The extension follows the content; a name taken in the same second is numbered
+        assert stored.suffix == ".png" and stored.name.startswith("screenshot_")
+        assert stored.read_bytes() == content
+    assert created[0]["file_path"] != created[1]["file_path"]
+
+    upload_dir = Path(created[0]["file_path"]).parent
+    files_before = sorted(upload_dir.iterdir())
+
+    rejected = client.post(url, files={"file": ("notes.png", b"not an image at all", "image/png")})
+    assert rejected.status_code == 415, rejected.text
+
+    original_limit = uploads.MAX_UPLOAD_BYTES
+    uploads.MAX_UPLOAD_BYTES = 1024
+    try:
+        too_large = client.post(url, files={"file": ("big.png", data["png_bytes"], "image/png")})
+    finally:
+        uploads.MAX_UPLOAD_BYTES = original_limit
+    assert too_large.status_code == 413, too_large.text
+
+    # Rejected uploads leave no files (complete or partial) behind
+    assert sorted(upload_dir.iterdir()) == files_before
+    assert len(models.get_screenshots_by_step(data["step_id"])) == 4
+    for screenshot in created:
+        models.delete_screenshot(screenshot["id"])
+    print(f"   ✅ 2 uploads stored, 415 for non-images, 413 over the limit")
+
+
+def test_claim_name_without_hard_links():
+    """Without hard links, a taken name is skipped instead of overwritten."""
+    print("\n" + "=" * 60)
+    print("TEST: Claim a file name without hard links")
+    print("=" * 60)
+
+    import errno
+    import os
+    from unittest import mock
+    from api import uploads
+
+    target_dir = Path(tempfile.mkdtemp(prefix="tc_claim_"))
+    (target_dir / "shot.png").write_bytes(b"existing")
+    temp_path = target_dir / ".upload_1.part"
+    temp_path.write_bytes(b"new")
+
+    def no_links(src, dst):
+        raise OSError(errno.EPERM, "Operation not permitted")
+
+    with mock.patch.object(uploads.os, "link", no_links):
+        final_path = uploads.claim_name(str(temp_path), target_dir, "shot", ".png")
+    assert final_path == target_dir / "shot_1.png"
+    assert final_path.read_bytes() == b"new"
+    assert (target_dir / "shot.png").read_bytes() == b"existing"
+    assert not temp_path.exists()
+
+    # Other link failures are real errors
+    temp_path.write_bytes(b"new")
+    with mock.patch.object(uploads.os, "link", side_effect=OSError(errno.EIO, "I/O error")):
+        try:
+            uploads.claim_name(str(temp_path), target_dir, "shot", ".png")
+            assert False, "I/O error swallowed"
+        except OSError as e:
+            assert e.errno == errno.EIO
+    assert sorted(os.listdir(target_dir)) == [".upload_1.part", "shot.png", "shot_1.png"]
+    print("   ✅ Existing file kept, new file stored as shot_1.png")
+
+
+def test_batch_upload():
+    """Many files in one request: stored concurrently, inserted together, all or nothing."""
+    print("\n" + "=" * 60)
+    print("TEST: Batch screenshot upload")
+    print("=" * 60)
+
+    data = seed_database()
+    client = get_client()
+    url = f"/api/steps/{data['step_id']}/screenshots/batch"
+    before = models.get_screenshots_by_step(data["step_id"])
+
+    # Duplicate content in one batch still gets one file per screenshot
+    images = [_make_png((100 + i, 50)) for i in range(5)] + [data["png_bytes"], data["png_bytes"]]
+    response = client.post(url, files=[
+        ("files", (f"shot_{i}.png", content, "image/png")) for i, content in enumerate(images)
+    ])
+    assert response.status_code == 201, response.text
+    created = response.json()
+    assert len(created) == len(images)
+    assert len({screenshot["file_path"] for screenshot in created}) == len(images)
+    for screenshot, content in zip(created, images):
+        assert Path(screenshot["file_path"]).read_bytes() == content
+
+    listed = models.get_screenshots_by_step(data["step_id"])
+    assert [s["id"] for s in listed] == [s["id"] for s in before] + [s["id"] for s in created]
+
+    upload_dir = Path(created[0]["file_path"]).parent
+    files_before = sorted(upload_dir.iterdir())
+    rejected = client.post(url, files=[
+        ("files", ("ok.png", images[0], "image/png")),
+        ("files", ("bad.png", b"plain text", "image/png")),
+    ])
+    assert rejected.status_code == 415 and "bad.png" in rejected.json()["detail"], rejected.text
+    assert sorted(upload_dir.iterdir()) == files_before
+    assert len(models.get_screenshots_by_step(data["step_id"])) == len(listed)
+
+    assert client.post("/api/steps/999999/screenshots/batch",
+                       files=[("files", ("a.png", images[0], "image/png"))]).status_code == 404
+    for screenshot in created:
+        models.delete_screenshot(screenshot["id"])
+    print(f"   ✅ {len(created)} screenshots in one request; rejected batch left nothing behind")
+
+
+def test_delete_shared_file():
+    """A file shared by several screenshots is only removed with the last of them."""
+    print("\n" + "=" * 60)
+    print("TEST: Delete screenshots sharing a file")
+    print("=" * 60)
+
+    data = seed_database()
+    client = get_client()
+    shared_file = Path(data["db_dir"]) / "shared.png"
+    shared_file.write_bytes(data["png_bytes"])
+    first = models.add_screenshot_to_step(data["step_id"], str(shared_file))
+    second = models.add_screenshot_to_step(data["step_id"], str(shared_file))
+
+    assert client.delete(f"/api/screenshots/{first}").status_code == 204
+    assert shared_file.exists(), "file removed while another screenshot still uses it"
+    assert client.delete(f"/api/screenshots/{second}").status_code == 204
+    assert not shared_file.exists()
+    print("   ✅ Shared file kept until its last screenshot was deleted")
+
+
+def main():
+    """Run all tests"""
+    tests = [
+        ("Screenshot file", test_screenshot_file),
+        ("Screenshot file caching", test_screenshot_file_caching),
+        ("Screenshot thumbnail", test_screenshot_thumbnail),
+        ("Streaming screenshot upload", test_streaming_upload),
+        ("Claim a file name without hard links", test_claim_name_without_hard_links),
+        ("Batch screenshot upload", test_batch_upload),
+        ("Delete screenshots sharing a file", test_delete_shared_file),
+    ]
+    return run_tests(tests)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
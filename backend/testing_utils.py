@@ -0,0 +1,69 @@
+"""
+Shared setup for the backend test scripts (test_*.py).
+
+The scripts run against a throwaway database through FastAPI's TestClient
+(no server needed), either under pytest or on their own through main(),
+which prints a PASS/FAIL summary.
+"""
+
+import functools
+import sys
+import tempfile
+from pathlib import Path
+
+# Add project root and backend to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+sys.path.insert(0, str(Path(__file__).parent))
+
+from shared import models
+
+
+def use_temp_database(prefix: str) -> Path:
+    """Point shared.models at a new, initialised database in a temporary directory; return the directory."""
+    db_dir = Path(tempfile.mkdtemp(prefix=prefix))
+    models.DB_DIR = str(db_dir)
+    models.DB_FILE = str(db_dir / "test_cases.db")
+    models.init_database()
+    return db_dir
+
+
+def seed_once(seed):
+    """Decorator: run a seed function on the first call and return its dict on every call."""
+    seeded = {}
+
+    @functools.wraps(seed)
+    def wrapper():
+        if not seeded:
+            seeded.update(seed())
+        return seeded
+
+    return wrapper
+
+
+def get_client():
+    """TestClient for the API app."""
+    from fastapi.testclient import TestClient
+    from api.main import app
+    return TestClient(app)
+
+
+def run_tests(tests) -> int:
+    """Run (name, test function) pairs, print a summary and return the exit code."""
+    results = []
+    for name, test in tests:
+        try:
+            test()
+            results.append((name, True))
+        except AssertionError as e:
+            print(f"   ❌ {e}")
+            results.append((name, False))
+
+    print("\n" + "=" * 60)
+    print("TEST SUMMARY")
+    print("=" * 60)
+    for name, result in results:
+        print(f"{'✅ PASS' if result else '❌ FAIL'}: {name}")
+    passed = sum(1 for _, result in results if result)
+    print(f"\nTotal: {passed}/{len(results)} tests passed")
+    return 0 if passed == len(results) else 1
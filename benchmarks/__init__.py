@@ -0,0 +1,10 @@
+"""
+Benchmarks for Test Case Documentation Tool.
+
+- dataset.py: synthetic dataset generator (throwaway SQLite database + PNGs)
+- bench_export.py: create_excel_export at several scales, results as JSON
+- bench_export_sheets.py: many text-only sheets (sheet styling cost)
+- bench_api_responses.py: JSON list endpoints (payload size, compression, encode time)
+
+See README.md for usage.
+"""
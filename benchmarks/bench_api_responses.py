@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Benchmark: payload size and encode time of the JSON list endpoints.
+
+Seeds test cases and steps with long, realistic description / calculation
+text and requests the typical list endpoints in-process (TestClient):
+- GET /api/test-cases
+- GET /api/projects/{id}/test-cases
+- GET /api/test-cases/{id}/steps
+
+For each endpoint it reports the payload size uncompressed, gzip and Brotli
+(when installed), the time to encode the payload with the standard json
+module and with orjson, and the time per request for a baseline app (no
+compression, default JSON response) and for the real app per encoding.
+
+Usage:
+    python benchmarks/bench_api_responses.py [--cases 1000] [--steps 200] [--words 60]
+                                             [--repeat 20] [--json results.json]
+"""
+
+import argparse
+import json
+import platform
+import random
+import sys
+import tempfile
+import time
+import warnings
+from datetime import datetime
+from pathlib import Path
+
+# Add project root and backend to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+sys.path.insert(0, str(project_root / "backend"))
+
+from benchmarks.bench_export import git_commit
+from benchmarks.dataset import use_database
+
+VOCABULARY = (
+    "market value quantity price portfolio position bond yield accrued interest currency "
+    "benchmark index weight return risk limit compliance order trade settlement custody "
+    "= * / + - ( ) 100 0.25 EUR USD"
+).split()
+
+
+def text(rng, words):
+    """Return words of calculation-like text."""
+    return " ".join(rng.choice(VOCABULARY) for _ in range(words))
+
+
+def seed(db_dir, cases, steps, words, seed_value=42):
+    """Seed one project with cases test cases; the first one gets steps long steps."""
+    from shared import models
+
+    use_database(db_dir)
+    rng = random.Random(seed_value)
+    project_id = models.create_project("API benchmark", text(rng, 10))
+    test_case_ids = [
+        models.create_test_case(f"TC-{i + 1:05d}", text(rng, words), project_id)
+        for i in range(cases)
+    ]
+    for step_number in range(1, steps + 1):
+        models.create_test_step(
+            test_case_ids[0], step_number, text(rng, words),
+            modules="Portfolio Management",
+            calculation_logic=text(rng, words * 4),
+            configuration=text(rng, words)
+        )
+    return project_id, test_case_ids[0]
+
+
+def baseline_app():
+    """The API routers without compression and with FastAPI's default JSON response."""
+    from fastapi import FastAPI
+    from api.routes import test_cases, steps, projects
+
+    app = FastAPI()
+    for module in (projects, test_cases, steps):
+        app.include_router(module.router)
+    return app
+
+
+def time_requests(client, url, headers, repeat):
+    """Mean milliseconds per request and the wire size (compressed bytes) of the last response."""
+    client.get(url, headers=headers)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        response = client.get(url, headers=headers)
+    elapsed = (time.perf_counter() - start) / repeat
+    assert response.status_code == 200, response.text
+    wire_bytes = int(response.headers.get("content-length") or len(response.content))
+    return round(elapsed * 1000, 3), wire_bytes
+
+
+def time_encode(encode, payload, repeat):
+    """Mean milliseconds to encode payload."""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        encode(payload)
+    return round((time.perf_counter() - start) / repeat * 1000, 3)
+
+
+def run(cases, steps, words, repeat):
+    """Seed, then measure every endpoint."""
+    from fastapi.testclient import TestClient
+    from api import compression
+    from api.main import app
+
+    try:
+        import orjson
+    except ImportError:
+        orjson = None
+
+    encodings = ["identity", "gzip"] + (["br"] if compression.brotli is not None else [])
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        project_id, stepped_case_id = seed(tmp_dir, cases, steps, words)
+        endpoints = {
+            "test_cases": "/api/test-cases",
+            "project_test_cases": f"/api/projects/{project_id}/test-cases",
+            "steps": f"/api/test-cases/{stepped_case_id}/steps",
+        }
+
+        baseline = TestClient(baseline_app())
+        client = TestClient(app)
+        results = []
+        for name, url in endpoints.items():
+            payload = client.get(url, headers={"Accept-Encoding": "identity"}).json()
+            result = {
+                "endpoint": name,
+                "url": url,
+                "items": len(payload),
+                "encode_ms": {
+                    "json": time_encode(lambda p: json.dumps(p, ensure_ascii=False).encode("utf-8"), payload, repeat),
+                    "orjson": time_encode(orjson.dumps, payload, repeat) if orjson else None,
+                },
+            }
+            request_ms, size = time_requests(baseline, url, {"Accept-Encoding": "identity"}, repeat)
+            result["baseline"] = {"request_ms": request_ms, "bytes": size}
+            for encoding in encodings:
+                request_ms, size = time_requests(client, url, {"Accept-Encoding": encoding}, repeat)
+                result[encoding] = {"request_ms": request_ms, "bytes": size}
+
+            summary = ", ".join(f"{encoding} {result[encoding]['bytes']:,} B / {result[encoding]['request_ms']} ms"
+                                for encoding in ["baseline"] + encodings)
+            print(f"{name}: {result['items']} items; {summary}")
+            results.append(result)
+
+    return {
+        "benchmark": "api_responses",
+        "commit": git_commit(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "dataset": {"cases": cases, "steps": steps, "words": words},
+        "compression": {
+            "min_bytes": compression.COMPRESSION_MIN_BYTES,
+            "gzip_level": compression.GZIP_LEVEL,
+            "brotli_quality": compression.BROTLI_QUALITY if compression.brotli is not None else None,
+        },
+        "results": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark JSON list endpoint payloads and encoding")
+    parser.add_argument("--cases", type=int, default=1000, help="Test cases in the list endpoints")
+    parser.add_argument("--steps", type=int, default=200, help="Steps of the test case in the steps endpoint")
+    parser.add_argument("--words", type=int, default=60, help="Words per description (calculation text is 4x)")
+    parser.add_argument("--repeat", type=int, default=20, help="Requests / encodes per measurement")
+    parser.add_argument("--json", help="Write the results to this JSON file")
+    args = parser.parse_args()
+
+    warnings.simplefilter("ignore")
+    report = run(args.cases, args.steps, args.words, args.repeat)
+    print(json.dumps(report, indent=2))
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
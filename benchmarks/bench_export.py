@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Benchmark: Excel export at several scales.
+
+Seeds one synthetic dataset (see dataset.py) sized for the largest scale and
+runs create_excel_export on the first N test cases for each scale. Every run
+happens in a fresh process so peak RSS belongs to that run alone. Records
+wall time, peak memory, output size and the per-phase profile, and writes
+them as JSON together with the git commit, so results can be compared
+across commits.
+
+Usage:
+    python benchmarks/bench_export.py [--scales 10,100,1000] [--steps 3] [--screenshots 1]
+                                      [--image-size 1440x900] [--image-mode full] [--json results.json]
+"""
+
+import argparse
+import json
+import multiprocessing
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict
+from datetime import datetime
+from pathlib import Path
+
+# Add project root to path to import shared modules
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from benchmarks.dataset import DatasetConfig, seed_dataset
+
+
+def git_commit():
+    """Return the current git commit hash (with a -dirty suffix), or None outside a checkout."""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=project_root,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+        dirty = subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"], cwd=project_root,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+        return f"{commit}-dirty" if dirty else commit
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _run_export(db_file, output_path, test_case_ids, image_mode="full"):
+    """Pool worker: build one workbook and return its measurements."""
+    from shared import models
+    from shared.excel_export import create_excel_export
+    from shared.export_profile import ExportProfile
+
+    models.DB_DIR = str(Path(db_file).parent)
+    models.DB_FILE = db_file
+    profile = ExportProfile()
+    start = time.perf_counter()
+    create_excel_export(output_path, selected_test_case_ids=test_case_ids, profile=profile, image_mode=image_mode)
+    elapsed = time.perf_counter() - start
+    profile.finish()
+
+    data = profile.to_dict()
+    return {
+        "seconds": round(elapsed, 3),
+        "peak_rss_bytes": data["peak_rss_bytes"],
+        "rss_growth_bytes": data["rss_growth_bytes"],
+        "output_bytes": Path(output_path).stat().st_size,
+        "phases_ms": data["phases_ms"],
+        "counters": data["counters"],
+    }
+
+
+def run_scale(db_file, output_dir, test_case_ids, image_mode="full"):
+    """Run one export in a fresh spawned process."""
+    output_path = str(Path(output_dir) / f"bench_{len(test_case_ids)}.xlsx")
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+        result = pool.submit(_run_export, db_file, output_path, test_case_ids, image_mode).result()
+    Path(output_path).unlink()
+    return result
+
+
+def run(scales, config, image_mode="full"):
+    """Seed once for the largest scale, then benchmark every scale."""
+    config.cases = max(scales)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        start = time.perf_counter()
+        dataset = seed_dataset(tmp_dir, config)
+        seed_seconds = time.perf_counter() - start
+        from shared import models
+
+        results = []
+        for scale in scales:
+            print(f"Exporting {scale} test case(s)...")
+            result = run_scale(models.DB_FILE, tmp_dir, dataset["test_case_ids"][:scale], image_mode)
+            result = {"cases": scale, **result}
+            print(f"  {result['seconds']}s, {result['output_bytes']:,} bytes, "
+                  f"peak RSS {result['peak_rss_bytes'] or 0:,} bytes "
+                  f"(+{result['rss_growth_bytes'] or 0:,} during the export)")
+            results.append(result)
+
+    dataset_config = asdict(config)
+    del dataset_config["cases"]
+    return {
+        "benchmark": "excel_export",
+        "commit": git_commit(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "image_mode": image_mode,
+        "dataset": dataset_config,
+        "seed_seconds": round(seed_seconds, 3),
+        "results": results,
+    }
+
+
+def parse_image_size(value):
+    """Parse WIDTHxHEIGHT."""
+    try:
+        width, height = (int(part) for part in value.lower().split("x"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Invalid image size '{value}', expected WIDTHxHEIGHT")
+    return width, height
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Excel export at several scales")
+    parser.add_argument("--scales", default="10,100,1000", help="Comma-separated test case counts")
+    parser.add_argument("--projects", type=int, default=1, help="Number of projects")
+    parser.add_argument("--steps", type=int, default=3, help="Steps per test case")
+    parser.add_argument("--screenshots", type=int, default=1, help="Screenshots per step")
+    parser.add_argument("--image-size", type=parse_image_size, default=(1440, 900), help="Screenshot size, WIDTHxHEIGHT")
+    parser.add_argument("--unique-images", type=int, default=20, help="Distinct generated PNGs")
+    parser.add_argument("--image-mode", default="full", choices=["full", "thumbnail", "linked", "none"],
+                        help="How screenshots are written into the workbook")
+    parser.add_argument("--json", help="Write the results to this JSON file")
+    args = parser.parse_args()
+
+    scales = sorted({int(s) for s in args.scales.split(",") if s.strip()})
+    config = DatasetConfig(
+        projects=args.projects,
+        steps_per_case=args.steps,
+        screenshots_per_step=args.screenshots,
+        image_width=args.image_size[0],
+        image_height=args.image_size[1],
+        unique_images=args.unique_images,
+    )
+
+    report = run(scales, config, args.image_mode)
+    print(json.dumps(report, indent=2))
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
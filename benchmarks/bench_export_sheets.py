@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Benchmark: Excel export of many test case sheets.
+
+Seeds a throwaway SQLite database with one project and N test cases (500 by
+default, a few text-only steps each) and times create_excel_export on it.
+Reports build time, output size, size of xl/styles.xml and the number of
+materialised cells, so sheet-styling changes can be compared before/after.
+
+Usage:
+    python benchmarks/bench_export_sheets.py [--cases 500] [--steps 3] [--json out.json]
+"""
+
+import argparse
+import json
+import sys
+import tempfile
+import time
+import zipfile
+from pathlib import Path
+
+# Add project root to path to import shared modules
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from benchmarks.dataset import DatasetConfig, seed_dataset
+
+
+def count_cells(xlsx_path):
+    """Count <c> elements across all worksheets of a saved workbook."""
+    total = 0
+    with zipfile.ZipFile(xlsx_path) as archive:
+        for name in archive.namelist():
+            if name.startswith("xl/worksheets/sheet"):
+                total += archive.read(name).count(b"<c ")
+    return total
+
+
+def run(case_count, steps_per_case):
+    """Run the benchmark once and return the measurements."""
+    from shared.excel_export import create_excel_export
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        dataset = seed_dataset(tmp_dir, DatasetConfig(
+            cases=case_count, steps_per_case=steps_per_case, screenshots_per_step=0
+        ))
+        output_path = Path(tmp_dir) / "bench_export.xlsx"
+
+        start = time.perf_counter()
+        create_excel_export(str(output_path), selected_project_ids=dataset["project_ids"])
+        elapsed = time.perf_counter() - start
+
+        with zipfile.ZipFile(output_path) as archive:
+            styles_size = archive.getinfo("xl/styles.xml").file_size
+
+        return {
+            "cases": case_count,
+            "steps_per_case": steps_per_case,
+            "seconds": round(elapsed, 3),
+            "output_bytes": output_path.stat().st_size,
+            "styles_xml_bytes": styles_size,
+            "cells": count_cells(output_path),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark multi-sheet Excel export")
+    parser.add_argument("--cases", type=int, default=500, help="Number of test cases (one sheet each)")
+    parser.add_argument("--steps", type=int, default=3, help="Steps per test case")
+    parser.add_argument("--json", help="Write the results to this JSON file")
+    args = parser.parse_args()
+
+    result = run(args.cases, args.steps)
+    for key, value in result.items():
+        print(f"{key:>18}: {value}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
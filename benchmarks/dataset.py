@@ -0,0 +1,157 @@
+"""
+Synthetic dataset generator for benchmarks.
+
+Seeds a throwaway SQLite database through the shared.models API with a
+configurable number of projects, test cases, steps and screenshots. The
+screenshots are generated PNGs that look (and compress) roughly like real
+application screenshots: flat UI blocks, text and a noisy band.
+
+Usage:
+    from benchmarks.dataset import DatasetConfig, seed_dataset
+    summary = seed_dataset("/tmp/bench", DatasetConfig(cases=100))
+"""
+
+import os
+import random
+import shutil
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+
+# Add project root to path to import shared modules
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from shared import models
+
+
+@dataclass
+class DatasetConfig:
+    """Shape of a synthetic dataset."""
+    projects: int = 1
+    cases: int = 10                   # Total test cases, spread evenly over the projects
+    steps_per_case: int = 3
+    screenshots_per_step: int = 1
+    image_width: int = 1440
+    image_height: int = 900
+    noise_fraction: float = 0.08      # Share of the image filled with noise (drives PNG size)
+    unique_images: int = 20           # Distinct PNGs generated; screenshots cycle through them
+    seed: int = 42
+
+
+def use_database(db_dir):
+    """Point shared.models at a database file inside db_dir and create the schema."""
+    db_dir = Path(db_dir)
+    db_dir.mkdir(parents=True, exist_ok=True)
+    models.DB_DIR = str(db_dir)
+    models.DB_FILE = str(db_dir / "bench.db")
+    models.init_database()
+    return models.DB_FILE
+
+
+def generate_png(path, width, height, seed, noise_fraction=0.08):
+    """
+    Write a screenshot-like PNG to path and return its size in bytes.
+
+    Pillow is required (it is already needed to embed images in Excel).
+    """
+    from PIL import Image, ImageDraw
+
+    rng = random.Random(seed)
+    background = rng.randint(225, 255)
+    img = Image.new("RGB", (width, height), (background, background, background))
+    draw = ImageDraw.Draw(img)
+
+    # Flat UI blocks (panels, buttons, grids)
+    for _ in range(40):
+        x, y = rng.randint(0, width - 50), rng.randint(0, height - 20)
+        draw.rectangle(
+            [x, y, x + rng.randint(30, 400), y + rng.randint(10, 200)],
+            fill=tuple(rng.randint(0, 255) for _ in range(3))
+        )
+    # Text labels
+    for _ in range(150):
+        x, y = rng.randint(0, max(width - 150, 1)), rng.randint(0, max(height - 12, 1))
+        draw.text((x, y), f"Position {rng.randint(1, 9999)}  {rng.uniform(0, 1e6):,.2f}", fill=(0, 0, 0))
+    # Noisy band (photos, gradients, anti-aliasing) - the part PNG cannot compress
+    band_height = int(height * noise_fraction)
+    if band_height:
+        noise = Image.frombytes("RGB", (width, band_height), rng.randbytes(width * band_height * 3))
+        img.paste(noise, (0, height - band_height))
+
+    img.save(path, format="PNG")
+    return Path(path).stat().st_size
+
+
+def _link_or_copy(source, target):
+    """Hard-link source to target (saves disk at large scales), falling back to a copy."""
+    try:
+        os.link(source, target)
+    except OSError:
+        shutil.copyfile(source, target)
+
+
+def seed_dataset(db_dir, config=None):
+    """
+    Create a fresh database in db_dir and fill it according to config.
+
+    Screenshot files are written under db_dir/screenshots, one file per
+    screenshot row (hard links to, or copies of, the unique PNGs), like real
+    uploads.
+
+    Returns:
+        dict: IDs and totals (project_ids, test_case_ids, steps, screenshots, image_bytes)
+    """
+    config = config or DatasetConfig()
+    db_dir = Path(db_dir)
+    use_database(db_dir)
+
+    image_dir = db_dir / "screenshots"
+    image_dir.mkdir(parents=True, exist_ok=True)
+    templates = []
+    if config.screenshots_per_step > 0:
+        for i in range(config.unique_images):
+            template = image_dir / f"template_{i:03d}.png"
+            generate_png(template, config.image_width, config.image_height, config.seed + i, config.noise_fraction)
+            templates.append(template)
+
+    project_ids = [
+        models.create_project(f"Benchmark Project {p + 1}", "Synthetic benchmark project")
+        for p in range(config.projects)
+    ]
+
+    test_case_ids = []
+    step_count = 0
+    screenshot_count = 0
+    image_bytes = 0
+    for i in range(config.cases):
+        project_id = project_ids[i % len(project_ids)]
+        test_case_id = models.create_test_case(f"TC-{i + 1:05d}", f"Benchmark test case {i + 1}", project_id)
+        test_case_ids.append(test_case_id)
+
+        for step_number in range(1, config.steps_per_case + 1):
+            step_id = models.create_test_step(
+                test_case_id,
+                step_number,
+                f"Step {step_number} of test case {i + 1}",
+                modules="Portfolio Management",
+                calculation_logic="Market value = quantity * price",
+                configuration="Default configuration"
+            )
+            step_count += 1
+
+            for s in range(config.screenshots_per_step):
+                template = templates[screenshot_count % len(templates)]
+                file_path = image_dir / f"tc{test_case_id}_step{step_id}_{s + 1}.png"
+                _link_or_copy(template, file_path)
+                models.add_screenshot_to_step(step_id, str(file_path), f"Screenshot {s + 1}")
+                screenshot_count += 1
+                image_bytes += file_path.stat().st_size
+
+    return {
+        "project_ids": project_ids,
+        "test_case_ids": test_case_ids,
+        "steps": step_count,
+        "screenshots": screenshot_count,
+        "image_bytes": image_bytes,
+    }
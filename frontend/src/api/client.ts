@@ -253,6 +253,52 @@ export const stepsAPI = {
       body: JSON.stringify(data),
     });
   },
+
+  /**
+   * Load every pending capture of Capture_TC/ as steps (grouped per test case).
+   * Use dry_run to preview the grouping, archive to move the consumed files away.
+   * Images already loaded into their test case (same content) are skipped and listed in loaded.
+   */
+  loadPending: async (data: {
+    project_id?: number;
+    archive?: boolean;
+    dry_run?: boolean;
+  }): Promise<{
+    steps: Array<{
+      id: number | null;
+      test_case_id: number;
+      test_number: string;
+      step_number: number | null;
+      description: string;
+      files: string[];
+    }>;
+    unmatched: string[];
+    ambiguous: string[];
+    loaded: string[];
+    failed: string[];
+    archived: number;
+    dry_run: boolean;
+  }> => {
+    return fetchAPI<{
+      steps: Array<{
+        id: number | null;
+        test_case_id: number;
+        test_number: string;
+        step_number: number | null;
+        description: string;
+        files: string[];
+      }>;
+      unmatched: string[];
+      ambiguous: string[];
+      loaded: string[];
+      failed: string[];
+      archived: number;
+      dry_run: boolean;
+    }>('/api/steps/load-pending', {
+      method: 'POST',
+      body: JSON.stringify(data),
+    });
+  },
 };
 
 /**
@@ -287,6 +333,27 @@ export const screenshotsAPI = {
     return await response.json();
   },
 
+  /**
+   * Upload several screenshots in one request (all or nothing)
+   */
+  uploadMany: async (stepId: number, files: File[]): Promise<Screenshot[]> => {
+    const formData = new FormData();
+    files.forEach((file) => formData.append('files', file));
+
+    const url = `${API_BASE_URL}/api/steps/${stepId}/screenshots/batch`;
+    const response = await fetch(url, {
+      method: 'POST',
+      body: formData,
+    });
+
+    if (!response.ok) {
+      const error = await response.json().catch(() => ({ detail: 'Unknown error' }));
+      throw new Error(error.detail || `HTTP error! status: ${response.status}`);
+    }
+
+    return await response.json();
+  },
+
   /**
    * Get screenshot file URL
    */
@@ -294,6 +361,13 @@ export const screenshotsAPI = {
     return `${API_BASE_URL}/api/screenshots/${screenshotId}/file`;
   },
 
+  /**
+   * Get a resized preview URL (cached server-side; JPEG or WebP)
+   */
+  getThumbnailUrl: (screenshotId: number, width: number = 256): string => {
+    return `${API_BASE_URL}/api/screenshots/${screenshotId}/thumbnail?w=${width}`;
+  },
+
   /**
    * Delete a screenshot
    */
@@ -454,26 +528,44 @@ export const captureServiceAPI = {
   },
 
   /**
-   * List files in capture directory
+   * List files in capture directory (newest first).
+   * Optionally filtered by name prefix (e.g. a test case number) and kind, and paged.
    */
-  listCaptureFiles: async (): Promise<{
+  listCaptureFiles: async (params?: {
+    prefix?: string;
+    kind?: 'image' | 'text';
+    offset?: number;
+    limit?: number;
+  }): Promise<{
     files: Array<{
       name: string;
       path: string;
       size: number;
       modified: number;
+      kind?: 'image' | 'text';
+      pair?: string | null;
     }>;
     directory: string;
+    total?: number;
   }> => {
+    const query = new URLSearchParams();
+    if (params?.prefix) query.set('prefix', params.prefix);
+    if (params?.kind) query.set('kind', params.kind);
+    if (params?.offset) query.set('offset', String(params.offset));
+    if (params?.limit) query.set('limit', String(params.limit));
+    const suffix = query.toString() ? `?${query.toString()}` : '';
     return fetchAPI<{
       files: Array<{
         name: string;
         path: string;
         size: number;
         modified: number;
+        kind?: 'image' | 'text';
+        pair?: string | null;
       }>;
       directory: string;
-    }>('/api/capture-service/capture-files');
+      total?: number;
+    }>(`/api/capture-service/capture-files${suffix}`);
   },
 
   /**
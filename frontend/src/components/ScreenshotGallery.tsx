@@ -10,6 +10,9 @@ interface ScreenshotGalleryProps {
   refreshTrigger?: number; // Trigger reload when this changes
 }
 
+// Gallery tiles are 64px (w-16); fetch 2x for high-DPI screens
+const TILE_THUMBNAIL_WIDTH = 128;
+
 interface ScreenshotModalProps {
   screenshot: Screenshot;
   isOpen: boolean;
@@ -140,7 +143,7 @@ export const ScreenshotGallery: React.FC<ScreenshotGalleryProps> = ({
             <h4 className="text-sm font-medium text-gray-700 dark:text-gray-300 mb-2">Screenshots:</h4>
             <div className="flex flex-wrap gap-2">
               {screenshots.map((screenshot) => {
-                const imageUrl = screenshotsAPI.getFileUrl(screenshot.id);
+                const imageUrl = screenshotsAPI.getThumbnailUrl(screenshot.id, TILE_THUMBNAIL_WIDTH);
 
                 return (
                   <button
@@ -151,6 +154,7 @@ export const ScreenshotGallery: React.FC<ScreenshotGalleryProps> = ({
                     <img
                       src={imageUrl}
                       alt={`Screenshot ${screenshot.id}`}
+                      loading="lazy"
                       className="w-full h-full object-cover"
                       onError={(e) => {
                         (e.target as HTMLImageElement).style.display = 'none';
@@ -112,17 +112,17 @@ export const ScreenshotUpload: React.FC<ScreenshotUploadProps> = ({
     }
   };
 
-  const handleFileSelect = async (file: File) => {
-    // Validate file type
+  const handleFilesSelect = async (files: File[]) => {
+    // Validate file types
     const validTypes = ['image/png', 'image/jpeg', 'image/jpg', 'image/gif', 'image/bmp'];
-    if (!validTypes.includes(file.type)) {
+    if (files.some(file => !validTypes.includes(file.type))) {
       setError('Invalid file type. Please upload PNG, JPG, JPEG, GIF, or BMP.');
       return;
     }
 
     // Validate file size (200MB max)
     const maxSize = 200 * 1024 * 1024; // 200MB in bytes
-    if (file.size > maxSize) {
+    if (files.some(file => file.size > maxSize)) {
       setError('File size exceeds 200MB limit.');
       return;
     }
@@ -130,9 +130,12 @@ export const ScreenshotUpload: React.FC<ScreenshotUploadProps> = ({
     try {
       setUploading(true);
       setError(null);
-      const screenshot = await screenshotsAPI.upload(stepId, file);
+      // One request for the whole selection
+      const screenshots = files.length === 1
+        ? [await screenshotsAPI.upload(stepId, files[0])]
+        : await screenshotsAPI.uploadMany(stepId, files);
       if (onScreenshotUploaded) {
-        onScreenshotUploaded(screenshot);
+        screenshots.forEach(screenshot => onScreenshotUploaded(screenshot));
       }
       // Reset file input
       if (fileInputRef.current) {
@@ -146,9 +149,9 @@ export const ScreenshotUpload: React.FC<ScreenshotUploadProps> = ({
   };
 
   const handleFileChange = (e: React.ChangeEvent<HTMLInputElement>) => {
-    const file = e.target.files?.[0];
-    if (file) {
-      handleFileSelect(file);
+    const files = Array.from(e.target.files || []);
+    if (files.length > 0) {
+      handleFilesSelect(files);
     }
   };
 
@@ -172,9 +175,9 @@ export const ScreenshotUpload: React.FC<ScreenshotUploadProps> = ({
     e.stopPropagation();
     setDragActive(false);
 
-    const file = e.dataTransfer.files?.[0];
-    if (file) {
-      handleFileSelect(file);
+    const files = Array.from(e.dataTransfer.files || []);
+    if (files.length > 0) {
+      handleFilesSelect(files);
     }
   };
 
@@ -198,6 +201,7 @@ export const ScreenshotUpload: React.FC<ScreenshotUploadProps> = ({
           ref={fileInputRef}
           type="file"
           accept="image/png,image/jpeg,image/jpg,image/gif,image/bmp"
+          multiple
           onChange={handleFileChange}
           disabled={uploading}
           className="hidden"
@@ -229,6 +233,7 @@ export const ScreenshotUpload: React.FC<ScreenshotUploadProps> = ({
           ref={fileInputRef}
           type="file"
           accept="image/png,image/jpeg,image/jpg,image/gif,image/bmp"
+          multiple
           onChange={handleFileChange}
           disabled={uploading}
           className="hidden"
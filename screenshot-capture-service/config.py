@@ -14,6 +14,8 @@ DESKTOP_DIR = HOME_DIR / "Desktop"
 SCREENSHOTS_DIR = HOME_DIR / "Desktop" / "Capture_TC"
 # Keep log file in Documents to avoid cluttering Desktop
 LOG_FILE = (HOME_DIR / "Documents" / "TestCaseScreenshots" / "screenshot-capture.log")
+# PID files of the service and watcher processes (see process_registry.py)
+RUN_DIR = HOME_DIR / "Documents" / "TestCaseScreenshots" / "run"
 
 # Logging Configuration
 LOG_MAX_SIZE = 10 * 1024 * 1024  # 10 MB
@@ -31,4 +33,5 @@ DESCRIPTION_FILE_EXTENSION = ".txt"
 SCREENSHOTS_DIR.mkdir(parents=True, exist_ok=True)
 # Ensure log directory exists
 LOG_FILE.parent.mkdir(parents=True, exist_ok=True)
+RUN_DIR.mkdir(parents=True, exist_ok=True)
 
@@ -0,0 +1,158 @@
+"""
+Screenshot Capture Service - Process registry
+PID files for the service and watcher processes, so liveness checks are O(1)
+
+Each process registers itself in RUN_DIR/<name>.pid (JSON: pid, process
+create time, command, start time) and touches the file every
+HEARTBEAT_SECONDS. A lookup reads one small file and asks the OS for the
+create time of that one PID: a PID file whose process is gone, or whose PID
+was reused by another process (different create time), is stale and is
+removed. A process that is alive but has not touched its file for
+STALE_AFTER_SECONDS is reported as not responsive.
+
+A scan of every process (find_processes) is only used as a fallback cleanup
+path, e.g. to stop processes started before they had PID files.
+
+This module has no dependency on config.py, so the backend can load it too.
+"""
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+import psutil
+
+HEARTBEAT_SECONDS = 5
+STALE_AFTER_SECONDS = 3 * HEARTBEAT_SECONDS
+
+SERVICE = "screenshot-service"
+WATCHER = "screenshot-watcher"
+
+
+class ProcessRegistry:
+    """PID files in one directory, keyed by process name."""
+
+    def __init__(self, run_dir):
+        self.run_dir = Path(run_dir)
+
+    def path(self, name):
+        return self.run_dir / f"{name}.pid"
+
+    def register(self, name, pid=None, cmd=None):
+        """Write the PID file for a process (default: the current one)."""
+        pid = pid or os.getpid()
+        proc = psutil.Process(pid)
+        entry = {
+            "pid": pid,
+            "create_time": proc.create_time(),
+            "cmd": cmd or " ".join(proc.cmdline()),
+            "started_at": time.time(),
+        }
+        self.run_dir.mkdir(parents=True, exist_ok=True)
+        temp_path = self.path(name).with_suffix(f".{pid}.tmp")
+        temp_path.write_text(json.dumps(entry))
+        os.replace(temp_path, self.path(name))
+        return entry
+
+    def unregister(self, name, pid=None):
+        """Remove the PID file if it still belongs to pid (default: the current process)."""
+        pid = pid or os.getpid()
+        entry = self._read(name)
+        if entry is not None and entry.get("pid") == pid:
+            self._remove(name)
+
+    def heartbeat(self, name):
+        """Mark the process as responsive (touches its PID file)."""
+        try:
+            os.utime(self.path(name))
+        except FileNotFoundError:
+            pass
+
+    def start_heartbeat(self, name, interval=HEARTBEAT_SECONDS):
+        """Touch the PID file every interval seconds from a daemon thread."""
+        def beat():
+            while True:
+                self.heartbeat(name)
+                time.sleep(interval)
+
+        thread = threading.Thread(target=beat, name=f"{name}-heartbeat", daemon=True)
+        thread.start()
+        return thread
+
+    def lookup(self, name):
+        """
+        Return the entry of a live registered process, or None.
+
+        The entry gains "heartbeat_age" (seconds since the last heartbeat) and
+        "responsive" (heartbeat within STALE_AFTER_SECONDS). Stale PID files
+        are removed.
+        """
+        entry = self._read(name)
+        if entry is None:
+            return None
+        try:
+            create_time = psutil.Process(entry["pid"]).create_time()
+        except (psutil.NoSuchProcess, psutil.ZombieProcess, KeyError, ValueError):
+            create_time = None
+        except psutil.AccessDenied:
+            # Alive but owned by another user: trust the PID file
+            create_time = entry.get("create_time")
+        if create_time is None or abs(create_time - entry.get("create_time", 0)) > 0.01:
+            self._remove(name)
+            return None
+
+        try:
+            heartbeat_age = max(0.0, time.time() - self.path(name).stat().st_mtime)
+        except FileNotFoundError:
+            return None
+        entry["heartbeat_age"] = heartbeat_age
+        entry["responsive"] = heartbeat_age <= STALE_AFTER_SECONDS
+        return entry
+
+    def is_running(self, name):
+        """Whether a live process is registered under name."""
+        return self.lookup(name) is not None
+
+    def get_process(self, name):
+        """psutil.Process of the registered process, or None."""
+        entry = self.lookup(name)
+        if entry is None:
+            return None
+        try:
+            return psutil.Process(entry["pid"])
+        except psutil.NoSuchProcess:
+            return None
+
+    def _read(self, name):
+        try:
+            return json.loads(self.path(name).read_text())
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError):
+            # Unreadable / half-written file: treat as stale
+            self._remove(name)
+            return None
+
+    def _remove(self, name):
+        try:
+            self.path(name).unlink()
+        except FileNotFoundError:
+            pass
+
+
+def find_processes(script_name):
+    """
+    Fallback cleanup path: every process whose command line mentions script_name.
+
+    Iterates all processes on the machine; do not use for liveness checks.
+    """
+    found = []
+    for proc in psutil.process_iter(['pid', 'cmdline']):
+        try:
+            cmdline = proc.info.get('cmdline') or []
+            if script_name in ' '.join(cmdline) and proc.pid != os.getpid():
+                found.append(proc)
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            continue
+    return found
@@ -6,12 +6,15 @@ from flask import Flask, jsonify, request
 from flask_cors import CORS
 import subprocess
 import os
+import sys
+import atexit
 import signal
 import psutil
 import time
 from pathlib import Path
 import config
 from logger import get_logger
+from process_registry import ProcessRegistry, find_processes, SERVICE, WATCHER
 
 # Initialize logger
 logger = get_logger("SERVICE")
@@ -22,6 +25,9 @@ CORS(app)  # Allow requests from web interface
 # Global variable to track watcher process
 watcher_process = None
 
+# PID files of the service and watcher (O(1) liveness checks)
+registry = ProcessRegistry(config.RUN_DIR)
+
 
 def is_watcher_running():
     """Check if watcher process is running"""
@@ -35,20 +41,11 @@ def is_watcher_running():
             # Processus mort, nettoyer
             watcher_process = None
     
-    # Vérifier aussi s'il y a d'autres watchers qui tournent (au cas où)
+    # Vérifier aussi le watcher enregistré (PID file, au cas où il a été lancé ailleurs)
     try:
-        for proc in psutil.process_iter(['pid', 'name', 'cmdline']):
-            try:
-                cmdline = proc.info.get('cmdline', [])
-                if cmdline and 'screenshot-watcher.py' in ' '.join(cmdline):
-                    # Trouvé un watcher qui tourne
-                    return True
-            except (psutil.NoSuchProcess, psutil.AccessDenied):
-                continue
+        return registry.is_running(WATCHER)
     except Exception:
-        pass
-    
-    return False
+        return False
 
 
 def stop_all_watchers():
@@ -74,27 +71,30 @@ def stop_all_watchers():
         finally:
             watcher_process = None
     
-    # Chercher et arrêter TOUS les autres watchers
+    # Chercher et arrêter TOUS les autres watchers: celui enregistré, puis
+    # (nettoyage de secours) ceux trouvés en parcourant les processus
     try:
-        for proc in psutil.process_iter(['pid', 'name', 'cmdline']):
+        processes = []
+        registered = registry.get_process(WATCHER)
+        if registered is not None:
+            processes.append(registered)
+        processes.extend(p for p in find_processes('screenshot-watcher.py')
+                         if registered is None or p.pid != registered.pid)
+        for proc in processes:
+            pid = proc.pid
+            logger.info(f"Found additional watcher process (PID: {pid}), stopping it...")
             try:
-                cmdline = proc.info.get('cmdline', [])
-                if cmdline and 'screenshot-watcher.py' in ' '.join(cmdline):
-                    pid = proc.info['pid']
-                    logger.info(f"Found additional watcher process (PID: {pid}), stopping it...")
-                    try:
-                        proc.terminate()
-                        try:
-                            proc.wait(timeout=2)
-                        except psutil.TimeoutExpired:
-                            proc.kill()
-                            proc.wait()
-                        stopped_count += 1
-                        logger.info(f"Stopped watcher process (PID: {pid})")
-                    except (psutil.NoSuchProcess, psutil.AccessDenied) as e:
-                        logger.debug(f"Could not stop process {pid}: {e}")
-            except (psutil.NoSuchProcess, psutil.AccessDenied):
-                continue
+                proc.terminate()
+                try:
+                    proc.wait(timeout=2)
+                except psutil.TimeoutExpired:
+                    proc.kill()
+                    proc.wait()
+                stopped_count += 1
+                logger.info(f"Stopped watcher process (PID: {pid})")
+            except (psutil.NoSuchProcess, psutil.AccessDenied) as e:
+                logger.debug(f"Could not stop process {pid}: {e}")
+            registry.unregister(WATCHER, pid)
     except Exception as e:
         logger.warning(f"Error finding/stopping watchers: {e}")
     
@@ -221,6 +221,12 @@ def stop():
 
 
 if __name__ == "__main__":
+    # Register in the process registry; SIGTERM (stop-service.py) exits through atexit
+    registry.register(SERVICE)
+    registry.start_heartbeat(SERVICE)
+    atexit.register(registry.unregister, SERVICE)
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    
     logger.info(f"Starting Screenshot Capture Service on {config.API_HOST}:{config.API_PORT}")
     print(f"Starting Screenshot Capture Service on {config.API_HOST}:{config.API_PORT}")
     app.run(host=config.API_HOST, port=config.API_PORT, debug=False)
@@ -17,10 +17,14 @@ from watchdog.events import FileSystemEventHandler, FileSystemEvent
 import subprocess
 import config
 from logger import get_logger
+from process_registry import ProcessRegistry, WATCHER
 
 # Initialize logger
 logger = get_logger("WATCHER")
 
+# PID file of this watcher (lets the service check liveness without scanning processes)
+registry = ProcessRegistry(config.RUN_DIR)
+
 # Track processed files to avoid duplicates
 processed_files = set()
 
@@ -398,6 +402,7 @@ def signal_handler(signum, frame):
             logger.error(f"Error stopping observer: {e}")
     
     # Sortir immédiatement avec os._exit pour forcer l'arrêt (ne déclenche pas les handlers finally)
+    registry.unregister(WATCHER)
     logger.info("Exiting watcher process immediately")
     os._exit(0)
 
@@ -412,6 +417,8 @@ def main():
     with watcher_lock:
         watcher_active = True
     logger.info("Starting screenshot watcher")
+    registry.register(WATCHER)
+    registry.start_heartbeat(WATCHER)
     
     # Vérifier que le dossier Desktop existe
     if not config.DESKTOP_DIR.exists():
@@ -450,6 +457,7 @@ def main():
         observer.stop()
         # Attendre un peu pour que les événements en cours se terminent
         observer.join(timeout=1)
+        registry.unregister(WATCHER)
         logger.info("Watcher shutdown complete")
 
 
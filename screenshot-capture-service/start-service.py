@@ -15,23 +15,20 @@ logger = get_logger("START-SCRIPT")
 script_dir = Path(__file__).parent
 service_script = script_dir / "screenshot-service.py"
 
-# Check if service is already running
+# Check if service is already running (PID file written by the service itself)
 service_running = False
 running_pid = None
 
 try:
-    import psutil
-    for proc in psutil.process_iter(['pid', 'name', 'cmdline']):
-        try:
-            cmdline = proc.info.get('cmdline', [])
-            if cmdline and 'screenshot-service.py' in ' '.join(cmdline):
-                service_running = True
-                running_pid = proc.info['pid']
-                logger.info(f"Service is already running (PID: {running_pid})")
-                print(f"Service is already running (PID: {running_pid})")
-                sys.exit(0)
-        except (psutil.NoSuchProcess, psutil.AccessDenied):
-            continue
+    import config
+    from process_registry import ProcessRegistry, SERVICE
+    running = ProcessRegistry(config.RUN_DIR).lookup(SERVICE)
+    if running:
+        service_running = True
+        running_pid = running['pid']
+        logger.info(f"Service is already running (PID: {running_pid})")
+        print(f"Service is already running (PID: {running_pid})")
+        sys.exit(0)
 except ImportError:
     # psutil not available, try basic check
     logger.warning("psutil not available, cannot check for running service")
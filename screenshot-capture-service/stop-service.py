@@ -5,21 +5,23 @@ Stop the Screenshot Capture Service
 import sys
 import signal
 import psutil
+import config
 from logger import get_logger
+from process_registry import ProcessRegistry, find_processes, SERVICE
 
 # Initialize logger
 logger = get_logger("STOP-SCRIPT")
 
+registry = ProcessRegistry(config.RUN_DIR)
+
 def find_service_process():
-    """Find the screenshot-service.py process"""
-    for proc in psutil.process_iter(['pid', 'name', 'cmdline']):
-        try:
-            cmdline = proc.info.get('cmdline', [])
-            if cmdline and 'screenshot-service.py' in ' '.join(cmdline):
-                return proc
-        except (psutil.NoSuchProcess, psutil.AccessDenied):
-            continue
-    return None
+    """Find the screenshot-service.py process (PID file first, process scan as fallback)"""
+    proc = registry.get_process(SERVICE)
+    if proc is not None:
+        return proc
+    # Fallback cleanup path: a service started without a PID file
+    processes = find_processes('screenshot-service.py')
+    return processes[0] if processes else None
 
 def stop_service():
     """Stop the screenshot capture service"""
@@ -40,6 +42,7 @@ def stop_service():
         # Wait for graceful shutdown (5 seconds max)
         try:
             proc.wait(timeout=5)
+            registry.unregister(SERVICE, pid)
             logger.info("Service stopped successfully", extra={'data': {"pid": pid, "method": "graceful"}})
             print("Service stopped successfully")
             return True
@@ -49,6 +52,7 @@ def stop_service():
             print("Service didn't stop gracefully, forcing kill...")
             proc.kill()
             proc.wait()
+            registry.unregister(SERVICE, pid)
             logger.info("Service stopped (forced)", extra={'data': {"pid": pid, "method": "forced"}})
             print("Service stopped (forced)")
             return True
@@ -11,11 +11,11 @@ import sys
 import os
 from pathlib import Path
 
-# Add shared to path
+# Add project root to path
 project_root = Path(__file__).parent.parent
-sys.path.insert(0, str(project_root / "shared"))
+sys.path.insert(0, str(project_root))
 
-from models import get_db_connection
+from shared.models import get_db_connection
 
 def is_base64_xlsx(data: str) -> bool:
     """Check if a string looks like base64-encoded XLSX data."""
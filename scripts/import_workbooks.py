@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Script to bulk-import historical Excel workbooks into the database.
+
+Accepts .xlsx files and directories (searched recursively). Each workbook is
+streamed with openpyxl's read-only mode and imported in one transaction;
+test cases that already exist in their project are skipped, so the script
+can be re-run over the same folders.
+
+Usage:
+    python scripts/import_workbooks.py PATH [PATH ...] [--project-id ID]
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+# Add project root to path to import shared modules
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from shared.models import init_database, get_project_by_id
+from shared.excel_import import import_workbook
+
+
+def find_workbooks(paths):
+    """Yield .xlsx files from the given files and directories (skipping Excel lock files)."""
+    for path in map(Path, paths):
+        if path.is_dir():
+            candidates = sorted(path.rglob("*.xlsx"))
+        else:
+            candidates = [path]
+        for candidate in candidates:
+            if not candidate.name.startswith("~$"):
+                yield candidate
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import test cases from Excel workbooks")
+    parser.add_argument("paths", nargs="+", help="Workbooks or directories containing workbooks")
+    parser.add_argument("--project-id", type=int, help="Import every test case into this project "
+                        "(default: projects named in each workbook's Summary sheet)")
+    args = parser.parse_args()
+
+    init_database()
+    if args.project_id is not None and not get_project_by_id(args.project_id):
+        print(f"❌ Project {args.project_id} not found")
+        return 1
+
+    totals = {"workbooks": 0, "failed": 0, "test_cases": 0, "steps": 0, "screenshots": 0, "skipped": 0}
+    start = time.perf_counter()
+    for workbook in find_workbooks(args.paths):
+        try:
+            result = import_workbook(str(workbook), project_id=args.project_id)
+        except Exception as e:
+            print(f"❌ {workbook}: {e}")
+            totals["failed"] += 1
+            continue
+        totals["workbooks"] += 1
+        for key in ("test_cases", "steps", "screenshots"):
+            totals[key] += result[key]
+        totals["skipped"] += len(result["skipped"])
+        print(f"✅ {workbook}: {result['test_cases']} test case(s), {result['steps']} step(s), "
+              f"{result['screenshots']} screenshot(s), {len(result['skipped'])} skipped")
+
+    print(f"\nImported {totals['workbooks']} workbook(s) in {time.perf_counter() - start:.1f}s "
+          f"({totals['failed']} failed): {totals['test_cases']} test case(s), {totals['steps']} step(s), "
+          f"{totals['screenshots']} screenshot(s), {totals['skipped']} existing test case(s) skipped")
+    return 1 if totals["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,5 +4,12 @@ Shared components for Test Case Documentation Tool.
 This package contains reusable components:
 - models.py: Database models and CRUD operations
 - excel_export.py: Excel export functionality
+- excel_import.py: Excel workbook import (read-only streaming, embedded images)
+- text_export.py: Streaming JSON Lines / CSV export
+- html_export.py: Static HTML bundle export (streamed ZIP)
+- export_profile.py: Per-phase export timings and counters
+- export_estimate.py: Export size / memory estimates and automatic workbook splitting
+- zip_stream.py: Non-seekable sink for streaming ZIP archives
+- metrics.py: In-process counters / gauges / histograms in Prometheus text format
 """
 
@@ -5,41 +5,173 @@ This module handles exporting test cases and their data to Excel workbooks.
 """
 
 from openpyxl import Workbook
-from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
+from openpyxl.styles import Font, PatternFill, Alignment, Border, Side, NamedStyle
 from openpyxl.utils import get_column_letter
 from openpyxl.drawing.image import Image as XLImage
+from openpyxl.writer.excel import ExcelWriter
 from shared.models import (
     get_all_test_cases,
-    get_test_case_by_id,
     get_steps_by_test_case,
     get_screenshots_by_step,
-    get_project_by_id,
-    get_all_projects
+    get_project_by_id
 )
-from datetime import datetime
+from shared import models
+from shared.zip_stream import ZipStreamSink
+from shared.export_profile import ExportProfile
+from shared.thumbnails import write_thumbnail
+from shared.export_estimate import estimate_export, split_into_workbooks
+from shared import export_estimate
+from datetime import datetime, timezone
+import copy
+import hashlib
+import io
+import multiprocessing
 import os
+import re
+import shutil
+import tempfile
+import weakref
+import zipfile
 from pathlib import Path
 
 
-def create_excel_export(output_path="test_cases_export.xlsx", selected_test_case_ids=None, selected_project_ids=None):
+# Sheet background: gridlines are hidden at sheet-view level and the first
+# columns carry a white default fill, so empty cells are never materialised.
+SHEET_BACKGROUND_COLUMNS = 20
+EXCEL_DEFAULT_COLUMN_WIDTH = 8.43
+WHITE_FILL = PatternFill(start_color="FFFFFF", end_color="FFFFFF", fill_type="solid")
+
+THIN_SIDE = Side(style='thin')
+THICK_SIDE = Side(style='thick', color='000000')
+THIN_BORDER = Border(left=THIN_SIDE, right=THIN_SIDE, top=THIN_SIDE, bottom=THIN_SIDE)
+
+# Summary frame borders (thick black box around the summary table)
+FRAME_TOP_LEFT = Border(left=THICK_SIDE, top=THICK_SIDE)
+FRAME_TOP_RIGHT = Border(right=THICK_SIDE, top=THICK_SIDE)
+FRAME_TOP = Border(top=THICK_SIDE)
+FRAME_LEFT = Border(left=THICK_SIDE)
+FRAME_RIGHT = Border(right=THICK_SIDE)
+FRAME_BOTTOM_LEFT = Border(left=THICK_SIDE, bottom=THICK_SIDE)
+FRAME_BOTTOM_RIGHT = Border(right=THICK_SIDE, bottom=THICK_SIDE)
+FRAME_BOTTOM = Border(bottom=THICK_SIDE)
+
+# Step header band: only top and bottom (medium)
+STEP_HEADER_BORDER = Border(top=Side(style='medium'), bottom=Side(style='medium'))
+STEP_HEADER_FILL = PatternFill(start_color="D9E1F2", end_color="D9E1F2", fill_type="solid")  # Light blue
+
+LINK_FONT = Font(color="0563C1", underline="single")  # Blue, underlined
+
+# How screenshots go into the workbook:
+# - full: embedded at display size (default)
+# - thumbnail: small embedded JPEG preview plus a link to the original
+# - linked: a link to the original only
+# - none: screenshot name and file name only
+IMAGE_MODES = ("full", "thumbnail", "linked", "none")
+LINKED_IMAGE_MODES = ("thumbnail", "linked")
+THUMBNAIL_WIDTH = 240
+THUMBNAIL_QUALITY = 75
+# Side folder (next to the workbook) holding the originals when links are relative
+LINKED_IMAGES_FOLDER = "images"
+HASH_CHUNK_SIZE = 256 * 1024
+
+# Per-workbook image index used to store identical images once:
+# workbook -> {"hashes": file path -> content hash, "images": content hash -> first SharedMediaImage}
+_MEDIA_INDEXES = weakref.WeakKeyDictionary()
+
+
+def _build_named_styles():
+    """Return fresh NamedStyle instances (a NamedStyle can only be bound to one workbook)."""
+    return [
+        NamedStyle(name="TC Summary Title", font=Font(bold=True, size=14)),
+        NamedStyle(
+            name="TC Header",
+            font=Font(bold=True, size=11, color="FFFFFF"),  # White text, bold
+            fill=PatternFill(start_color="1F4E78", end_color="1F4E78", fill_type="solid"),  # Dark blue
+            alignment=Alignment(horizontal="center", vertical="center"),
+            border=THIN_BORDER
+        ),
+        NamedStyle(
+            name="TC Project Header",
+            font=Font(bold=True, size=12, color="000000"),
+            fill=PatternFill(start_color="D0D0D0", end_color="D0D0D0", fill_type="solid"),  # Gray
+            alignment=Alignment(horizontal="left", vertical="center"),
+            border=THIN_BORDER
+        ),
+        NamedStyle(name="TC Link Cell", font=LINK_FONT, border=THIN_BORDER),
+        NamedStyle(
+            name="TC Wrapped Cell",
+            alignment=Alignment(wrap_text=True, vertical="top"),
+            border=THIN_BORDER
+        ),
+        NamedStyle(
+            name="TC Centered Cell",
+            alignment=Alignment(horizontal="center"),
+            border=THIN_BORDER
+        ),
+        NamedStyle(name="TC Sheet Title", font=Font(bold=True, size=12)),
+        NamedStyle(
+            name="TC Go To",
+            font=Font(size=10),
+            alignment=Alignment(horizontal="right", vertical="center")
+        ),
+        NamedStyle(name="TC Link", font=LINK_FONT),
+        NamedStyle(
+            name="TC Step Header",
+            font=Font(bold=True, size=11),
+            fill=STEP_HEADER_FILL,
+            border=STEP_HEADER_BORDER,
+            alignment=Alignment(wrap_text=True, vertical="top")
+        ),
+        NamedStyle(name="TC Step Band", fill=STEP_HEADER_FILL, border=STEP_HEADER_BORDER),
+        NamedStyle(
+            name="TC Notes",
+            font=Font(size=10),
+            alignment=Alignment(wrap_text=True, vertical="top")
+        ),
+        NamedStyle(name="TC Image Error", font=Font(italic=True, color="808080")),
+        NamedStyle(name="TC Image Missing", font=Font(italic=True, color="FF0000")),
+        NamedStyle(name="TC Placeholder", font=Font(italic=True)),
+        NamedStyle(name="TC Image Reference", font=Font(color="595959")),
+    ]
+
+
+def register_named_styles(wb):
+    """Register the exporter's NamedStyles on a workbook (idempotent)."""
+    existing = set(wb.style_names)
+    for style in _build_named_styles():
+        if style.name not in existing:
+            wb.add_named_style(style)
+
+
+def apply_sheet_defaults(sheet):
     """
-    Create an Excel workbook with test case documentation.
+    Give a sheet its white background without touching individual cells.
+    
+    Hides gridlines in the sheet view and sets a white default fill on the
+    first columns, then makes sure the workbook knows the exporter's styles.
+    """
+    register_named_styles(sheet.parent)
+    sheet.sheet_view.showGridLines = False
+    for col in range(1, SHEET_BACKGROUND_COLUMNS + 1):
+        dimension = sheet.column_dimensions[get_column_letter(col)]
+        dimension.width = EXCEL_DEFAULT_COLUMN_WIDTH
+        dimension.fill = WHITE_FILL
+
+
+def select_test_cases(selected_test_case_ids=None, selected_project_ids=None, since=None):
+    """
+    Resolve the test cases to export and the projects they belong to.
     
     Args:
-        output_path: Path where the Excel file should be saved
         selected_test_case_ids: Optional list of test case IDs to export. If None, exports all.
         selected_project_ids: Optional list of project IDs to export. If provided, exports all test cases from those projects.
+        since: Optional datetime; keep only test cases whose row, steps or screenshots changed at or after it
         
     Returns:
-        str: Path to the created Excel file
+        tuple: (test_cases, projects_dict) where each test case carries
+        '_project_id' / '_project_name' when its project exists, and
+        '_changed_at' (latest change, UTC) when since is given
     """
-    # Create workbook
-    wb = Workbook()
-    
-    # Remove default sheet
-    if 'Sheet' in wb.sheetnames:
-        wb.remove(wb['Sheet'])
-    
     # Get test cases based on provided filters
     if selected_project_ids:
         # Fetch test cases by project IDs
@@ -92,13 +224,70 @@ def create_excel_export(output_path="test_cases_export.xlsx", selected_test_case
                     tc['_project_id'] = project_id
                     tc['_project_name'] = projects_dict[project_id]['name']
     
+    # Delta export: keep only test cases changed since the given time
+    if since is not None:
+        changed = models.get_changed_test_cases(since)
+        test_cases = [tc for tc in test_cases if tc['id'] in changed]
+        for tc in test_cases:
+            tc['_changed_at'] = changed[tc['id']]
+    
+    return test_cases, projects_dict
+
+
+def create_excel_export(output_path="test_cases_export.xlsx", selected_test_case_ids=None, selected_project_ids=None,
+                        profile=None, since=None, image_mode="full", image_base_url=None):
+    """
+    Create an Excel workbook with test case documentation.
+    
+    Args:
+        output_path: Path where the Excel file should be saved, or a writable binary file object
+        selected_test_case_ids: Optional list of test case IDs to export. If None, exports all.
+        selected_project_ids: Optional list of project IDs to export. If provided, exports all test cases from those projects.
+        profile: Optional ExportProfile that receives phase timings, counters and the RSS
+            sampled while the workbook is built
+        since: Optional datetime for a delta export: only test cases changed at or after it are
+            exported, and the summary sheet shows when each one last changed
+        image_mode: How screenshots are written: "full" (embedded, default), "thumbnail" (small
+            preview plus link to the original), "linked" (link only) or "none" (metadata only)
+        image_base_url: Base URL of the API for links to originals (thumbnail and linked modes).
+            Without it, links are relative paths into an "images/" folder next to the workbook
+            (see iter_workbook_bundle_zip)
+        
+    Returns:
+        str: Path to the created Excel file (or the file object that was written to)
+    """
+    if image_mode not in IMAGE_MODES:
+        raise ValueError(f"Unknown image mode '{image_mode}' (expected one of: {', '.join(IMAGE_MODES)})")
+    if profile is None:
+        profile = ExportProfile()
+    
+    with profile.track_memory():
+        return _write_excel_export(output_path, selected_test_case_ids, selected_project_ids,
+                                   profile, since, image_mode, image_base_url)
+
+
+def _write_excel_export(output_path, selected_test_case_ids, selected_project_ids, profile, since,
+                        image_mode, image_base_url):
+    """Build and save the workbook (see create_excel_export)."""
+    # Create workbook
+    wb = Workbook()
+    
+    # Remove default sheet
+    if 'Sheet' in wb.sheetnames:
+        wb.remove(wb['Sheet'])
+    
+    # Get test cases based on provided filters
+    with profile.phase("db_fetch"):
+        test_cases, projects_dict = select_test_cases(selected_test_case_ids, selected_project_ids, since)
+    profile.count("test_cases", len(test_cases))
+    
     # Group test cases by project for summary
     # Always use projects_dict (populated for all cases)
     projects_info = projects_dict
     
     # Create Summary sheet
     summary_sheet = wb.create_sheet("Summary", 0)
-    create_summary_sheet(summary_sheet, test_cases, projects_info)
+    create_summary_sheet(summary_sheet, test_cases, projects_info, profile=profile, since=since)
     
     # Create a sheet for each test case
     for test_case in test_cases:
@@ -130,24 +319,24 @@ def create_excel_export(output_path="test_cases_export.xlsx", selected_test_case
             counter += 1
         
         test_sheet = wb.create_sheet(sheet_name)
-        create_test_case_sheet(test_sheet, test_case)
+        create_test_case_sheet(test_sheet, test_case, profile=profile,
+                               image_mode=image_mode, image_base_url=image_base_url)
     
     # Save workbook
-    wb.save(output_path)
+    with profile.phase("save"):
+        save_workbook(wb, output_path)
+    profile.finish()
     return output_path
 
 
-def create_summary_sheet(sheet, test_cases=None, projects_info=None):
-    """Create the summary sheet with all test cases matching the reference format, grouped by project."""
-    # Get test cases if not provided
-    if test_cases is None:
-        test_cases = get_all_test_cases()
-    
-    # Group test cases by project
-    if projects_info is None:
-        projects_info = {}
+def group_test_cases_by_project(test_cases, projects_info):
+    """
+    Split test cases into per-project groups (in first-seen order) and the rest.
     
-    # Group test cases by project_id
+    Returns:
+        tuple: (grouped_by_project, ungrouped_test_cases) where grouped_by_project
+        maps project_id to its list of test cases
+    """
     grouped_by_project = {}
     ungrouped_test_cases = []
     
@@ -160,30 +349,248 @@ def create_summary_sheet(sheet, test_cases=None, projects_info=None):
         else:
             ungrouped_test_cases.append(tc)
     
-    # White fill for all cells
-    white_fill = PatternFill(start_color="FFFFFF", end_color="FFFFFF", fill_type="solid")
-    
-    # Apply white fill to entire sheet (first 100 rows, first 20 columns)
-    for row in range(1, 101):
-        for col in range(1, 21):
-            cell = sheet.cell(row=row, column=col)
-            cell.fill = white_fill
-    
-    # Define borders
-    thin_border = Border(
-        left=Side(style='thin'),
-        right=Side(style='thin'),
-        top=Side(style='thin'),
-        bottom=Side(style='thin')
-    )
-    
-    # Thick black border for the outer box
-    thick_border = Border(
-        left=Side(style='thick', color='000000'),
-        right=Side(style='thick', color='000000'),
-        top=Side(style='thick', color='000000'),
-        bottom=Side(style='thick', color='000000')
-    )
+    return grouped_by_project, ungrouped_test_cases
+
+
+def get_available_cpu_count():
+    """Number of CPU cores this process may run on."""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def _build_workbook_file(db_file, output_path, selected_test_case_ids, selected_project_ids, since=None,
+                         image_mode="full", image_base_url=None):
+    """
+    Process pool worker: build one workbook into output_path.
+    
+    The database path is passed explicitly so workers started with "spawn"
+    (macOS, Windows) read the same database as the parent.
+    """
+    models.DB_FILE = db_file
+    models.DB_DIR = os.path.dirname(db_file)
+    create_excel_export(output_path, selected_test_case_ids, selected_project_ids, since=since,
+                        image_mode=image_mode, image_base_url=image_base_url)
+    return output_path
+
+
+def _build_workbook_job(job):
+    """Pool worker: build one (member_name, *_build_workbook_file args) job; returns (member_name, path)."""
+    member_name, *args = job
+    return member_name, _build_workbook_file(*args)
+
+
+def _write_linked_images(archive, sink, selected_test_case_ids, selected_project_ids, since):
+    """
+    Copy the original screenshots of the selection into the archive's side folder
+    (the targets of relative links), yielding archive bytes as they are written.
+    """
+    for row in models.iter_export_rows(selected_test_case_ids, selected_project_ids, since=since):
+        if row['screenshot_id'] is None or not os.path.isfile(row['file_path']):
+            continue
+        member_name = linked_image_path({'id': row['screenshot_id'], 'file_path': row['file_path']})
+        with open(row['file_path'], "rb") as src, archive.open(member_name, "w", force_zip64=True) as dest:
+            for chunk in iter(lambda: src.read(256 * 1024), b""):
+                dest.write(chunk)
+                yield from sink.drain()
+
+
+def iter_workbook_bundle_zip(workbook_file, workbook_name, selected_test_case_ids=None, selected_project_ids=None,
+                             since=None):
+    """
+    Stream a built workbook together with its "images/" side folder as a ZIP archive.
+    
+    Used for thumbnail and linked exports without an image base URL, whose
+    links are relative paths into that folder. The workbook file object is
+    closed once it has been copied.
+    
+    Yields:
+        bytes: Chunks of the ZIP archive
+    """
+    sink = ZipStreamSink()
+    archive = zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_STORED, allowZip64=True)
+    try:
+        workbook_file.seek(0)
+        with archive.open(workbook_name, "w", force_zip64=True) as dest:
+            for chunk in iter(lambda: workbook_file.read(256 * 1024), b""):
+                dest.write(chunk)
+                yield from sink.drain()
+        workbook_file.close()
+        
+        yield from _write_linked_images(archive, sink, selected_test_case_ids, selected_project_ids, since)
+        archive.close()
+        yield from sink.drain()
+    finally:
+        workbook_file.close()
+
+
+def iter_project_workbooks_zip(selected_test_case_ids=None, selected_project_ids=None, max_workers=None,
+                               since=None, image_mode="full", image_base_url=None):
+    """
+    Build one workbook per project in a process pool and stream them as a ZIP archive.
+    
+    Each workbook is added to the archive as soon as its worker finishes, so
+    the download starts with the first finished project. Test cases without a
+    project go into an "Unassigned" workbook. A project whose estimated
+    workbook exceeds the size or memory limits is split into numbered parts
+    (see shared.export_estimate).
+    
+    Args:
+        selected_test_case_ids: Optional list of test case IDs to export. If None, exports all.
+        selected_project_ids: Optional list of project IDs to export.
+        max_workers: Pool size. Defaults to the available cores (capped at the number of workbooks
+            and by the memory budget).
+        since: Optional datetime; export only test cases changed at or after it
+        image_mode: How screenshots are written (see create_excel_export)
+        image_base_url: Base URL for links to originals. Without it, thumbnail and linked
+            exports add the originals to an "images/" folder in the archive
+        
+    Yields:
+        bytes: Chunks of the ZIP archive
+    """
+    test_cases, projects_info = select_test_cases(selected_test_case_ids, selected_project_ids, since)
+    grouped_by_project, ungrouped_test_cases = group_test_cases_by_project(test_cases, projects_info)
+    estimate = estimate_export(selected_test_case_ids, selected_project_ids, since, image_mode)
+    entries_by_id = {entry['id']: entry for entry in estimate['per_test_case']}
+    
+    # One job per workbook: (archive member name, test case IDs, project IDs)
+    jobs = []
+    for project_id, project_tcs in grouped_by_project.items():
+        clean_name = re.sub(r'[\\/?*\[\]:"<>|]', '_', projects_info[project_id]['name']).strip() or "project"
+        jobs.extend(_split_job(f"{clean_name}_{project_id}", [tc['id'] for tc in project_tcs], [project_id],
+                               entries_by_id))
+    if ungrouped_test_cases:
+        jobs.extend(_split_job("Unassigned", [tc['id'] for tc in ungrouped_test_cases], None, entries_by_id))
+    
+    yield from _iter_workbook_jobs_zip(jobs, entries_by_id, max_workers, since, image_mode, image_base_url)
+
+
+def iter_split_workbooks_zip(selected_test_case_ids=None, selected_project_ids=None, max_workers=None,
+                             since=None, image_mode="full", image_base_url=None, estimate=None):
+    """
+    Export a selection that is too large for one workbook as numbered parts in a ZIP archive.
+    
+    Test cases are grouped in export order into workbooks that stay within
+    the size and memory limits (see shared.export_estimate.split_into_workbooks)
+    and built like iter_project_workbooks_zip.
+    
+    Args:
+        estimate: Optional result of estimate_export for the same selection (computed if omitted)
+        (other arguments as in iter_project_workbooks_zip)
+        
+    Yields:
+        bytes: Chunks of the ZIP archive
+    """
+    if estimate is None:
+        estimate = estimate_export(selected_test_case_ids, selected_project_ids, since, image_mode)
+    entries_by_id = {entry['id']: entry for entry in estimate['per_test_case']}
+    jobs = _split_job("test_cases_export", list(entries_by_id), None, entries_by_id)
+    
+    yield from _iter_workbook_jobs_zip(jobs, entries_by_id, max_workers, since, image_mode, image_base_url)
+
+
+def _split_job(base_name, test_case_ids, project_ids, entries_by_id):
+    """Return the workbook jobs for one group of test cases: a single workbook, or numbered parts."""
+    entries = [entries_by_id[test_case_id] for test_case_id in test_case_ids if test_case_id in entries_by_id]
+    parts = split_into_workbooks(entries) if entries else [test_case_ids]
+    if len(parts) == 1:
+        return [(f"{base_name}.xlsx", test_case_ids, project_ids)]
+    return [(f"{base_name}_part{number}.xlsx", part, project_ids) for number, part in enumerate(parts, 1)]
+
+
+def _iter_workbook_jobs_zip(jobs, entries_by_id, max_workers, since, image_mode, image_base_url):
+    """
+    Build workbook jobs in a process pool and stream them as a ZIP archive.
+    
+    The pool is sized so the estimated memory of the concurrently built
+    workbooks stays within the memory budget.
+    """
+    sink = ZipStreamSink()
+    # Workbooks are already deflated: store them as-is
+    archive = zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_STORED, allowZip64=True)
+    work_dir = tempfile.mkdtemp(prefix="tc_export_projects_")
+    pool = None
+    completed = False
+    
+    try:
+        if jobs:
+            workers = max_workers
+            if not workers:
+                largest_job = max(
+                    sum(entries_by_id[tc_id]['memory_bytes'] for tc_id in test_case_ids if tc_id in entries_by_id)
+                    for _, test_case_ids, _ in jobs
+                ) + export_estimate.MEMORY_BASE_BYTES
+                workers = min(len(jobs), get_available_cpu_count(),
+                              max(1, export_estimate.MEMORY_BUDGET_BYTES // largest_job))
+            # spawn: forking the multithreaded server could copy locks held by other threads into the child
+            pool = multiprocessing.get_context("spawn").Pool(processes=workers)
+            pool_jobs = [
+                (member_name, models.DB_FILE, os.path.join(work_dir, f"{index}.xlsx"), test_case_ids, project_ids,
+                 since, image_mode, image_base_url)
+                for index, (member_name, test_case_ids, project_ids) in enumerate(jobs)
+            ]
+            
+            # Workbooks in completion order; a failed job raises here
+            for member_name, output_path in pool.imap_unordered(_build_workbook_job, pool_jobs):
+                with open(output_path, "rb") as src, archive.open(member_name, "w", force_zip64=True) as dest:
+                    for chunk in iter(lambda: src.read(256 * 1024), b""):
+                        dest.write(chunk)
+                        yield from sink.drain()
+                os.remove(output_path)
+                yield from sink.drain()
+        
+        # Relative links in the workbooks point into a shared side folder
+        if image_mode in LINKED_IMAGE_MODES and not image_base_url:
+            exported_ids = [tc_id for _, test_case_ids, _ in jobs for tc_id in test_case_ids]
+            if exported_ids:
+                yield from _write_linked_images(archive, sink, exported_ids, None, since)
+        
+        archive.close()
+        yield from sink.drain()
+        completed = True
+    finally:
+        if pool is not None:
+            if completed:
+                pool.close()
+            else:
+                # Client gone or a job failed: drop queued jobs and stop the ones still building
+                pool.terminate()
+            # Workers must be gone before work_dir (their output directory) is removed
+            pool.join()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def create_summary_sheet(sheet, test_cases=None, projects_info=None, profile=None, since=None):
+    """
+    Create the summary sheet with all test cases matching the reference format, grouped by project.
+    
+    For a delta export (since given) the sheet notes the cut-off time and adds
+    a "Last Changed" column filled from each test case's '_changed_at'.
+    """
+    if profile is None:
+        profile = ExportProfile()
+    
+    # Get test cases if not provided
+    if test_cases is None:
+        with profile.phase("db_fetch"):
+            test_cases = get_all_test_cases()
+    
+    with profile.phase("cell_styling"):
+        _write_summary_sheet(sheet, test_cases, projects_info, profile, since)
+
+
+def _write_summary_sheet(sheet, test_cases, projects_info, profile, since=None):
+    """Write the summary sheet content (see create_summary_sheet)."""
+    
+    # Group test cases by project
+    if projects_info is None:
+        projects_info = {}
+    
+    # Group test cases by project_id
+    grouped_by_project, ungrouped_test_cases = group_test_cases_by_project(test_cases, projects_info)
+    
+    # White background for the whole sheet (no per-cell painting)
+    apply_sheet_defaults(sheet)
     
     # Add padding: 
     # - Row 2: padding top (bordure supérieure)
@@ -197,38 +604,30 @@ def create_summary_sheet(sheet, test_cases=None, projects_info=None):
     # Row 3: Title (centered in column C, with padding left from column A)
     title_cell = sheet.cell(row=3, column=3)  # Column C instead of B for left padding
     title_cell.value = "Test Case Documentation"
-    title_cell.font = Font(bold=True, size=14)
-    title_cell.fill = white_fill
+    title_cell.style = "TC Summary Title"
     # No border on title cell itself
     
+    # Row 4: cut-off time of a delta export
+    if since is not None:
+        since_cell = sheet.cell(row=4, column=3)
+        since_cell.value = f"Changes since {models.to_db_timestamp(since)} UTC"
+        since_cell.style = "TC Notes"
+    
     # Row 5: Headers (starting in column C, with padding left)
     headers = ["Test Case ID", "Test Case Name", "Execution Status", "Outcome"]
-    header_font = Font(bold=True, size=11, color="FFFFFF")  # White text, bold
-    header_fill = PatternFill(start_color="1F4E78", end_color="1F4E78", fill_type="solid")  # Dark blue background
-    header_alignment = Alignment(horizontal="center", vertical="center")
+    if since is not None:
+        headers.append("Last Changed (UTC)")
+    last_content_col = 2 + len(headers)  # F, or G with the Last Changed column
     
     for col_num, header in enumerate(headers, 3):  # Start from column C (3) instead of B
         cell = sheet.cell(row=5, column=col_num)
         cell.value = header
-        cell.font = header_font
-        cell.alignment = header_alignment
-        cell.border = thin_border
-        cell.fill = header_fill  # Dark blue background instead of white
+        cell.style = "TC Header"  # White bold text on dark blue background
     
     # Row 6 onwards: Test case data (with padding from headers), grouped by project
     last_data_row = 5  # Will be updated as we add rows
     current_row = 6
     
-    # Separator border (thin border for visual separation, but row is white)
-    separator_border = Border(
-        top=Side(style='thin', color='000000'),
-        bottom=Side(style='thin', color='000000')
-    )
-    
-    # Project header fill (slightly darker gray)
-    project_header_fill = PatternFill(start_color="D0D0D0", end_color="D0D0D0", fill_type="solid")
-    project_header_font = Font(bold=True, size=12, color="000000")
-    
     # Helper function to get sheet name for a test case (matching create_excel_export logic)
     # Note: This generates the base name; actual sheet creation handles duplicates
     def get_sheet_name_for_test_case(tc):
@@ -254,34 +653,45 @@ def create_summary_sheet(sheet, test_cases=None, projects_info=None):
         # Column C: Test Case ID (with hyperlink to test case sheet)
         test_case_id_cell = sheet.cell(row=row_num, column=3)
         test_case_id_cell.value = test_case['test_number']
-        test_case_id_cell.border = thin_border
-        test_case_id_cell.fill = white_fill
+        test_case_id_cell.style = "TC Link Cell"
         
         # Create hyperlink to test case sheet
         sheet_name = get_sheet_name_for_test_case(test_case)
         test_case_id_cell.hyperlink = f"#{sheet_name}!A1"
-        test_case_id_cell.font = Font(color="0563C1", underline="single")
         
         # Column D: Test Case Name (Description)
         desc_cell = sheet.cell(row=row_num, column=4)
         desc_cell.value = test_case['description']
-        desc_cell.border = thin_border
-        desc_cell.alignment = Alignment(wrap_text=True, vertical="top")
-        desc_cell.fill = white_fill
+        desc_cell.style = "TC Wrapped Cell"
         
         # Column E: Execution Status
         status_cell = sheet.cell(row=row_num, column=5)
         status_cell.value = "Completed"
-        status_cell.border = thin_border
-        status_cell.alignment = Alignment(horizontal="center")
-        status_cell.fill = white_fill
+        status_cell.style = "TC Centered Cell"
         
         # Column F: Outcome
         outcome_cell = sheet.cell(row=row_num, column=6)
         outcome_cell.value = "Pass"
-        outcome_cell.border = thin_border
-        outcome_cell.alignment = Alignment(horizontal="center")
-        outcome_cell.fill = white_fill
+        outcome_cell.style = "TC Centered Cell"
+        
+        # Column G (delta export): when the test case last changed
+        if since is not None:
+            changed_cell = sheet.cell(row=row_num, column=7)
+            changed_cell.value = test_case.get('_changed_at')
+            changed_cell.style = "TC Centered Cell"
+    
+    # Helper function to write a group header row (merged across the content columns)
+    def write_group_header_row(row_num, label):
+        header_cell = sheet.cell(row=row_num, column=3)
+        header_cell.value = label
+        header_cell.style = "TC Project Header"
+        # Merge cells for project header (columns C to the last content column)
+        with profile.phase("merges"):
+            sheet.merge_cells(start_row=row_num, start_column=3, end_row=row_num, end_column=last_content_col)
+        profile.count("merges")
+        # Apply borders to the merged cells
+        for col in range(4, last_content_col + 1):
+            sheet.cell(row=row_num, column=col).border = THIN_BORDER
     
     # Write grouped projects first
     if grouped_by_project:
@@ -290,31 +700,12 @@ def create_summary_sheet(sheet, test_cases=None, projects_info=None):
             project_name = project['name'] if project else f"Project {project_id}"
             
             # Add separator row before project (except for first project)
+            # No border on separator row - just white space
             if current_row > 6:
-                for col in range(2, 8):  # Columns B to G
-                    cell = sheet.cell(row=current_row, column=col)
-                    cell.fill = white_fill
-                    # No border on separator row - just white space
-                    cell.border = None
                 current_row += 1
             
             # Add project header row
-            project_header_cell = sheet.cell(row=current_row, column=3)
-            project_header_cell.value = f"Project: {project_name}"
-            project_header_cell.font = project_header_font
-            project_header_cell.fill = project_header_fill
-            project_header_cell.alignment = Alignment(horizontal="left", vertical="center")
-            # Merge cells for project header (columns C to F)
-            sheet.merge_cells(f'C{current_row}:F{current_row}')
-            # Apply borders to merged cells
-            for col in range(3, 7):
-                cell = sheet.cell(row=current_row, column=col)
-                cell.border = thin_border
-            # Left and right padding
-            for col in [2, 7]:
-                cell = sheet.cell(row=current_row, column=col)
-                cell.fill = white_fill
-                cell.border = thin_border
+            write_group_header_row(current_row, f"Project: {project_name}")
             current_row += 1
             
             # Write test cases for this project
@@ -326,27 +717,10 @@ def create_summary_sheet(sheet, test_cases=None, projects_info=None):
     if ungrouped_test_cases:
         # Add separator if we had grouped projects
         if grouped_by_project:
-            for col in range(2, 8):
-                cell = sheet.cell(row=current_row, column=col)
-                cell.fill = white_fill
-                # No border on separator row - just white space
-                cell.border = None
             current_row += 1
         
         # Add header for ungrouped
-        ungrouped_header_cell = sheet.cell(row=current_row, column=3)
-        ungrouped_header_cell.value = "Unassigned Test Cases"
-        ungrouped_header_cell.font = project_header_font
-        ungrouped_header_cell.fill = project_header_fill
-        ungrouped_header_cell.alignment = Alignment(horizontal="left", vertical="center")
-        sheet.merge_cells(f'C{current_row}:F{current_row}')
-        for col in range(3, 7):
-            cell = sheet.cell(row=current_row, column=col)
-            cell.border = thin_border
-        for col in [2, 7]:
-            cell = sheet.cell(row=current_row, column=col)
-            cell.fill = white_fill
-            cell.border = thin_border
+        write_group_header_row(current_row, "Unassigned Test Cases")
         current_row += 1
         
         # Write ungrouped test cases
@@ -364,101 +738,27 @@ def create_summary_sheet(sheet, test_cases=None, projects_info=None):
     
     # Apply thick black border around the entire box
     # Box spans from row 2 (padding top) to last_data_row + 1 (padding bottom), columns B to G
-    # Add padding: row 2 is top padding, row 3 is title, row 4 is spacing, row 5 is headers, row 6+ is data, last+1 is bottom padding
     # Column B = padding left, Columns C-F = content, Column G = padding right
+    # (delta exports: content C-G, padding right H)
+    # Only the frame cells are materialised; the inside of the box stays untouched.
     start_row = 2  # Top padding row (will have top border)
     end_row = last_data_row + 1  # Bottom padding row (will have bottom border)
     start_col = 2  # Column B (padding left)
-    content_end_col = 6    # Column F (last content column - Outcome)
-    end_col = 7    # Column G (padding right - where the thick right border goes)
-    
-    # Top border (row 2 - padding row)
-    # Only top and side borders, no internal borders
-    # Explicitly set borders for each cell to avoid any unwanted borders
-    for col in range(start_col, end_col + 1):
-        cell = sheet.cell(row=start_row, column=col)
-        cell.fill = white_fill
-        # Explicitly set borders: only top and side borders
-        if col == start_col:
-            # Column B: left and top border
-            cell.border = Border(left=thick_border.left, top=thick_border.top)
-        elif col == end_col:
-            # Column G: right and top border (padding right)
-            cell.border = Border(right=thick_border.right, top=thick_border.top)
-        else:
-            # Middle cells (C, D, E, F): ONLY top border, explicitly no other borders
-            cell.border = Border(top=thick_border.top, left=None, right=None, bottom=None)
-    
-    # Bottom border is handled separately for the padding row below
-    # All data rows should have thin borders on all sides
-    
-    # Left border (column B - padding left) - apply to all rows in the box
-    for row in range(start_row, end_row + 1):
-        cell = sheet.cell(row=row, column=start_col)
-        cell.fill = white_fill
-        if row == start_row:
-            cell.border = Border(left=thick_border.left, top=thick_border.top)
-        elif row == end_row:
-            cell.border = Border(left=thick_border.left, bottom=thick_border.bottom)
-        else:
-            cell.border = Border(left=thick_border.left)
+    end_col = last_content_col + 1  # Padding right (G, or H for delta exports) - where the thick right border goes
     
-    # Right border (column G - padding right) - apply to all rows in the box
-    # This is where the thick right border goes, not on column F
-    for row in range(start_row, end_row + 1):
-        cell = sheet.cell(row=row, column=end_col)
-        cell.fill = white_fill
-        
-        # Special handling for row 2 (padding row) - already set above
-        if row == start_row:
-            # Already handled in the top border section above - skip to avoid overwriting
-            continue
-            
-        # For all other rows, apply right border to column G (padding right)
-        if row == end_row:
-            cell.border = Border(right=thick_border.right, bottom=thick_border.bottom)
-        else:
-            cell.border = Border(right=thick_border.right)
-    
-    # Padding right column (column G) - same logic as column B (left padding)
-    # White background, no borders, no content - just padding space
-    # Column G IS the padding right (end_col = 7), already has borders set above
-    # Just ensure it has white fill and no content for all rows
-    for row in range(start_row, end_row + 1):
-        cell = sheet.cell(row=row, column=end_col)  # Column G
-        if cell.value is None:  # Don't overwrite if already set
-            cell.value = None  # No content
-        # Border and fill already set in the right border section above
-    
-    # Ensure title row (row 3) and spacing row (row 4) have no internal borders, only side borders
-    for row in [3, 4]:
-        for col in range(start_col, end_col + 1):
-            cell = sheet.cell(row=row, column=col)
-            cell.fill = white_fill
-            if col == start_col:
-                # Left border only (column B)
-                cell.border = Border(left=thick_border.left)
-            elif col == end_col:
-                # Right border only (column G - padding right)
-                cell.border = Border(right=thick_border.right)
-            else:
-                # No border for middle cells (C, D, E, F) in title/spacing rows
-                cell.border = None
-    
-    # Ensure bottom padding row (last_data_row + 1) has only bottom and side borders
-    bottom_padding_row = last_data_row + 1
-    for col in range(start_col, end_col + 1):
-        cell = sheet.cell(row=bottom_padding_row, column=col)
-        cell.fill = white_fill
-        if col == start_col:
-            # Column B: left and bottom border
-            cell.border = Border(left=thick_border.left, bottom=thick_border.bottom)
-        elif col == end_col:
-            # Column G: right and bottom border (padding right)
-            cell.border = Border(right=thick_border.right, bottom=thick_border.bottom)
-        else:
-            # Middle cells (C, D, E, F): only bottom border
-            cell.border = Border(bottom=thick_border.bottom)
+    # Top and bottom padding rows: corners on B/G, top/bottom border only on C-F
+    for col in range(start_col + 1, end_col):
+        sheet.cell(row=start_row, column=col).border = FRAME_TOP
+        sheet.cell(row=end_row, column=col).border = FRAME_BOTTOM
+    sheet.cell(row=start_row, column=start_col).border = FRAME_TOP_LEFT
+    sheet.cell(row=start_row, column=end_col).border = FRAME_TOP_RIGHT
+    sheet.cell(row=end_row, column=start_col).border = FRAME_BOTTOM_LEFT
+    sheet.cell(row=end_row, column=end_col).border = FRAME_BOTTOM_RIGHT
+    
+    # Left (column B) and right (column G) sides for every row in between
+    for row in range(start_row + 1, end_row):
+        sheet.cell(row=row, column=start_col).border = FRAME_LEFT
+        sheet.cell(row=row, column=end_col).border = FRAME_RIGHT
     
     # Auto-adjust column widths
     sheet.column_dimensions['B'].width = 5  # Padding left
@@ -466,127 +766,294 @@ def create_summary_sheet(sheet, test_cases=None, projects_info=None):
     sheet.column_dimensions['D'].width = 60  # Test Case Name
     sheet.column_dimensions['E'].width = 18  # Execution Status
     sheet.column_dimensions['F'].width = 15  # Outcome
-    sheet.column_dimensions['G'].width = 5  # Padding right (same as left padding)
+    if since is not None:
+        sheet.column_dimensions['G'].width = 20  # Last Changed
+    sheet.column_dimensions[get_column_letter(end_col)].width = 5  # Padding right (same as left padding)
+
+
+def get_step_notes(step):
+    """Return the step's metadata fields (modules, calculation, configuration) as note lines."""
+    notes_parts = []
+    if step.get('modules'):
+        notes_parts.append(f"Modules: {step['modules']}")
+    if step.get('calculation_logic'):
+        notes_parts.append(f"Calculation: {step['calculation_logic']}")
+    if step.get('configuration'):
+        notes_parts.append(f"Configuration: {step['configuration']}")
+    return notes_parts
+
+
+def hash_file(path):
+    """Return the SHA-256 hex digest of a file, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class SharedMediaImage(XLImage):
+    """
+    Worksheet image that can reuse the media part of an identical earlier image.
+    
+    openpyxl writes one xl/media entry per image object. When shared_with is
+    set, this image points its drawing relationship at the other image's
+    media part instead, and save_workbook skips writing it again.
+    """
+    shared_with = None
+    media_bytes = 0
+    
+    @property
+    def path(self):
+        if self.shared_with is not None:
+            return self.shared_with.path
+        return super().path
+
+
+class _DeduplicatingExcelWriter(ExcelWriter):
+    """
+    ExcelWriter that writes each media part once.
+    
+    Overrides the private _write_images hook, so the openpyxl version is
+    pinned in backend/requirements.txt.
+    """
+    
+    def _write_images(self):
+        written = set()
+        for img in self._images:
+            if img.path not in written:
+                written.add(img.path)
+                self._archive.writestr(img.path[1:], img._data())
+
+
+def save_workbook(wb, output_path):
+    """
+    Save a workbook like Workbook.save, writing shared images (see SharedMediaImage) once.
+    
+    Args:
+        wb: Workbook to save
+        output_path: File path or writable binary file object
+    """
+    archive = zipfile.ZipFile(output_path, 'w', zipfile.ZIP_DEFLATED, allowZip64=True)
+    wb.properties.modified = datetime.now(tz=timezone.utc).replace(tzinfo=None)
+    _DeduplicatingExcelWriter(wb, archive).save()
+    _MEDIA_INDEXES.pop(wb, None)
+
+
+def _get_media_index(wb):
+    """Return the image index of a workbook (see _MEDIA_INDEXES), creating it on first use."""
+    index = _MEDIA_INDEXES.get(wb)
+    if index is None:
+        index = {"hashes": {}, "images": {}}
+        _MEDIA_INDEXES[wb] = index
+    return index
+
+
+def linked_image_path(screenshot):
+    """Relative path of a screenshot in the side folder shipped next to a workbook."""
+    return f"{LINKED_IMAGES_FOLDER}/{screenshot['id']}_{os.path.basename(screenshot['file_path'])}"
+
+
+def get_image_link(screenshot, image_base_url=None):
+    """
+    Link target for a screenshot's original image.
+    
+    With image_base_url, the API's screenshot file URL; otherwise the relative
+    path in the side folder (see linked_image_path).
+    """
+    if image_base_url:
+        return f"{image_base_url.rstrip('/')}/api/screenshots/{screenshot['id']}/file"
+    return linked_image_path(screenshot)
+
+
+def _make_thumbnail_image(path):
+    """Return an XLImage holding a small JPEG preview of the image at path."""
+    out = io.BytesIO()
+    write_thumbnail(path, out, THUMBNAIL_WIDTH, max_height=THUMBNAIL_WIDTH * 4, quality=THUMBNAIL_QUALITY)
+    out.seek(0)
+    img = SharedMediaImage(out)
+    img.media_bytes = out.getbuffer().nbytes
+    return img
+
+
+def _add_screenshot_image(sheet, screenshot, image_row, image_col, image_mode, image_base_url, profile):
+    """
+    Embed a screenshot (full size or thumbnail) at image_row and return the next free row.
+    
+    Thumbnails get a link to the original in the next column. Images whose
+    bytes were already embedded in this workbook share that media part.
+    """
+    screenshot_path = screenshot['file_path']
+    media_index = _get_media_index(sheet.parent)
+    
+    with profile.phase("image_load"):
+        content_hash = media_index["hashes"].get(screenshot_path)
+        if content_hash is None:
+            content_hash = hash_file(screenshot_path)
+            media_index["hashes"][screenshot_path] = content_hash
+        original = media_index["images"].get(content_hash)
+        
+        if original is not None:
+            # Same bytes (and so same size and layout): reuse the media part
+            img = copy.copy(original)
+            img.shared_with = original
+            profile.count("deduplicated_images")
+            profile.count("deduplicated_bytes", original.media_bytes)
+        elif image_mode == "thumbnail":
+            img = _make_thumbnail_image(screenshot_path)
+        else:
+            # Load and resize image for better layout
+            img = SharedMediaImage(screenshot_path)
+            img.media_bytes = os.path.getsize(screenshot_path)
+            
+            # Resize image to fit nicely (max width 600px, maintain aspect ratio)
+            max_width = 600
+            if img.width > max_width:
+                ratio = max_width / img.width
+                img.width = int(img.width * ratio)
+                img.height = int(img.height * ratio)
+            
+            # Ensure minimum size for readability
+            min_width = 200
+            if img.width < min_width:
+                ratio = min_width / img.width
+                img.width = int(img.width * ratio)
+                img.height = int(img.height * ratio)
+        
+        if original is None:
+            media_index["images"][content_hash] = img
+    
+    # Anchor image to cell (column B) with slight offset for spacing
+    img.anchor = f"{get_column_letter(image_col)}{image_row}"
+    
+    # Add image to sheet
+    sheet.add_image(img)
+    profile.count("images")
+    if img.shared_with is None:
+        profile.count("image_bytes", img.media_bytes)
+    
+    if image_mode == "thumbnail":
+        link_cell = sheet.cell(row=image_row, column=image_col + 1)
+        link_cell.value = "[Open full image]"
+        link_cell.hyperlink = get_image_link(screenshot, image_base_url)
+        link_cell.style = "TC Link"
+        # Thumbnails are small: no minimum row height
+        sheet.row_dimensions[image_row].height = int(img.height * 0.75) + 10
+    else:
+        # Adjust row height to accommodate image (convert pixels to points: 1 point ≈ 1.33 pixels)
+        # Add extra space for padding
+        sheet.row_dimensions[image_row].height = max(int(img.height * 0.75) + 20, 120)
+    
+    # Move to next row for next image (stack vertically)
+    return image_row + 1
 
 
-def create_test_case_sheet(sheet, test_case):
-    """Create a sheet for a specific test case matching the reference format with embedded screenshots."""
-    # Set white background for entire sheet (first 200 rows, 20 columns)
-    white_fill = PatternFill(start_color="FFFFFF", end_color="FFFFFF", fill_type="solid")
-    for row in range(1, 201):
-        for col in range(1, 21):
-            cell = sheet.cell(row=row, column=col)
-            cell.fill = white_fill
+def _add_screenshot_reference(sheet, screenshot, image_row, image_col, image_mode, image_base_url):
+    """Write a screenshot as text: a link to the original ("linked") or its metadata ("none")."""
+    file_name = os.path.basename(screenshot['file_path'])
+    label = screenshot.get('screenshot_name') or file_name
+    
+    cell = sheet.cell(row=image_row, column=image_col)
+    if image_mode == "linked":
+        cell.value = f"[Screenshot: {label}]"
+        cell.hyperlink = get_image_link(screenshot, image_base_url)
+        cell.style = "TC Link"
+    else:
+        cell.value = f"[Screenshot: {label} ({file_name})]" if label != file_name else f"[Screenshot: {file_name}]"
+        cell.style = "TC Image Reference"
+
+
+def create_test_case_sheet(sheet, test_case, profile=None, image_mode="full", image_base_url=None):
+    """
+    Create a sheet for a specific test case matching the reference format with embedded screenshots.
+    
+    image_mode controls how screenshots are written (see IMAGE_MODES); links
+    point to image_base_url when given, otherwise to the side folder.
+    """
+    if profile is None:
+        profile = ExportProfile()
+    
+    # Cell writing is the default phase; DB reads, images and merges are timed separately inside
+    with profile.phase("cell_styling"):
+        _write_test_case_sheet(sheet, test_case, profile, image_mode, image_base_url)
+    profile.count("sheets")
+
+
+def _write_test_case_sheet(sheet, test_case, profile, image_mode="full", image_base_url=None):
+    """Write a test case sheet's content (see create_test_case_sheet)."""
+    # White background for the whole sheet (no per-cell painting)
+    apply_sheet_defaults(sheet)
     
     # Row 2: Title and navigation link on the same row
     # Title in column B
     title_cell = sheet.cell(row=2, column=2)
     title_cell.value = f"{test_case['test_number']} - {test_case['description']}"
-    title_cell.font = Font(bold=True, size=12)
-    title_cell.fill = white_fill
+    title_cell.style = "TC Sheet Title"
     
     # Navigation link to the right of title (2-3 columns to the right)
     # "Go to" text - aligned to the right of the cell
     go_to_cell = sheet.cell(row=2, column=5)  # Column E (2 columns to the right of title)
     go_to_cell.value = "Go to"
-    go_to_cell.font = Font(size=10)
-    go_to_cell.fill = white_fill
-    go_to_cell.alignment = Alignment(horizontal="right", vertical="center")
+    go_to_cell.style = "TC Go To"
     
     # "[Summary]" link
     summary_link_cell = sheet.cell(row=2, column=6)  # Column F (next to "Go to")
     summary_link_cell.value = "[Summary]"
     summary_link_cell.hyperlink = "#Summary!A1"
-    summary_link_cell.font = Font(color="0563C1", underline="single")  # Blue, underlined
-    summary_link_cell.fill = white_fill
+    summary_link_cell.style = "TC Link"  # Blue, underlined
     
     # Freeze panes: freeze at row 3 (just below "Go to [Summary]" row)
     # This will keep the header row (row 2) visible when scrolling
     sheet.freeze_panes = "A3"
     
     # Get steps
-    steps = get_steps_by_test_case(test_case['id'])
+    with profile.phase("db_fetch"):
+        steps = get_steps_by_test_case(test_case['id'])
+    profile.count("steps", len(steps))
     
     if steps:
         # Start steps from row 6 (matching reference format)
         current_row = 6
         
-        # Define borders and formatting
-        thin_border = Border(
-            left=Side(style='thin'),
-            right=Side(style='thin'),
-            top=Side(style='thin'),
-            bottom=Side(style='thin')
-        )
-        # Border for step header row: only top and bottom (thick)
-        step_header_border = Border(
-            left=None,
-            right=None,
-            top=Side(style='medium'),
-            bottom=Side(style='medium')
-        )
-        header_fill = PatternFill(start_color="D9E1F2", end_color="D9E1F2", fill_type="solid")  # Light blue
-        
         for step in steps:
-            # Step description row: entire row (columns B to E or more) with same color and top/bottom borders
+            # Step description row: entire row (columns B to I) with same color and top/bottom borders
             # Format: "1/ Description"
             step_cell = sheet.cell(row=current_row, column=2)
             step_cell.value = f"{step['step_number']}/ {step['description']}"
-            step_cell.font = Font(bold=True, size=11)
-            step_cell.fill = header_fill
-            step_cell.border = step_header_border
-            step_cell.alignment = Alignment(wrap_text=True, vertical="top")
+            step_cell.style = "TC Step Header"
             
-            # Apply same fill and border to entire row (columns B through E or more)
-            for col in range(2, 10):  # Columns B to I
-                cell = sheet.cell(row=current_row, column=col)
-                cell.fill = header_fill
-                cell.border = step_header_border
+            # Apply same fill and border to the rest of the row (columns C to I)
+            for col in range(3, 10):
+                sheet.cell(row=current_row, column=col).style = "TC Step Band"
             
-            # Notes row: skip one line, then add notes
+            # Notes row: skip one line (left empty for spacing), then add notes
             notes_row = current_row + 1
-            # Empty row for spacing
-            for col in range(2, 10):
-                cell = sheet.cell(row=notes_row, column=col)
-                cell.fill = white_fill
-                cell.value = None
             
             # Notes content on next row
             notes_content_row = notes_row + 1
             # Combine all metadata fields into notes
-            notes_parts = []
-            if step.get('modules'):
-                notes_parts.append(f"Modules: {step['modules']}")
-            if step.get('calculation_logic'):
-                notes_parts.append(f"Calculation: {step['calculation_logic']}")
-            if step.get('configuration'):
-                notes_parts.append(f"Configuration: {step['configuration']}")
-            notes_text = "\n".join(notes_parts)
+            notes_text = "\n".join(get_step_notes(step))
             
             if notes_text:
                 notes_cell = sheet.cell(row=notes_content_row, column=2)
                 notes_cell.value = notes_text
-                notes_cell.font = Font(size=10)
-                notes_cell.fill = white_fill
-                notes_cell.alignment = Alignment(wrap_text=True, vertical="top")
+                notes_cell.style = "TC Notes"
                 # Merge cells for notes (columns B to E)
-                sheet.merge_cells(f'B{notes_content_row}:E{notes_content_row}')
+                with profile.phase("merges"):
+                    sheet.merge_cells(f'B{notes_content_row}:E{notes_content_row}')
+                profile.count("merges")
             
             # Get screenshots for this step
-            screenshots = get_screenshots_by_step(step['id'])
+            with profile.phase("db_fetch"):
+                screenshots = get_screenshots_by_step(step['id'])
             
             # Screenshots row: skip one line after notes, then add screenshots
+            # (the spacing row before screenshots is left empty)
             if notes_text:
                 image_start_row = notes_content_row + 2  # Skip one line after notes
             else:
                 image_start_row = notes_row + 1  # If no notes, start after spacing row
             
-            # Empty row for spacing before screenshots
-            for col in range(2, 10):
-                cell = sheet.cell(row=image_start_row, column=col)
-                cell.fill = white_fill
-                cell.value = None
-            
             image_row = image_start_row + 1
             image_col = 2  # Start in column B
             
@@ -597,59 +1064,31 @@ def create_test_case_sheet(sheet, test_case):
                     # Check if file exists
                     if os.path.exists(screenshot_path):
                         try:
-                            # Load and resize image for better layout
-                            img = XLImage(screenshot_path)
-                            
-                            # Resize image to fit nicely (max width 600px, maintain aspect ratio)
-                            max_width = 600
-                            if img.width > max_width:
-                                ratio = max_width / img.width
-                                img.width = int(img.width * ratio)
-                                img.height = int(img.height * ratio)
-                            
-                            # Ensure minimum size for readability
-                            min_width = 200
-                            if img.width < min_width:
-                                ratio = min_width / img.width
-                                img.width = int(img.width * ratio)
-                                img.height = int(img.height * ratio)
-                            
-                            # Anchor image to cell (column B) with slight offset for spacing
-                            cell_ref = f"{get_column_letter(image_col)}{image_row}"
-                            img.anchor = cell_ref
-                            
-                            # Add image to sheet
-                            sheet.add_image(img)
-                            
-                            # Adjust row height to accommodate image (convert pixels to points: 1 point ≈ 1.33 pixels)
-                            # Add extra space for padding
-                            row_height = max(int(img.height * 0.75) + 20, 120)
-                            sheet.row_dimensions[image_row].height = row_height
-                            
-                            # Add spacing row after each image (except last)
-                            if idx < len(screenshots) - 1:
+                            if image_mode in ("full", "thumbnail"):
+                                image_row = _add_screenshot_image(
+                                    sheet, screenshot, image_row, image_col, image_mode, image_base_url, profile
+                                )
+                                # Add spacing row after each image (except last)
+                                if idx < len(screenshots) - 1:
+                                    sheet.row_dimensions[image_row].height = 10
+                                    image_row += 1
+                            else:
+                                _add_screenshot_reference(sheet, screenshot, image_row, image_col, image_mode, image_base_url)
+                                profile.count("linked_images" if image_mode == "linked" else "skipped_images")
                                 image_row += 1
-                                sheet.row_dimensions[image_row].height = 10
-                                for col in range(2, 10):
-                                    cell = sheet.cell(row=image_row, column=col)
-                                    cell.fill = white_fill
-                            
-                            # Move to next row for next image (stack vertically)
-                            image_row += 1
                             
                         except Exception as e:
                             # If image can't be loaded, add text reference
                             error_cell = sheet.cell(row=image_row, column=image_col)
                             error_cell.value = f"[Image: {os.path.basename(screenshot_path)}]"
-                            error_cell.font = Font(italic=True, color="808080")
-                            error_cell.fill = white_fill
+                            error_cell.style = "TC Image Error"
                             image_row += 1
                     else:
                         # File doesn't exist, add text reference
                         missing_cell = sheet.cell(row=image_row, column=image_col)
                         missing_cell.value = f"[Image not found: {os.path.basename(screenshot_path)}]"
-                        missing_cell.font = Font(italic=True, color="FF0000")
-                        missing_cell.fill = white_fill
+                        missing_cell.style = "TC Image Missing"
+                        profile.count("missing_images")
                         image_row += 1
                 
                 # Move to next step (leave space after images)
@@ -671,8 +1110,7 @@ def create_test_case_sheet(sheet, test_case):
         # No steps
         no_steps_cell = sheet.cell(row=6, column=2)
         no_steps_cell.value = "No steps defined for this test case."
-        no_steps_cell.font = Font(italic=True)
-        no_steps_cell.fill = white_fill
+        no_steps_cell.style = "TC Placeholder"
 
 
 if __name__ == "__main__":
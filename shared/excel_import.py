@@ -0,0 +1,349 @@
+"""
+Excel Import Module for Test Case Documentation Tool
+
+This module reads workbooks in the layout written by create_excel_export
+(and the manual templates that layout mirrors) back into the database:
+- one sheet per test case: title "<test number> - <description>" in B2,
+  step rows "<n>/ <description>" in column B, a notes cell below each step
+  (Modules / Calculation / Configuration lines) and screenshots anchored
+  below the notes
+- an optional "Summary" sheet whose "Project: <name>" group rows give each
+  test case its project
+
+Cells are streamed with openpyxl's read_only mode, so a sheet is never held
+in memory as a whole. Images are not visible in read_only mode: they are
+located through the package parts (sheet -> drawing -> media) and copied out
+of the archive. Screenshots are stored content-addressed
+(<uploads>/imported/<sha256>.<ext>), so an image shared by many test cases
+or workbooks is stored once.
+"""
+
+import hashlib
+import os
+import posixpath
+import re
+import tempfile
+import zipfile
+import xml.etree.ElementTree as ET
+from pathlib import Path
+
+from openpyxl import load_workbook
+
+from shared import models
+
+# Default screenshot store: <project root>/uploads/imported
+IMPORT_DIR = Path(__file__).parent.parent / "uploads" / "imported"
+COPY_CHUNK_SIZE = 256 * 1024
+
+SUMMARY_SHEET = "Summary"
+UNASSIGNED_GROUP = "Unassigned Test Cases"
+
+# "3/ Description", "3. Description", "3) Description"
+STEP_HEADER = re.compile(r"^\s*(\d+)\s*[/.)]\s*(.*)$", re.DOTALL)
+# Note lines written by get_step_notes -> step column
+NOTE_FIELDS = {
+    "modules": "modules",
+    "calculation": "calculation_logic",
+    "configuration": "configuration",
+}
+
+NS = {
+    "main": "http://schemas.openxmlformats.org/spreadsheetml/2006/main",
+    "rel": "http://schemas.openxmlformats.org/package/2006/relationships",
+    "xdr": "http://schemas.openxmlformats.org/drawingml/2006/spreadsheetDrawing",
+    "a": "http://schemas.openxmlformats.org/drawingml/2006/main",
+}
+R_ID = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}id"
+R_EMBED = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}embed"
+
+
+def _rels_path(part):
+    """Path of the relationships part belonging to a package part."""
+    folder, name = posixpath.split(part)
+    return posixpath.join(folder, "_rels", f"{name}.rels")
+
+
+def _read_rels(archive, part):
+    """Return {relationship id: (type, resolved target part)} for a package part."""
+    try:
+        root = ET.fromstring(archive.read(_rels_path(part)))
+    except KeyError:
+        return {}
+    rels = {}
+    for rel in root.findall("rel:Relationship", NS):
+        target = rel.get("Target")
+        if rel.get("TargetMode") == "External":
+            continue
+        if target.startswith("/"):
+            resolved = target[1:]
+        else:
+            resolved = posixpath.normpath(posixpath.join(posixpath.dirname(part), target))
+        rels[rel.get("Id")] = (rel.get("Type", ""), resolved)
+    return rels
+
+
+def read_sheet_images(archive):
+    """
+    Locate the images of every sheet through the package parts.
+
+    Args:
+        archive: zipfile.ZipFile of the workbook
+
+    Returns:
+        dict: sheet name -> list of (row, column, media part name), 1-based
+        row/column of each image's top-left anchor, ordered by position
+    """
+    workbook_part = "xl/workbook.xml"
+    workbook_rels = _read_rels(archive, workbook_part)
+    root = ET.fromstring(archive.read(workbook_part))
+
+    images = {}
+    for sheet in root.iterfind("main:sheets/main:sheet", NS):
+        _, sheet_part = workbook_rels.get(sheet.get(R_ID), ("", None))
+        if sheet_part is None:
+            continue
+        sheet_images = []
+        for rel_type, drawing_part in _read_rels(archive, sheet_part).values():
+            if not rel_type.endswith("/drawing"):
+                continue
+            drawing_rels = _read_rels(archive, drawing_part)
+            drawing = ET.fromstring(archive.read(drawing_part))
+            for anchor in list(drawing.findall("xdr:oneCellAnchor", NS)) + list(drawing.findall("xdr:twoCellAnchor", NS)):
+                start = anchor.find("xdr:from", NS)
+                blip = anchor.find("xdr:pic/xdr:blipFill/a:blip", NS)
+                if start is None or blip is None or blip.get(R_EMBED) not in drawing_rels:
+                    continue
+                row = int(start.findtext("xdr:row", "0", NS)) + 1
+                col = int(start.findtext("xdr:col", "0", NS)) + 1
+                sheet_images.append((row, col, drawing_rels[blip.get(R_EMBED)][1]))
+        images[sheet.get("name")] = sorted(sheet_images)
+    return images
+
+
+def read_summary_projects(worksheet):
+    """
+    Read the project of each test case from a Summary sheet.
+
+    Returns:
+        dict: test number -> list of project names (None for the unassigned
+        group) in summary order; a test number appears once per project
+    """
+    projects = {}
+    current_project = None
+    in_table = False
+    for row in worksheet.iter_rows(min_col=3, max_col=3, values_only=True):
+        value = row[0] if row else None
+        if not isinstance(value, str) or not value.strip():
+            continue
+        value = value.strip()
+        if value == "Test Case ID":
+            in_table = True
+        elif not in_table:
+            continue
+        elif value.startswith("Project: "):
+            current_project = value[len("Project: "):]
+        elif value == UNASSIGNED_GROUP:
+            current_project = None
+        else:
+            projects.setdefault(value, []).append(current_project)
+    return projects
+
+
+def _apply_notes(step, text):
+    """Copy "Modules: / Calculation: / Configuration:" note lines into step fields."""
+    extra = []
+    field = None
+    for line in text.splitlines():
+        label, separator, value = line.partition(":")
+        if separator and label.strip().lower() in NOTE_FIELDS:
+            field = NOTE_FIELDS[label.strip().lower()]
+            step[field] = value.strip()
+        elif field:
+            # Continuation of a multi-line value
+            step[field] = f"{step[field]}\n{line}" if step[field] else line
+        elif line.strip():
+            extra.append(line.strip())
+    # Free text in the notes (manual templates) stays with the step
+    if extra:
+        step["description"] = "\n".join([step["description"], *extra]).strip()
+
+
+def read_test_case_sheet(worksheet, sheet_images=()):
+    """
+    Parse one test case sheet (streamed rows) into a test case record.
+
+    Args:
+        worksheet: Read-only worksheet
+        sheet_images: (row, column, media part) tuples for this sheet
+
+    Returns:
+        dict: {"test_number", "description", "steps": [{"step_number", "description",
+        "modules", "calculation_logic", "configuration", "images": [media part, ...]}]}
+        or None when the sheet has no title in B2
+    """
+    title = None
+    steps = []
+    step_rows = []  # header row of each step, for placing images
+    awaiting_notes = False
+
+    for row_number, row in enumerate(worksheet.iter_rows(max_col=2, values_only=True), start=1):
+        value = row[1] if len(row) > 1 else None
+        if not isinstance(value, str) or not value.strip():
+            continue
+        text = value.strip()
+
+        if row_number == 2 and title is None:
+            title = text
+            continue
+        if title is None or text.startswith("["):
+            # Before the title, or a placeholder / link / missing-image note
+            continue
+
+        match = STEP_HEADER.match(text)
+        if match:
+            steps.append({
+                "step_number": int(match.group(1)),
+                "description": match.group(2).strip(),
+                "modules": None,
+                "calculation_logic": None,
+                "configuration": None,
+                "images": [],
+            })
+            step_rows.append(row_number)
+            awaiting_notes = True
+        elif steps and awaiting_notes:
+            _apply_notes(steps[-1], text)
+            awaiting_notes = False
+
+    if title is None:
+        return None
+
+    for image_row, _, media_part in sheet_images:
+        # An image belongs to the last step whose header is above it
+        owner = None
+        for index, step_row in enumerate(step_rows):
+            if step_row < image_row:
+                owner = index
+        if owner is not None:
+            steps[owner]["images"].append(media_part)
+
+    # Keep step numbers unique within the test case
+    used = set()
+    for step in steps:
+        if step["step_number"] in used:
+            step["step_number"] = max(used) + 1
+        used.add(step["step_number"])
+
+    test_number, separator, description = title.partition(" - ")
+    if not separator:
+        test_number, description = worksheet.title, title
+    return {"test_number": test_number.strip(), "description": description.strip(), "steps": steps}
+
+
+def store_media(archive, media_part, import_dir=None):
+    """
+    Copy an image out of the archive into the content-addressed store.
+
+    Returns:
+        str: Path of the stored file (<import_dir>/<sha256>.<ext>)
+    """
+    import_dir = Path(import_dir or IMPORT_DIR)
+    import_dir.mkdir(parents=True, exist_ok=True)
+    extension = posixpath.splitext(media_part)[1].lower() or ".png"
+
+    digest = hashlib.sha256()
+    handle, temp_path = tempfile.mkstemp(dir=import_dir, suffix=".part")
+    try:
+        with os.fdopen(handle, "wb") as dest, archive.open(media_part) as src:
+            for chunk in iter(lambda: src.read(COPY_CHUNK_SIZE), b""):
+                digest.update(chunk)
+                dest.write(chunk)
+        final_path = import_dir / f"{digest.hexdigest()}{extension}"
+        if final_path.exists():
+            os.remove(temp_path)
+        else:
+            os.replace(temp_path, final_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    return str(final_path)
+
+
+def import_workbook(source, project_id=None, import_dir=None):
+    """
+    Import one workbook: test cases, steps and embedded screenshots.
+
+    Args:
+        source: Path of the .xlsx file, or a seekable binary file object
+        project_id: Put every test case into this project. If None, projects
+            are taken from the Summary sheet (created by name when missing);
+            test cases without one go to the "Unassigned" project
+        import_dir: Screenshot store (default IMPORT_DIR)
+
+    Returns:
+        dict: {"test_cases": created count, "steps", "screenshots", "images_stored",
+        "skipped": test numbers already present, "created": new test case IDs}
+    """
+    workbook = load_workbook(source, read_only=True, data_only=True)
+    if hasattr(source, "seek"):
+        source.seek(0)
+    archive = zipfile.ZipFile(source)
+    try:
+        images_by_sheet = read_sheet_images(archive)
+        summary_projects = {}
+        if SUMMARY_SHEET in workbook.sheetnames:
+            summary_projects = read_summary_projects(workbook[SUMMARY_SHEET])
+
+        stored = {}  # media part -> stored file path
+        records = []
+        for worksheet in workbook.worksheets:
+            if worksheet.title == SUMMARY_SHEET:
+                continue
+            record = read_test_case_sheet(worksheet, images_by_sheet.get(worksheet.title, ()))
+            if record is None:
+                continue
+
+            if project_id is not None:
+                record["project_id"] = project_id
+            else:
+                candidates = summary_projects.get(record["test_number"])
+                record["project_name"] = (candidates.pop(0) if candidates else None) or "Unassigned"
+
+            for step in record["steps"]:
+                step["screenshots"] = []
+                for media_part in step.pop("images"):
+                    if media_part not in stored:
+                        stored[media_part] = store_media(archive, media_part, import_dir)
+                    step["screenshots"].append({"file_path": stored[media_part], "screenshot_name": None})
+            records.append(record)
+    finally:
+        archive.close()
+        workbook.close()
+
+    # One transaction per workbook: projects created for it are rolled back with its test cases
+    conn = models.get_db_connection()
+    try:
+        conn.execute("BEGIN")
+        project_ids = {}  # project name -> ID
+        for record in records:
+            project_name = record.pop("project_name", None)
+            if project_name is not None:
+                if project_name not in project_ids:
+                    project_ids[project_name] = models.get_or_create_project(project_name, conn=conn)
+                record["project_id"] = project_ids[project_name]
+        result = models.bulk_import_test_cases(records, conn=conn)
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+    return {
+        "test_cases": len(result["created"]),
+        "steps": result["steps"],
+        "screenshots": result["screenshots"],
+        "images_stored": len(stored),
+        "skipped": result["skipped"],
+        "created": result["created"],
+    }
@@ -0,0 +1,179 @@
+"""
+Export size estimation for Test Case Documentation Tool
+
+Estimates the size and build memory of an Excel export from row counts and
+screenshot file sizes, before anything is built, and splits oversized
+exports into workbooks that stay within the limits.
+
+The cost constants are rough and deliberately on the high side; they were
+calibrated with benchmarks/bench_export.py (openpyxl keeps every sheet of a
+workbook in memory until it is saved).
+
+Configuration (environment variables):
+- EXPORT_MAX_WORKBOOK_MB: largest workbook to produce (default: 500; Excel struggles well before its 2 GB limit)
+- EXPORT_MEMORY_BUDGET_MB: memory one export may use while building workbooks (default: 512)
+"""
+
+import os
+from typing import Dict, List, Optional
+
+from shared.models import iter_export_rows
+
+MAX_WORKBOOK_BYTES = int(os.environ.get("EXPORT_MAX_WORKBOOK_MB", "500")) * 1024 * 1024
+MEMORY_BUDGET_BYTES = int(os.environ.get("EXPORT_MEMORY_BUDGET_MB", "512")) * 1024 * 1024
+
+# Output size: compressed XML per workbook / test case sheet / step / screenshot reference
+OUTPUT_BASE_BYTES = 8 * 1024
+OUTPUT_PER_TEST_CASE = 1000
+OUTPUT_PER_STEP = 120
+OUTPUT_PER_SCREENSHOT = 100
+OUTPUT_PER_THUMBNAIL = 10 * 1024
+
+# Build memory: openpyxl objects per sheet / step / embedded image, plus the
+# largest image, which is read whole when the workbook is saved
+MEMORY_BASE_BYTES = 4 * 1024 * 1024
+MEMORY_PER_TEST_CASE = 40 * 1024
+MEMORY_PER_STEP = 2 * 1024
+MEMORY_PER_IMAGE = 8 * 1024
+
+
+def _test_case_costs(stats, image_mode):
+    """Return (output bytes, memory bytes) of one test case sheet."""
+    output = OUTPUT_PER_TEST_CASE + OUTPUT_PER_STEP * stats["steps"] + OUTPUT_PER_SCREENSHOT * stats["screenshots"]
+    memory = MEMORY_PER_TEST_CASE + MEMORY_PER_STEP * stats["steps"]
+    if image_mode == "full":
+        output += stats["image_bytes"]
+        memory += MEMORY_PER_IMAGE * stats["images"]
+    elif image_mode == "thumbnail":
+        output += OUTPUT_PER_THUMBNAIL * stats["images"]
+        memory += MEMORY_PER_IMAGE * stats["images"]
+    return output, memory
+
+
+def estimate_export(selected_test_case_ids=None, selected_project_ids=None, since=None,
+                    image_mode: str = "full") -> Dict:
+    """
+    Estimate an Excel export without building it.
+
+    Uses one pass over the export rows (same selection rules as
+    create_excel_export) and one stat per distinct screenshot file.
+    Images are counted once per test case; sharing across test cases is
+    ignored, so estimates err on the large side.
+
+    Args:
+        selected_test_case_ids: Optional list of test case IDs to export. If None, exports all.
+        selected_project_ids: Optional list of project IDs to export.
+        since: Optional datetime; count only test cases changed at or after it
+        image_mode: "full", "thumbnail", "linked" or "none" (see create_excel_export)
+
+    Returns:
+        dict: Totals (test_cases, steps, screenshots, images, image_bytes,
+        missing_images, estimated_output_bytes, estimated_peak_memory_bytes)
+        and per_test_case, a list of {"id", "project_id", "output_bytes",
+        "memory_bytes", "largest_image_bytes"} in export order
+    """
+    file_sizes = {}  # file_path -> size in bytes, None if missing
+    per_test_case = {}
+
+    for row in iter_export_rows(selected_test_case_ids, selected_project_ids, since=since):
+        stats = per_test_case.get(row['test_case_id'])
+        if stats is None:
+            stats = per_test_case[row['test_case_id']] = {
+                "id": row['test_case_id'], "project_id": row['project_id'],
+                "step_ids": set(), "paths": set(), "steps": 0, "screenshots": 0,
+                "images": 0, "image_bytes": 0, "missing_images": 0, "largest_image_bytes": 0,
+            }
+        if row['step_id'] is not None and row['step_id'] not in stats["step_ids"]:
+            stats["step_ids"].add(row['step_id'])
+            stats["steps"] += 1
+        if row['screenshot_id'] is None:
+            continue
+
+        stats["screenshots"] += 1
+        path = row['file_path']
+        if path not in file_sizes:
+            try:
+                file_sizes[path] = os.path.getsize(path)
+            except OSError:
+                file_sizes[path] = None
+        size = file_sizes[path]
+        if size is None:
+            stats["missing_images"] += 1
+        else:
+            stats["images"] += 1
+            if path not in stats["paths"]:
+                stats["paths"].add(path)
+                stats["image_bytes"] += size
+                stats["largest_image_bytes"] = max(stats["largest_image_bytes"], size)
+
+    totals = {name: 0 for name in ("steps", "screenshots", "images", "image_bytes", "missing_images")}
+    output_bytes = OUTPUT_BASE_BYTES
+    memory_bytes = MEMORY_BASE_BYTES
+    entries = []
+    for stats in per_test_case.values():
+        for name in totals:
+            totals[name] += stats[name]
+        tc_output, tc_memory = _test_case_costs(stats, image_mode)
+        output_bytes += tc_output
+        memory_bytes += tc_memory
+        entries.append({
+            "id": stats["id"],
+            "project_id": stats["project_id"],
+            "output_bytes": tc_output,
+            "memory_bytes": tc_memory,
+            # Only embedded images are read whole at save time
+            "largest_image_bytes": stats["largest_image_bytes"] if image_mode in ("full", "thumbnail") else 0,
+        })
+    memory_bytes += max((entry["largest_image_bytes"] for entry in entries), default=0)
+
+    return {
+        "test_cases": len(entries),
+        **totals,
+        "estimated_output_bytes": output_bytes,
+        "estimated_peak_memory_bytes": memory_bytes,
+        "per_test_case": entries,
+    }
+
+
+def split_into_workbooks(per_test_case: List[Dict],
+                         max_workbook_bytes: Optional[int] = None,
+                         memory_budget_bytes: Optional[int] = None) -> List[List[int]]:
+    """
+    Group test cases (in export order) into workbooks that stay within the limits.
+
+    A test case is never split: one that exceeds a limit on its own gets a
+    workbook of its own.
+
+    Args:
+        per_test_case: per_test_case entries from estimate_export
+        max_workbook_bytes: Largest estimated workbook size (default MAX_WORKBOOK_BYTES)
+        memory_budget_bytes: Largest estimated build memory (default MEMORY_BUDGET_BYTES)
+
+    Returns:
+        List of test case ID lists, one per workbook
+    """
+    max_workbook_bytes = max_workbook_bytes or MAX_WORKBOOK_BYTES
+    memory_budget_bytes = memory_budget_bytes or MEMORY_BUDGET_BYTES
+
+    workbooks = []
+    current = []
+    output_bytes = OUTPUT_BASE_BYTES
+    memory_bytes = MEMORY_BASE_BYTES
+    largest_image = 0
+    for entry in per_test_case:
+        next_output = output_bytes + entry["output_bytes"]
+        next_memory = memory_bytes + entry["memory_bytes"] + max(largest_image, entry["largest_image_bytes"])
+        if current and (next_output > max_workbook_bytes or next_memory > memory_budget_bytes):
+            workbooks.append(current)
+            current = []
+            output_bytes = OUTPUT_BASE_BYTES
+            memory_bytes = MEMORY_BASE_BYTES
+            largest_image = 0
+        current.append(entry["id"])
+        output_bytes += entry["output_bytes"]
+        memory_bytes += entry["memory_bytes"]
+        largest_image = max(largest_image, entry["largest_image_bytes"])
+    if current:
+        workbooks.append(current)
+    return workbooks
+
@@ -0,0 +1,128 @@
+"""
+Export profiling for Test Case Documentation Tool
+
+Collects per-phase timings and counters while an export is built, so slow
+exports can be attributed to the database, images, cell styling, merges or
+serialisation.
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Interval between resident set size samples while an export is tracked
+MEMORY_SAMPLE_SECONDS = 0.02
+
+
+def get_rss_bytes():
+    """Return the current resident set size of this process in bytes, or None if unknown."""
+    try:
+        with open("/proc/self/statm") as f:
+            resident_pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):  # No procfs (macOS, Windows)
+        return None
+    return resident_pages * os.sysconf("SC_PAGE_SIZE")
+
+
+class ExportProfile:
+    """
+    Phase timers and counters for one export.
+
+    Phases can be nested: each phase records its own (exclusive) time, so a
+    coarse "cell_styling" phase around a sheet does not also count the
+    "db_fetch" or "image_load" phases inside it, and the phases add up to
+    the total.
+
+    Memory is sampled only inside track_memory(): peak_rss_bytes is the
+    highest resident set size seen during that block, rss_growth_bytes how
+    far it rose above the size at the start. Both are None where RSS cannot
+    be read. They are process-wide samples, so other work running in the
+    same process at the same time is included.
+    """
+
+    def __init__(self):
+        self.phases = {}
+        self.counters = {}
+        self.total_seconds = None
+        self.peak_rss_bytes = None
+        self.rss_growth_bytes = None
+        self._started = time.perf_counter()
+        self._child_time = [0.0]
+
+    @contextmanager
+    def phase(self, name):
+        """Time a block and add its exclusive time to the named phase."""
+        self._child_time.append(0.0)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            children = self._child_time.pop()
+            self._child_time[-1] += elapsed
+            self.phases[name] = self.phases.get(name, 0.0) + elapsed - children
+
+    @contextmanager
+    def track_memory(self):
+        """Sample RSS in a background thread while the block runs (re-entrant)."""
+        start_rss = get_rss_bytes()
+        if start_rss is None or self.rss_growth_bytes is not None:
+            yield
+            return
+
+        peak = [start_rss]
+        stop = threading.Event()
+
+        def sample():
+            while not stop.wait(MEMORY_SAMPLE_SECONDS):
+                peak[0] = max(peak[0], get_rss_bytes() or 0)
+
+        self.rss_growth_bytes = 0
+        sampler = threading.Thread(target=sample, name="export-memory", daemon=True)
+        sampler.start()
+        try:
+            yield
+        finally:
+            stop.set()
+            sampler.join()
+            peak[0] = max(peak[0], get_rss_bytes() or 0)
+            self.peak_rss_bytes = peak[0]
+            self.rss_growth_bytes = peak[0] - start_rss
+
+    def count(self, name, amount=1):
+        """Increment a counter."""
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def finish(self):
+        """Stop the clock."""
+        self.total_seconds = time.perf_counter() - self._started
+        return self
+
+    def to_dict(self):
+        """Return the profile as a JSON-serialisable dict (times in milliseconds)."""
+        if self.total_seconds is None:
+            self.finish()
+        phases_ms = {name: round(seconds * 1000, 1) for name, seconds in self.phases.items()}
+        phases_ms["other"] = round(max(self.total_seconds * 1000 - sum(phases_ms.values()), 0.0), 1)
+        return {
+            "total_ms": round(self.total_seconds * 1000, 1),
+            "phases_ms": phases_ms,
+            "counters": dict(self.counters),
+            "peak_rss_bytes": self.peak_rss_bytes,
+            "rss_growth_bytes": self.rss_growth_bytes,
+        }
+
+    def to_header(self):
+        """
+        Return the profile as a compact header value, e.g.
+        "total=812.4ms, db_fetch=10.2ms, save=95.0ms, images=12, image_bytes=48213, peak_rss=183500800, rss_growth=20971520".
+        """
+        data = self.to_dict()
+        parts = [f"total={data['total_ms']}ms"]
+        parts.extend(f"{name}={ms}ms" for name, ms in data["phases_ms"].items())
+        parts.extend(f"{name}={value}" for name, value in data["counters"].items())
+        if data["peak_rss_bytes"] is not None:
+            parts.append(f"peak_rss={data['peak_rss_bytes']}")
+            parts.append(f"rss_growth={data['rss_growth_bytes']}")
+        return ", ".join(parts)
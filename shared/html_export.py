@@ -0,0 +1,215 @@
+"""
+HTML Export Module for Test Case Documentation Tool
+
+This module renders test cases as a static HTML site and streams it as a ZIP
+archive, written on the fly. The bundle contains:
+- index.html: summary table grouped by project (mirrors the Excel Summary sheet)
+- test-cases/<id>.html: one page per test case with steps, notes and screenshots
+- images/<sha256>.<ext>: full-size screenshots, named by content hash (stored once)
+- thumbs/<sha256>.jpg: small previews shown with loading="lazy"
+"""
+
+import html
+import io
+import os
+import zipfile
+from shared.models import get_steps_by_test_case, get_screenshots_by_step
+from shared.excel_export import select_test_cases, group_test_cases_by_project, get_step_notes, hash_file
+from shared.thumbnails import write_thumbnail
+from shared.zip_stream import ZipStreamSink
+
+
+THUMBNAIL_WIDTH = 320
+THUMBNAIL_QUALITY = 80
+READ_CHUNK_SIZE = 256 * 1024
+
+STYLESHEET = """
+body { font-family: -apple-system, "Segoe UI", Helvetica, Arial, sans-serif; margin: 2rem; color: #222; }
+h1 { font-size: 1.4rem; }
+table { border-collapse: collapse; width: 100%; max-width: 1100px; }
+th, td { border: 1px solid #999; padding: 4px 8px; vertical-align: top; }
+th { background: #1F4E78; color: #fff; }
+tr.project td { background: #D0D0D0; font-weight: bold; }
+td.center { text-align: center; }
+a { color: #0563C1; }
+.step { margin: 1.5rem 0; max-width: 1100px; }
+.step h2 { font-size: 1rem; background: #D9E1F2; border-top: 2px solid #000; border-bottom: 2px solid #000; padding: 4px 8px; white-space: pre-wrap; }
+.notes { font-size: 0.9rem; white-space: pre-wrap; }
+.shots a { display: inline-block; margin: 0 8px 8px 0; }
+.shots img { max-width: 320px; border: 1px solid #ccc; }
+.missing { color: #FF0000; font-style: italic; }
+"""
+
+
+def _page(title, body, stylesheet_href):
+    """Wrap a page body in the common HTML skeleton."""
+    return (
+        "<!DOCTYPE html>\n"
+        "<html lang=\"en\">\n<head>\n<meta charset=\"utf-8\">\n"
+        f"<title>{html.escape(title)}</title>\n"
+        f"<link rel=\"stylesheet\" href=\"{stylesheet_href}\">\n"
+        "</head>\n<body>\n"
+        f"{body}\n"
+        "</body>\n</html>\n"
+    )
+
+
+def render_index_page(test_cases, projects_info):
+    """Render index.html: the summary table, grouped by project like the Summary sheet."""
+    grouped_by_project, ungrouped_test_cases = group_test_cases_by_project(test_cases, projects_info)
+
+    def test_case_row(tc):
+        return (
+            "<tr>"
+            f"<td><a href=\"test-cases/{tc['id']}.html\">{html.escape(str(tc['test_number']))}</a></td>"
+            f"<td>{html.escape(tc['description'] or '')}</td>"
+            "<td class=\"center\">Completed</td>"
+            "<td class=\"center\">Pass</td>"
+            "</tr>"
+        )
+
+    rows = []
+    for project_id, project_tcs in grouped_by_project.items():
+        project = projects_info.get(project_id)
+        project_name = project['name'] if project else f"Project {project_id}"
+        rows.append(f"<tr class=\"project\"><td colspan=\"4\">Project: {html.escape(project_name)}</td></tr>")
+        rows.extend(test_case_row(tc) for tc in project_tcs)
+    if ungrouped_test_cases:
+        rows.append("<tr class=\"project\"><td colspan=\"4\">Unassigned Test Cases</td></tr>")
+        rows.extend(test_case_row(tc) for tc in ungrouped_test_cases)
+
+    body = (
+        "<h1>Test Case Documentation</h1>\n"
+        "<table>\n<thead><tr><th>Test Case ID</th><th>Test Case Name</th>"
+        "<th>Execution Status</th><th>Outcome</th></tr></thead>\n<tbody>\n"
+        + "\n".join(rows)
+        + "\n</tbody>\n</table>"
+    )
+    return _page("Test Case Documentation", body, "style.css")
+
+
+def render_test_case_page(test_case, steps):
+    """
+    Render one test case page.
+
+    Args:
+        test_case: Test case dict
+        steps: List of (step, screenshots) where each screenshot dict carries
+            '_image_href' / '_thumb_href' (None when the file is missing)
+    """
+    title = f"{test_case['test_number']} - {test_case['description']}"
+    parts = [
+        f"<h1>{html.escape(title)}</h1>",
+        "<p>Go to <a href=\"../index.html\">[Summary]</a></p>",
+    ]
+
+    if not steps:
+        parts.append("<p><em>No steps defined for this test case.</em></p>")
+
+    for step, screenshots in steps:
+        parts.append("<div class=\"step\">")
+        parts.append(f"<h2>{step['step_number']}/ {html.escape(step['description'] or '')}</h2>")
+        notes = get_step_notes(step)
+        if notes:
+            parts.append(f"<div class=\"notes\">{html.escape(chr(10).join(notes))}</div>")
+        if screenshots:
+            parts.append("<div class=\"shots\">")
+            for screenshot in screenshots:
+                name = screenshot.get('screenshot_name') or os.path.basename(screenshot['file_path'])
+                if screenshot['_image_href']:
+                    parts.append(
+                        f"<a href=\"{screenshot['_image_href']}\">"
+                        f"<img src=\"{screenshot['_thumb_href']}\" alt=\"{html.escape(name)}\" loading=\"lazy\">"
+                        "</a>"
+                    )
+                else:
+                    parts.append(
+                        f"<p class=\"missing\">[Image not found: {html.escape(os.path.basename(screenshot['file_path']))}]</p>"
+                    )
+            parts.append("</div>")
+        parts.append("</div>")
+
+    return _page(title, "\n".join(parts), "../style.css")
+
+
+def _make_thumbnail(path):
+    """Return JPEG thumbnail bytes for an image, or None if Pillow is unavailable or fails."""
+    out = io.BytesIO()
+    try:
+        write_thumbnail(path, out, THUMBNAIL_WIDTH, max_height=THUMBNAIL_WIDTH * 4, quality=THUMBNAIL_QUALITY)
+    except Exception:  # Pillow missing or the image unreadable: fall back to the full image
+        return None
+    return out.getvalue()
+
+
+def iter_html_export(selected_test_case_ids=None, selected_project_ids=None, since=None):
+    """
+    Stream a static HTML documentation bundle as a ZIP archive.
+
+    Pages and images are added one at a time and the archive bytes are
+    yielded as soon as they are written, so the whole bundle is never held
+    in memory. Identical screenshots (same content hash) are stored once.
+
+    Args:
+        selected_test_case_ids: Optional list of test case IDs to export. If None, exports all.
+        selected_project_ids: Optional list of project IDs to export.
+        since: Optional datetime; export only test cases changed at or after it
+
+    Yields:
+        bytes: Chunks of the ZIP archive
+    """
+    sink = ZipStreamSink()
+    # Images are already compressed: store them, deflate only the text files
+    archive = zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_STORED)
+
+    def write_text(name, text):
+        archive.writestr(name, text.encode("utf-8"), compress_type=zipfile.ZIP_DEFLATED)
+
+    test_cases, projects_info = select_test_cases(selected_test_case_ids, selected_project_ids, since)
+
+    write_text("style.css", STYLESHEET)
+    write_text("index.html", render_index_page(test_cases, projects_info))
+    yield from sink.drain()
+
+    hashes_by_path = {}  # file_path -> content hash (None if missing)
+    written_hashes = {}  # content hash -> (image href, thumbnail href)
+
+    for test_case in test_cases:
+        steps = []
+        for step in get_steps_by_test_case(test_case['id']):
+            screenshots = get_screenshots_by_step(step['id'])
+            for screenshot in screenshots:
+                path = screenshot['file_path']
+                screenshot['_image_href'] = screenshot['_thumb_href'] = None
+
+                if path not in hashes_by_path:
+                    hashes_by_path[path] = hash_file(path) if os.path.isfile(path) else None
+                content_hash = hashes_by_path[path]
+                if content_hash is None:
+                    continue
+
+                if content_hash not in written_hashes:
+                    extension = os.path.splitext(path)[1].lower() or ".png"
+                    image_name = f"images/{content_hash}{extension}"
+                    with open(path, "rb") as src, archive.open(image_name, "w") as dest:
+                        for chunk in iter(lambda: src.read(READ_CHUNK_SIZE), b""):
+                            dest.write(chunk)
+                            yield from sink.drain()
+
+                    thumbnail = _make_thumbnail(path)
+                    if thumbnail is not None:
+                        thumb_name = f"thumbs/{content_hash}.jpg"
+                        archive.writestr(thumb_name, thumbnail)
+                    else:
+                        thumb_name = image_name
+                    written_hashes[content_hash] = (f"../{image_name}", f"../{thumb_name}")
+                    yield from sink.drain()
+
+                screenshot['_image_href'], screenshot['_thumb_href'] = written_hashes[content_hash]
+            steps.append((step, screenshots))
+
+        write_text(f"test-cases/{test_case['id']}.html", render_test_case_page(test_case, steps))
+        yield from sink.drain()
+
+    archive.close()
+    yield from sink.drain()
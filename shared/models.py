@@ -7,8 +7,13 @@ functions for managing test cases, steps, and screenshots.
 
 import sqlite3
 import os
-from datetime import datetime
-from typing import Optional, List, Dict, Tuple
+import time
+import itertools
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Optional, List, Dict, Tuple, Iterator
+
+from shared import metrics
 
 
 # Database file path - relative to shared directory
@@ -16,11 +21,112 @@ DB_DIR = os.path.join(os.path.dirname(__file__), "database")
 DB_FILE = os.path.join(DB_DIR, "test_cases.db")
 
 
-def get_db_connection():
-    """Create and return a database connection."""
+class InstrumentedCursor(sqlite3.Cursor):
+    """Cursor that records statement counts and execution time in shared.metrics."""
+
+    def execute(self, sql, parameters=()):
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            metrics.record_query(sql, time.perf_counter() - start)
+
+    def executemany(self, sql, seq_of_parameters):
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            metrics.record_query(sql, time.perf_counter() - start)
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """Connection whose cursors (including conn.execute) are instrumented."""
+
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    # sqlite3.Connection.execute creates its cursor internally, bypassing cursor()
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+def get_db_connection(check_same_thread: bool = True):
+    """
+    Create and return a database connection.
+    
+    Pass check_same_thread=False for connections that are consumed across
+    threads, e.g. a cursor drained by a streaming response.
+    
+    Connections are counted and their statements timed (see shared.metrics).
+    """
     # Ensure database directory exists
     os.makedirs(DB_DIR, exist_ok=True)
-    return sqlite3.connect(DB_FILE)
+    conn = sqlite3.connect(DB_FILE, check_same_thread=check_same_thread, factory=InstrumentedConnection)
+    metrics.DB_CONNECTIONS_OPENED.inc()
+    return conn
+
+
+_savepoint_ids = itertools.count(1)
+
+
+@contextmanager
+def _read_cursor(conn: Optional[sqlite3.Connection] = None) -> Iterator[sqlite3.Cursor]:
+    """
+    Yield a cursor returning sqlite3.Row rows.
+    
+    Runs on conn when given (e.g. the request's connection, see the backend's
+    api/database.py), otherwise on a new connection closed on exit.
+    """
+    own = conn is None
+    if own:
+        conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.row_factory = sqlite3.Row
+        yield cursor
+    finally:
+        if own:
+            conn.close()
+
+
+@contextmanager
+def _write_cursor(conn: Optional[sqlite3.Connection] = None) -> Iterator[sqlite3.Cursor]:
+    """
+    Yield a cursor for one atomic unit of work.
+    
+    On a new connection the work is committed on exit (rolled back on error)
+    and the connection closed. On a caller's connection it runs in a
+    savepoint: an error undoes only this unit, and committing is left to the
+    owner of the connection.
+    """
+    if conn is None:
+        conn = get_db_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.row_factory = sqlite3.Row
+            yield cursor
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+        return
+    
+    savepoint = f"sp_{next(_savepoint_ids)}"
+    conn.execute(f"SAVEPOINT {savepoint}")
+    try:
+        cursor = conn.cursor()
+        cursor.row_factory = sqlite3.Row
+        yield cursor
+    except BaseException:
+        conn.execute(f"ROLLBACK TO {savepoint}")
+        conn.execute(f"RELEASE {savepoint}")
+        raise
+    conn.execute(f"RELEASE {savepoint}")
 
 
 def init_database():
@@ -50,6 +156,7 @@ def init_database():
             description TEXT NOT NULL,
             project_id INTEGER,
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
             FOREIGN KEY (project_id) REFERENCES projects(id) ON DELETE SET NULL
         )
     """)
@@ -174,6 +281,7 @@ def init_database():
             calculation_logic TEXT,
             configuration TEXT,
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
             FOREIGN KEY (test_case_id) REFERENCES test_cases(id) ON DELETE CASCADE,
             UNIQUE(test_case_id, step_number)
         )
@@ -187,6 +295,7 @@ def init_database():
             file_path TEXT NOT NULL,
             screenshot_name TEXT,
             uploaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
             FOREIGN KEY (step_id) REFERENCES test_steps(id) ON DELETE CASCADE
         )
     """)
@@ -204,381 +313,337 @@ def init_database():
     except sqlite3.OperationalError:
         pass
     
+    # Migration: Add updated_at (modification time, used by delta exports) to tables
+    # that only had a creation time. SQLite cannot add a column with a
+    # CURRENT_TIMESTAMP default, so existing rows are backfilled and inserts set
+    # updated_at explicitly.
+    for table, created_column in (("test_cases", "created_at"),
+                                  ("test_steps", "created_at"),
+                                  ("step_screenshots", "uploaded_at")):
+        try:
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN updated_at TIMESTAMP")
+            cursor.execute(f"UPDATE {table} SET updated_at = {created_column} WHERE updated_at IS NULL")
+        except sqlite3.OperationalError:
+            # Column already exists, ignore
+            pass
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_updated_at ON {table}(updated_at)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_step_screenshots_step_id ON step_screenshots(step_id)")
+    # Shared-file check before deleting a screenshot's file
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_step_screenshots_file_path ON step_screenshots(file_path)")
+    
     conn.commit()
     conn.close()
     print(f"Database initialized successfully at: {DB_FILE}")
 
 
 # Test Case Functions
-def create_test_case(test_number: str, description: str, project_id: Optional[int] = None) -> int:
+def create_test_case(test_number: str, description: str, project_id: Optional[int] = None,
+                     conn: Optional[sqlite3.Connection] = None) -> int:
     """Create a new test case and return its ID."""
-    conn = get_db_connection()
-    cursor = conn.cursor()
     try:
-        cursor.execute("""
-            INSERT INTO test_cases (test_number, description, project_id)
-            VALUES (?, ?, ?)
-        """, (test_number, description, project_id))
-        test_case_id = cursor.lastrowid
-        conn.commit()
-        return test_case_id
+        with _write_cursor(conn) as cursor:
+            cursor.execute("""
+                INSERT INTO test_cases (test_number, description, project_id, updated_at)
+                VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+            """, (test_number, description, project_id))
+            return cursor.lastrowid
     except sqlite3.IntegrityError as e:
-        conn.rollback()
         raise ValueError(f"Test case with number '{test_number}' already exists in this project") from e
-    except Exception as e:
-        conn.rollback()
-        raise
-    finally:
-        conn.close()
 
 
-def get_all_test_cases(project_id: Optional[int] = None) -> List[Dict]:
+def get_all_test_cases(project_id: Optional[int] = None, conn: Optional[sqlite3.Connection] = None) -> List[Dict]:
     """Get all test cases, optionally filtered by project_id."""
-    conn = get_db_connection()
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
-    
-    if project_id is not None:
-        cursor.execute("SELECT * FROM test_cases WHERE project_id = ? ORDER BY created_at DESC", (project_id,))
-    else:
-        cursor.execute("SELECT * FROM test_cases ORDER BY created_at DESC")
-    
-    rows = cursor.fetchall()
-    conn.close()
+    with _read_cursor(conn) as cursor:
+        if project_id is not None:
+            cursor.execute("SELECT * FROM test_cases WHERE project_id = ? ORDER BY created_at DESC", (project_id,))
+        else:
+            cursor.execute("SELECT * FROM test_cases ORDER BY created_at DESC")
+        rows = cursor.fetchall()
     return [dict(row) for row in rows]
 
 
-def get_test_case_by_id(test_case_id: int) -> Optional[Dict]:
+def get_test_case_by_id(test_case_id: int, conn: Optional[sqlite3.Connection] = None) -> Optional[Dict]:
     """Get a test case by ID."""
-    conn = get_db_connection()
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM test_cases WHERE id = ?", (test_case_id,))
-    row = cursor.fetchone()
-    conn.close()
+    with _read_cursor(conn) as cursor:
+        cursor.execute("SELECT * FROM test_cases WHERE id = ?", (test_case_id,))
+        row = cursor.fetchone()
     return dict(row) if row else None
 
 
-def update_test_case(test_case_id: int, test_number: str, description: str, project_id: Optional[int] = None) -> bool:
+def update_test_case(test_case_id: int, test_number: str, description: str, project_id: Optional[int] = None,
+                     conn: Optional[sqlite3.Connection] = None) -> bool:
     """Update an existing test case."""
-    conn = get_db_connection()
-    cursor = conn.cursor()
     try:
-        # Get current project_id if not provided
-        if project_id is None:
-            cursor.execute("SELECT project_id FROM test_cases WHERE id = ?", (test_case_id,))
-            result = cursor.fetchone()
-            if result:
-                project_id = result[0]
-        
-        # Check if test_number already exists in the same project (excluding current test case)
-        cursor.execute("""
-            SELECT id FROM test_cases 
-            WHERE test_number = ? AND project_id = ? AND id != ?
-        """, (test_number, project_id, test_case_id))
-        if cursor.fetchone():
-            conn.rollback()
-            raise ValueError(f"Test case with number '{test_number}' already exists in this project")
-        
-        if project_id is not None:
-            cursor.execute("""
-                UPDATE test_cases
-                SET test_number = ?, description = ?, project_id = ?
-                WHERE id = ?
-            """, (test_number, description, project_id, test_case_id))
-        else:
+        with _write_cursor(conn) as cursor:
+            # Get current project_id if not provided
+            if project_id is None:
+                cursor.execute("SELECT project_id FROM test_cases WHERE id = ?", (test_case_id,))
+                result = cursor.fetchone()
+                if result:
+                    project_id = result[0]
+            
+            # Check if test_number already exists in the same project (excluding current test case)
             cursor.execute("""
-                UPDATE test_cases
-                SET test_number = ?, description = ?
-                WHERE id = ?
-            """, (test_number, description, test_case_id))
-        success = cursor.rowcount > 0
-        conn.commit()
-        return success
+                SELECT id FROM test_cases
+                WHERE test_number = ? AND project_id = ? AND id != ?
+            """, (test_number, project_id, test_case_id))
+            if cursor.fetchone():
+                raise ValueError(f"Test case with number '{test_number}' already exists in this project")
+            
+            if project_id is not None:
+                cursor.execute("""
+                    UPDATE test_cases
+                    SET test_number = ?, description = ?, project_id = ?, updated_at = CURRENT_TIMESTAMP
+                    WHERE id = ?
+                """, (test_number, description, project_id, test_case_id))
+            else:
+                cursor.execute("""
+                    UPDATE test_cases
+                    SET test_number = ?, description = ?, updated_at = CURRENT_TIMESTAMP
+                    WHERE id = ?
+                """, (test_number, description, test_case_id))
+            return cursor.rowcount > 0
     except sqlite3.IntegrityError as e:
-        conn.rollback()
         raise ValueError(f"Test case with number '{test_number}' already exists in this project") from e
-    except Exception as e:
-        conn.rollback()
-        raise
-    finally:
-        conn.close()
 
 
-def move_test_case_to_project(test_case_id: int, project_id: Optional[int]) -> bool:
+def move_test_case_to_project(test_case_id: int, project_id: Optional[int],
+                              conn: Optional[sqlite3.Connection] = None) -> bool:
     """Move a test case to another project."""
-    conn = get_db_connection()
+    test_number = None
     try:
-        cursor = conn.cursor()
-        
-        # Get the test case's current test_number
-        cursor.execute("SELECT test_number FROM test_cases WHERE id = ?", (test_case_id,))
-        result = cursor.fetchone()
-        if not result:
-            return False
-        
-        test_number = result[0]
-        
-        # Check if a test case with the same test_number already exists in the target project
-        cursor.execute("""
-            SELECT id FROM test_cases 
-            WHERE test_number = ? AND project_id = ? AND id != ?
-        """, (test_number, project_id, test_case_id))
-        if cursor.fetchone():
-            conn.rollback()
-            raise ValueError(f"Test case with number '{test_number}' already exists in the target project")
-        
-        cursor.execute("""
-            UPDATE test_cases
-            SET project_id = ?
-            WHERE id = ?
-        """, (project_id, test_case_id))
-        success = cursor.rowcount > 0
-        conn.commit()
-        return success
+        with _write_cursor(conn) as cursor:
+            # Get the test case's current test_number
+            cursor.execute("SELECT test_number FROM test_cases WHERE id = ?", (test_case_id,))
+            result = cursor.fetchone()
+            if not result:
+                return False
+            
+            test_number = result[0]
+            
+            # Check if a test case with the same test_number already exists in the target project
+            cursor.execute("""
+                SELECT id FROM test_cases
+                WHERE test_number = ? AND project_id = ? AND id != ?
+            """, (test_number, project_id, test_case_id))
+            if cursor.fetchone():
+                raise ValueError(f"Test case with number '{test_number}' already exists in the target project")
+            
+            cursor.execute("""
+                UPDATE test_cases
+                SET project_id = ?, updated_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+            """, (project_id, test_case_id))
+            return cursor.rowcount > 0
     except sqlite3.IntegrityError as e:
-        conn.rollback()
         raise ValueError(f"Test case with number '{test_number}' already exists in the target project") from e
-    except Exception as e:
-        conn.rollback()
-        raise
-    finally:
-        conn.close()
 
 
-def duplicate_test_case(test_case_id: int, new_test_number: str, target_project_id: Optional[int] = None) -> Optional[int]:
+def duplicate_test_case(test_case_id: int, new_test_number: str, target_project_id: Optional[int] = None,
+                        conn: Optional[sqlite3.Connection] = None) -> Optional[int]:
     """
     Duplicate a test case with all its steps and screenshots.
     Returns the ID of the new test case, or None if failed.
     """
-    conn = get_db_connection()
     try:
-        # Get original test case (using the same connection to avoid locking)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM test_cases WHERE id = ?", (test_case_id,))
-        row = cursor.fetchone()
-        if not row:
-            return None
-        
-        original = dict(row)
-        
-        # Use target_project_id if provided, otherwise use original's project_id
-        project_id = target_project_id if target_project_id is not None else original.get('project_id')
-        
-        # Check if new_test_number already exists in the target project, if so, make it unique
-        cursor.execute("""
-            SELECT COUNT(*) as count FROM test_cases 
-            WHERE test_number = ? AND project_id = ?
-        """, (new_test_number, project_id))
-        count = cursor.fetchone()['count']
-        if count > 0:
-            # Generate unique test number by appending a timestamp and counter
-            base_number = new_test_number
-            counter = 1
-            from datetime import datetime
-            timestamp = int(datetime.now().timestamp())
-            while True:
-                unique_number = f"{base_number} COPY {timestamp}_{counter}"
-                cursor.execute("""
-                    SELECT COUNT(*) as count FROM test_cases 
-                    WHERE test_number = ? AND project_id = ?
-                """, (unique_number, project_id))
-                if cursor.fetchone()['count'] == 0:
-                    new_test_number = unique_number
-                    break
-                counter += 1
-        
-        # Create new test case
-        cursor.execute("""
-            INSERT INTO test_cases (test_number, description, project_id)
-            VALUES (?, ?, ?)
-        """, (new_test_number, original['description'], project_id))
-        new_test_case_id = cursor.lastrowid
-        
-        # Get all steps from original (using same connection)
-        cursor.execute("SELECT * FROM steps WHERE test_case_id = ? ORDER BY step_number", (test_case_id,))
-        original_steps = [dict(row) for row in cursor.fetchall()]
-        
-        # Duplicate each step
-        for step in original_steps:
+        with _write_cursor(conn) as cursor:
+            # Get original test case (using the same connection to avoid locking)
+            cursor.execute("SELECT * FROM test_cases WHERE id = ?", (test_case_id,))
+            row = cursor.fetchone()
+            if not row:
+                return None
+            
+            original = dict(row)
+            
+            # Use target_project_id if provided, otherwise use original's project_id
+            project_id = target_project_id if target_project_id is not None else original.get('project_id')
+            
+            # Check if new_test_number already exists in the target project, if so, make it unique
             cursor.execute("""
-                INSERT INTO steps (test_case_id, step_number, description, modules, calculation_logic, configuration)
-                VALUES (?, ?, ?, ?, ?, ?)
-            """, (
-                new_test_case_id,
-                step['step_number'],
-                step['description'],
-                step.get('modules'),
-                step.get('calculation_logic'),
-                step.get('configuration')
-            ))
-            new_step_id = cursor.lastrowid
+                SELECT COUNT(*) as count FROM test_cases
+                WHERE test_number = ? AND project_id = ?
+            """, (new_test_number, project_id))
+            count = cursor.fetchone()['count']
+            if count > 0:
+                # Generate unique test number by appending a timestamp and counter
+                base_number = new_test_number
+                counter = 1
+                timestamp = int(datetime.now().timestamp())
+                while True:
+                    unique_number = f"{base_number} COPY {timestamp}_{counter}"
+                    cursor.execute("""
+                        SELECT COUNT(*) as count FROM test_cases
+                        WHERE test_number = ? AND project_id = ?
+                    """, (unique_number, project_id))
+                    if cursor.fetchone()['count'] == 0:
+                        new_test_number = unique_number
+                        break
+                    counter += 1
+            
+            # Create new test case
+            cursor.execute("""
+                INSERT INTO test_cases (test_number, description, project_id, updated_at)
+                VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+            """, (new_test_number, original['description'], project_id))
+            new_test_case_id = cursor.lastrowid
+            
+            # Get all steps from original (using same connection)
+            cursor.execute("SELECT * FROM test_steps WHERE test_case_id = ? ORDER BY step_number", (test_case_id,))
+            original_steps = [dict(row) for row in cursor.fetchall()]
             
-            # Duplicate screenshots for this step
-            cursor.execute("SELECT * FROM screenshots WHERE step_id = ?", (step['id'],))
-            screenshots = [dict(row) for row in cursor.fetchall()]
-            for screenshot in screenshots:
+            # Duplicate each step
+            for step in original_steps:
                 cursor.execute("""
-                    INSERT INTO screenshots (step_id, file_path, screenshot_name)
-                    VALUES (?, ?, ?)
+                    INSERT INTO test_steps (test_case_id, step_number, description, modules, calculation_logic,
+                                            configuration, updated_at)
+                    VALUES (?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
                 """, (
-                    new_step_id,
-                    screenshot['file_path'],
-                    screenshot.get('screenshot_name')
+                    new_test_case_id,
+                    step['step_number'],
+                    step['description'],
+                    step.get('modules'),
+                    step.get('calculation_logic'),
+                    step.get('configuration')
                 ))
-        
-        conn.commit()
-        return new_test_case_id
+                new_step_id = cursor.lastrowid
+                
+                # Duplicate screenshots for this step
+                cursor.execute("SELECT * FROM step_screenshots WHERE step_id = ?", (step['id'],))
+                screenshots = [dict(row) for row in cursor.fetchall()]
+                for screenshot in screenshots:
+                    cursor.execute("""
+                        INSERT INTO step_screenshots (step_id, file_path, screenshot_name, updated_at)
+                        VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+                    """, (
+                        new_step_id,
+                        screenshot['file_path'],
+                        screenshot.get('screenshot_name')
+                    ))
+            
+            return new_test_case_id
     except Exception as e:
-        conn.rollback()
         print(f"Error duplicating test case: {e}")
         return None
-    finally:
-        conn.close()
 
 
-def delete_test_case(test_case_id: int) -> bool:
+def delete_test_case(test_case_id: int, conn: Optional[sqlite3.Connection] = None) -> bool:
     """Delete a test case and all its related steps and screenshots."""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("DELETE FROM test_cases WHERE id = ?", (test_case_id,))
-    success = cursor.rowcount > 0
-    conn.commit()
-    conn.close()
-    return success
+    with _write_cursor(conn) as cursor:
+        cursor.execute("DELETE FROM test_cases WHERE id = ?", (test_case_id,))
+        return cursor.rowcount > 0
 
 
 # Test Step Functions
 def create_test_step(test_case_id: int, step_number: int, description: str,
                      modules: Optional[str] = None,
                      calculation_logic: Optional[str] = None,
-                     configuration: Optional[str] = None) -> int:
+                     configuration: Optional[str] = None,
+                     conn: Optional[sqlite3.Connection] = None) -> int:
     """Create a new test step and return its ID."""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("""
-        INSERT INTO test_steps (test_case_id, step_number, description, 
-                               modules, calculation_logic, configuration)
-        VALUES (?, ?, ?, ?, ?, ?)
-    """, (test_case_id, step_number, description, modules, calculation_logic, configuration))
-    step_id = cursor.lastrowid
-    conn.commit()
-    conn.close()
-    return step_id
+    with _write_cursor(conn) as cursor:
+        cursor.execute("""
+            INSERT INTO test_steps (test_case_id, step_number, description,
+                                   modules, calculation_logic, configuration, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+        """, (test_case_id, step_number, description, modules, calculation_logic, configuration))
+        return cursor.lastrowid
 
 
-def get_steps_by_test_case(test_case_id: int) -> List[Dict]:
+def get_steps_by_test_case(test_case_id: int, conn: Optional[sqlite3.Connection] = None) -> List[Dict]:
     """Get all steps for a test case, ordered by step number."""
-    conn = get_db_connection()
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
-    cursor.execute("""
-        SELECT * FROM test_steps
-        WHERE test_case_id = ?
-        ORDER BY step_number
-    """, (test_case_id,))
-    rows = cursor.fetchall()
-    conn.close()
+    with _read_cursor(conn) as cursor:
+        cursor.execute("""
+            SELECT * FROM test_steps
+            WHERE test_case_id = ?
+            ORDER BY step_number
+        """, (test_case_id,))
+        rows = cursor.fetchall()
     return [dict(row) for row in rows]
 
 
-def get_step_by_id(step_id: int) -> Optional[Dict]:
+def get_step_by_id(step_id: int, conn: Optional[sqlite3.Connection] = None) -> Optional[Dict]:
     """Get a step by ID."""
-    conn = get_db_connection()
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM test_steps WHERE id = ?", (step_id,))
-    row = cursor.fetchone()
-    conn.close()
+    with _read_cursor(conn) as cursor:
+        cursor.execute("SELECT * FROM test_steps WHERE id = ?", (step_id,))
+        row = cursor.fetchone()
     return dict(row) if row else None
 
 
 def update_test_step(step_id: int, step_number: int, description: str,
                     modules: Optional[str] = None,
                     calculation_logic: Optional[str] = None,
-                    configuration: Optional[str] = None) -> bool:
+                    configuration: Optional[str] = None,
+                    conn: Optional[sqlite3.Connection] = None) -> bool:
     """Update an existing test step."""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("""
-        UPDATE test_steps
-        SET step_number = ?, description = ?, modules = ?,
-            calculation_logic = ?, configuration = ?
-        WHERE id = ?
-    """, (step_number, description, modules, calculation_logic, configuration, step_id))
-    success = cursor.rowcount > 0
-    conn.commit()
-    conn.close()
-    return success
+    with _write_cursor(conn) as cursor:
+        cursor.execute("""
+            UPDATE test_steps
+            SET step_number = ?, description = ?, modules = ?,
+                calculation_logic = ?, configuration = ?, updated_at = CURRENT_TIMESTAMP
+            WHERE id = ?
+        """, (step_number, description, modules, calculation_logic, configuration, step_id))
+        return cursor.rowcount > 0
 
 
-def delete_test_step(step_id: int) -> bool:
+def delete_test_step(step_id: int, conn: Optional[sqlite3.Connection] = None) -> bool:
     """Delete a test step and all its screenshots."""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("DELETE FROM test_steps WHERE id = ?", (step_id,))
-    success = cursor.rowcount > 0
-    conn.commit()
-    conn.close()
-    return success
+    with _write_cursor(conn) as cursor:
+        # The step row disappears, so record the change on its test case
+        cursor.execute("""
+            UPDATE test_cases
+            SET updated_at = CURRENT_TIMESTAMP
+            WHERE id = (SELECT test_case_id FROM test_steps WHERE id = ?)
+        """, (step_id,))
+        cursor.execute("DELETE FROM test_steps WHERE id = ?", (step_id,))
+        return cursor.rowcount > 0
 
 
-def swap_step_numbers(test_case_id: int, step_id_1: int, step_id_2: int) -> bool:
+def swap_step_numbers(test_case_id: int, step_id_1: int, step_id_2: int,
+                      conn: Optional[sqlite3.Connection] = None) -> bool:
     """Swap the step numbers of two steps within the same test case."""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    # Get current step numbers
-    cursor.execute("SELECT step_number FROM test_steps WHERE id = ?", (step_id_1,))
-    step_1 = cursor.fetchone()
-    cursor.execute("SELECT step_number FROM test_steps WHERE id = ?", (step_id_2,))
-    step_2 = cursor.fetchone()
-    
-    if not step_1 or not step_2:
-        conn.close()
-        return False
-    
-    step_num_1 = step_1[0]
-    step_num_2 = step_2[0]
-    
-    # Use a temporary value to avoid unique constraint violation
-    temp_step_num = 99999
-    
     try:
-        # Set first step to temporary number
-        cursor.execute("""
-            UPDATE test_steps
-            SET step_number = ?
-            WHERE id = ?
-        """, (temp_step_num, step_id_1))
-        
-        # Set second step to first step's number
-        cursor.execute("""
-            UPDATE test_steps
-            SET step_number = ?
-            WHERE id = ?
-        """, (step_num_1, step_id_2))
-        
-        # Set first step to second step's number
-        cursor.execute("""
-            UPDATE test_steps
-            SET step_number = ?
-            WHERE id = ?
-        """, (step_num_2, step_id_1))
-        
-        conn.commit()
-        success = True
+        with _write_cursor(conn) as cursor:
+            # Get current step numbers
+            cursor.execute("SELECT step_number FROM test_steps WHERE id = ?", (step_id_1,))
+            step_1 = cursor.fetchone()
+            cursor.execute("SELECT step_number FROM test_steps WHERE id = ?", (step_id_2,))
+            step_2 = cursor.fetchone()
+            
+            if not step_1 or not step_2:
+                return False
+            
+            step_num_1 = step_1[0]
+            step_num_2 = step_2[0]
+            
+            # Use a temporary value to avoid unique constraint violation
+            temp_step_num = 99999
+            
+            # Set first step to temporary number
+            cursor.execute("""
+                UPDATE test_steps
+                SET step_number = ?, updated_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+            """, (temp_step_num, step_id_1))
+            
+            # Set second step to first step's number
+            cursor.execute("""
+                UPDATE test_steps
+                SET step_number = ?, updated_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+            """, (step_num_1, step_id_2))
+            
+            # Set first step to second step's number
+            cursor.execute("""
+                UPDATE test_steps
+                SET step_number = ?, updated_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+            """, (step_num_2, step_id_1))
+        return True
     except Exception as e:
-        conn.rollback()
-        success = False
-    finally:
-        conn.close()
-    
-    return success
+        return False
 
 
-def reorder_steps(test_case_id: int, step_order: List[int]) -> bool:
+def reorder_steps(test_case_id: int, step_order: List[int], conn: Optional[sqlite3.Connection] = None) -> bool:
     """
     Reorder steps by providing a list of step IDs in the desired order.
     Step numbers will be reassigned sequentially starting from 1.
@@ -586,214 +651,466 @@ def reorder_steps(test_case_id: int, step_order: List[int]) -> bool:
     Args:
         test_case_id: The test case ID
         step_order: List of step IDs in the desired order
+        conn: Optional connection to run on (see _write_cursor)
     
     Returns:
         True if successful, False otherwise
     """
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
     try:
-        # First, set all step numbers to temporary values to avoid unique constraint
-        temp_start = 10000
-        for idx, step_id in enumerate(step_order):
-            cursor.execute("""
-                UPDATE test_steps
-                SET step_number = ?
-                WHERE id = ? AND test_case_id = ?
-            """, (temp_start + idx, step_id, test_case_id))
-        
-        # Now assign the correct sequential numbers
-        for idx, step_id in enumerate(step_order, start=1):
-            cursor.execute("""
-                UPDATE test_steps
-                SET step_number = ?
-                WHERE id = ? AND test_case_id = ?
-            """, (idx, step_id, test_case_id))
-        
-        conn.commit()
-        success = True
+        with _write_cursor(conn) as cursor:
+            # First, set all step numbers to temporary values to avoid unique constraint
+            temp_start = 10000
+            for idx, step_id in enumerate(step_order):
+                cursor.execute("""
+                    UPDATE test_steps
+                    SET step_number = ?, updated_at = CURRENT_TIMESTAMP
+                    WHERE id = ? AND test_case_id = ?
+                """, (temp_start + idx, step_id, test_case_id))
+            
+            # Now assign the correct sequential numbers
+            for idx, step_id in enumerate(step_order, start=1):
+                cursor.execute("""
+                    UPDATE test_steps
+                    SET step_number = ?, updated_at = CURRENT_TIMESTAMP
+                    WHERE id = ? AND test_case_id = ?
+                """, (idx, step_id, test_case_id))
+        return True
     except Exception as e:
-        conn.rollback()
-        success = False
-    finally:
-        conn.close()
-    
-    return success
+        return False
 
 
 # Screenshot Functions
-def add_screenshot_to_step(step_id: int, file_path: str, screenshot_name: Optional[str] = None) -> int:
+def add_screenshot_to_step(step_id: int, file_path: str, screenshot_name: Optional[str] = None,
+                           conn: Optional[sqlite3.Connection] = None) -> int:
     """Add a screenshot to a step and return the screenshot ID."""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("""
-        INSERT INTO step_screenshots (step_id, file_path, screenshot_name)
-        VALUES (?, ?, ?)
-    """, (step_id, file_path, screenshot_name))
-    screenshot_id = cursor.lastrowid
-    conn.commit()
-    conn.close()
-    return screenshot_id
+    with _write_cursor(conn) as cursor:
+        cursor.execute("""
+            INSERT INTO step_screenshots (step_id, file_path, screenshot_name, updated_at)
+            VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+        """, (step_id, file_path, screenshot_name))
+        return cursor.lastrowid
+
+
+def add_screenshots_to_step(step_id: int, file_paths: List[str],
+                            conn: Optional[sqlite3.Connection] = None) -> List[Dict]:
+    """
+    Add several screenshots to a step in one transaction.
+    
+    Returns:
+        The created screenshot records, in the order of file_paths
+    """
+    with _write_cursor(conn) as cursor:
+        screenshot_ids = []
+        for file_path in file_paths:
+            cursor.execute("""
+                INSERT INTO step_screenshots (step_id, file_path, updated_at)
+                VALUES (?, ?, CURRENT_TIMESTAMP)
+            """, (step_id, file_path))
+            screenshot_ids.append(cursor.lastrowid)
+        placeholders = ",".join("?" * len(screenshot_ids))
+        cursor.execute(f"SELECT * FROM step_screenshots WHERE id IN ({placeholders}) ORDER BY id",
+                       screenshot_ids)
+        return [dict(row) for row in cursor.fetchall()]
 
 
-def get_screenshots_by_step(step_id: int) -> List[Dict]:
+def create_steps_with_screenshots(steps: List[Dict], conn: Optional[sqlite3.Connection] = None) -> List[Dict]:
+    """
+    Create several steps, each with its screenshots, in one transaction.
+    
+    Steps are appended to their test case in list order (step numbers follow
+    the test case's current last step).
+    
+    Args:
+        steps: Dicts with test_case_id, description and file_paths
+        conn: Optional connection to run on (see _write_cursor)
+    
+    Returns:
+        The created steps ({id, test_case_id, step_number}), in the order of steps
+    """
+    with _write_cursor(conn) as cursor:
+        next_numbers = {}
+        created = []
+        for step in steps:
+            test_case_id = step['test_case_id']
+            if test_case_id not in next_numbers:
+                cursor.execute("SELECT COALESCE(MAX(step_number), 0) FROM test_steps WHERE test_case_id = ?",
+                               (test_case_id,))
+                next_numbers[test_case_id] = cursor.fetchone()[0] + 1
+            step_number = next_numbers[test_case_id]
+            next_numbers[test_case_id] += 1
+            
+            cursor.execute("""
+                INSERT INTO test_steps (test_case_id, step_number, description, updated_at)
+                VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+            """, (test_case_id, step_number, step['description']))
+            step_id = cursor.lastrowid
+            cursor.executemany("""
+                INSERT INTO step_screenshots (step_id, file_path, updated_at)
+                VALUES (?, ?, CURRENT_TIMESTAMP)
+            """, [(step_id, file_path) for file_path in step['file_paths']])
+            created.append({"id": step_id, "test_case_id": test_case_id, "step_number": step_number})
+        return created
+
+
+def get_screenshots_by_step(step_id: int, conn: Optional[sqlite3.Connection] = None) -> List[Dict]:
     """Get all screenshots for a step."""
-    conn = get_db_connection()
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
-    cursor.execute("""
-        SELECT * FROM step_screenshots
-        WHERE step_id = ?
-        ORDER BY uploaded_at
-    """, (step_id,))
-    rows = cursor.fetchall()
-    conn.close()
+    with _read_cursor(conn) as cursor:
+        cursor.execute("""
+            SELECT * FROM step_screenshots
+            WHERE step_id = ?
+            ORDER BY uploaded_at, id
+        """, (step_id,))
+        rows = cursor.fetchall()
     return [dict(row) for row in rows]
 
 
-def update_screenshot_name(screenshot_id: int, screenshot_name: Optional[str]) -> bool:
+def get_screenshot_files_by_test_case(test_case_id: int, conn: Optional[sqlite3.Connection] = None) -> List[str]:
+    """Get the file paths of all screenshots of a test case's steps."""
+    with _read_cursor(conn) as cursor:
+        cursor.execute("""
+            SELECT DISTINCT ss.file_path FROM step_screenshots ss
+            JOIN test_steps ts ON ts.id = ss.step_id
+            WHERE ts.test_case_id = ?
+        """, (test_case_id,))
+        return [row[0] for row in cursor.fetchall()]
+
+
+def get_screenshot_by_id(screenshot_id: int, conn: Optional[sqlite3.Connection] = None) -> Optional[Dict]:
+    """Get a screenshot by ID."""
+    with _read_cursor(conn) as cursor:
+        cursor.execute("SELECT * FROM step_screenshots WHERE id = ?", (screenshot_id,))
+        row = cursor.fetchone()
+    return dict(row) if row else None
+
+
+def count_screenshots_using_file(file_path: str, conn: Optional[sqlite3.Connection] = None) -> int:
+    """
+    Count the screenshot records pointing at file_path.
+    
+    Files can be shared between records (content-addressed Excel imports,
+    duplicated test cases), so a file may only be removed when this is 0.
+    """
+    with _read_cursor(conn) as cursor:
+        cursor.execute("SELECT COUNT(*) FROM step_screenshots WHERE file_path = ?", (file_path,))
+        return cursor.fetchone()[0]
+
+
+def update_screenshot_name(screenshot_id: int, screenshot_name: Optional[str],
+                           conn: Optional[sqlite3.Connection] = None) -> bool:
     """Update the name of a screenshot."""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("""
-        UPDATE step_screenshots
-        SET screenshot_name = ?
-        WHERE id = ?
-    """, (screenshot_name, screenshot_id))
-    success = cursor.rowcount > 0
-    conn.commit()
-    conn.close()
-    return success
+    with _write_cursor(conn) as cursor:
+        cursor.execute("""
+            UPDATE step_screenshots
+            SET screenshot_name = ?, updated_at = CURRENT_TIMESTAMP
+            WHERE id = ?
+        """, (screenshot_name, screenshot_id))
+        return cursor.rowcount > 0
 
 
-def delete_screenshot(screenshot_id: int) -> bool:
+def delete_screenshot(screenshot_id: int, conn: Optional[sqlite3.Connection] = None) -> bool:
     """Delete a screenshot record."""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("DELETE FROM step_screenshots WHERE id = ?", (screenshot_id,))
-    success = cursor.rowcount > 0
-    conn.commit()
-    conn.close()
-    return success
+    with _write_cursor(conn) as cursor:
+        # The screenshot row disappears, so record the change on its step
+        cursor.execute("""
+            UPDATE test_steps
+            SET updated_at = CURRENT_TIMESTAMP
+            WHERE id = (SELECT step_id FROM step_screenshots WHERE id = ?)
+        """, (screenshot_id,))
+        cursor.execute("DELETE FROM step_screenshots WHERE id = ?", (screenshot_id,))
+        return cursor.rowcount > 0
 
 
 # Project Functions
-def create_project(name: str, description: Optional[str] = None) -> int:
+def create_project(name: str, description: Optional[str] = None, conn: Optional[sqlite3.Connection] = None) -> int:
     """Create a new project and return its ID."""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("""
-        INSERT INTO projects (name, description, updated_at)
-        VALUES (?, ?, CURRENT_TIMESTAMP)
-    """, (name, description))
-    project_id = cursor.lastrowid
-    conn.commit()
-    conn.close()
-    return project_id
+    with _write_cursor(conn) as cursor:
+        cursor.execute("""
+            INSERT INTO projects (name, description, updated_at)
+            VALUES (?, ?, CURRENT_TIMESTAMP)
+        """, (name, description))
+        return cursor.lastrowid
 
 
-def get_all_projects() -> List[Dict]:
+def get_all_projects(conn: Optional[sqlite3.Connection] = None) -> List[Dict]:
     """Get all projects with test case counts."""
-    conn = get_db_connection()
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
-    cursor.execute("""
-        SELECT p.*, 
-               COUNT(tc.id) as test_case_count
-        FROM projects p
-        LEFT JOIN test_cases tc ON p.id = tc.project_id
-        GROUP BY p.id
-        ORDER BY p.created_at DESC
-    """)
-    rows = cursor.fetchall()
-    conn.close()
+    with _read_cursor(conn) as cursor:
+        cursor.execute("""
+            SELECT p.*,
+                   COUNT(tc.id) as test_case_count
+            FROM projects p
+            LEFT JOIN test_cases tc ON p.id = tc.project_id
+            GROUP BY p.id
+            ORDER BY p.created_at DESC
+        """)
+        rows = cursor.fetchall()
     return [dict(row) for row in rows]
 
 
-def get_project_by_id(project_id: int) -> Optional[Dict]:
+def get_project_by_id(project_id: int, conn: Optional[sqlite3.Connection] = None) -> Optional[Dict]:
     """Get a project by ID with test case count."""
-    conn = get_db_connection()
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
-    cursor.execute("""
-        SELECT p.*, 
-               COUNT(tc.id) as test_case_count
-        FROM projects p
-        LEFT JOIN test_cases tc ON p.id = tc.project_id
-        WHERE p.id = ?
-        GROUP BY p.id
-    """, (project_id,))
-    row = cursor.fetchone()
-    conn.close()
+    with _read_cursor(conn) as cursor:
+        cursor.execute("""
+            SELECT p.*,
+                   COUNT(tc.id) as test_case_count
+            FROM projects p
+            LEFT JOIN test_cases tc ON p.id = tc.project_id
+            WHERE p.id = ?
+            GROUP BY p.id
+        """, (project_id,))
+        row = cursor.fetchone()
     return dict(row) if row else None
 
 
-def update_project(project_id: int, name: str, description: Optional[str] = None) -> bool:
+def update_project(project_id: int, name: str, description: Optional[str] = None,
+                   conn: Optional[sqlite3.Connection] = None) -> bool:
     """Update an existing project."""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("""
-        UPDATE projects
-        SET name = ?, description = ?, updated_at = CURRENT_TIMESTAMP
-        WHERE id = ?
-    """, (name, description, project_id))
-    success = cursor.rowcount > 0
-    conn.commit()
-    conn.close()
-    return success
+    with _write_cursor(conn) as cursor:
+        cursor.execute("""
+            UPDATE projects
+            SET name = ?, description = ?, updated_at = CURRENT_TIMESTAMP
+            WHERE id = ?
+        """, (name, description, project_id))
+        return cursor.rowcount > 0
 
 
-def delete_project(project_id: int, move_to_project_id: Optional[int] = None) -> bool:
+def delete_project(project_id: int, move_to_project_id: Optional[int] = None,
+                   conn: Optional[sqlite3.Connection] = None) -> bool:
     """
     Delete a project. If move_to_project_id is provided, move test cases to that project.
     Otherwise, set test cases' project_id to NULL (they will be assigned to default project on next init).
     """
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
     try:
-        if move_to_project_id:
-            # Move test cases to another project
+        with _write_cursor(conn) as cursor:
+            if move_to_project_id:
+                # Move test cases to another project
+                cursor.execute("""
+                    UPDATE test_cases
+                    SET project_id = ?, updated_at = CURRENT_TIMESTAMP
+                    WHERE project_id = ?
+                """, (move_to_project_id, project_id))
+            else:
+                # Set project_id to NULL (will be handled by migration)
+                cursor.execute("""
+                    UPDATE test_cases
+                    SET project_id = NULL, updated_at = CURRENT_TIMESTAMP
+                    WHERE project_id = ?
+                """, (project_id,))
+            
+            # Delete the project
+            cursor.execute("DELETE FROM projects WHERE id = ?", (project_id,))
+            return cursor.rowcount > 0
+    except Exception as e:
+        return False
+
+
+def get_test_cases_by_project(project_id: int, conn: Optional[sqlite3.Connection] = None) -> List[Dict]:
+    """Get all test cases for a project."""
+    with _read_cursor(conn) as cursor:
+        cursor.execute("""
+            SELECT * FROM test_cases
+            WHERE project_id = ?
+            ORDER BY created_at DESC
+        """, (project_id,))
+        rows = cursor.fetchall()
+    return [dict(row) for row in rows]
+
+
+# Import Functions
+def bulk_import_test_cases(test_cases: List[Dict], conn: Optional[sqlite3.Connection] = None) -> Dict:
+    """
+    Insert test cases with their steps and screenshots in a single transaction.
+    
+    Test cases whose number already exists in their project are skipped
+    (left untouched), so importing the same workbook twice is harmless.
+    
+    Args:
+        test_cases: List of {"test_number", "description", "project_id",
+            "steps": [{"step_number", "description", "modules", "calculation_logic",
+            "configuration", "screenshots": [{"file_path", "screenshot_name"}]}]}
+        conn: Optional connection to run on (see _write_cursor)
+    
+    Returns:
+        Dict with "created" (new test case IDs), "skipped" (test numbers already
+        present), "steps" and "screenshots" (rows inserted)
+    """
+    created = []
+    skipped = []
+    step_count = 0
+    screenshot_count = 0
+    with _write_cursor(conn) as cursor:
+        for test_case in test_cases:
+            project_id = test_case.get('project_id')
             cursor.execute("""
-                UPDATE test_cases
-                SET project_id = ?
-                WHERE project_id = ?
-            """, (move_to_project_id, project_id))
-        else:
-            # Set project_id to NULL (will be handled by migration)
+                SELECT id FROM test_cases
+                WHERE test_number = ? AND project_id IS ?
+            """, (test_case['test_number'], project_id))
+            if cursor.fetchone():
+                skipped.append(test_case['test_number'])
+                continue
+            
             cursor.execute("""
-                UPDATE test_cases
-                SET project_id = NULL
-                WHERE project_id = ?
-            """, (project_id,))
-        
-        # Delete the project
-        cursor.execute("DELETE FROM projects WHERE id = ?", (project_id,))
-        success = cursor.rowcount > 0
-        conn.commit()
-    except Exception as e:
-        conn.rollback()
-        success = False
-    finally:
-        conn.close()
+                INSERT INTO test_cases (test_number, description, project_id, updated_at)
+                VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+            """, (test_case['test_number'], test_case['description'], project_id))
+            test_case_id = cursor.lastrowid
+            created.append(test_case_id)
+            
+            for step in test_case.get('steps', []):
+                cursor.execute("""
+                    INSERT INTO test_steps (test_case_id, step_number, description,
+                                           modules, calculation_logic, configuration, updated_at)
+                    VALUES (?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+                """, (test_case_id, step['step_number'], step['description'], step.get('modules'),
+                      step.get('calculation_logic'), step.get('configuration')))
+                step_id = cursor.lastrowid
+                step_count += 1
+                
+                screenshots = step.get('screenshots', [])
+                cursor.executemany("""
+                    INSERT INTO step_screenshots (step_id, file_path, screenshot_name, updated_at)
+                    VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+                """, [(step_id, shot['file_path'], shot.get('screenshot_name')) for shot in screenshots])
+                screenshot_count += len(screenshots)
     
-    return success
+    return {"created": created, "skipped": skipped, "steps": step_count, "screenshots": screenshot_count}
 
 
-def get_test_cases_by_project(project_id: int) -> List[Dict]:
-    """Get all test cases for a project."""
+def get_or_create_project(name: str, conn: Optional[sqlite3.Connection] = None) -> int:
+    """Return the ID of the project with this name, creating it if needed."""
+    with _read_cursor(conn) as cursor:
+        cursor.execute("SELECT id FROM projects WHERE name = ? ORDER BY id LIMIT 1", (name,))
+        row = cursor.fetchone()
+    if row:
+        return row[0]
+    return create_project(name, "Imported from Excel", conn=conn)
+
+
+# Export Functions
+def to_db_timestamp(value) -> str:
+    """
+    Convert a datetime (or ISO 8601 string) to the format SQLite uses for
+    CURRENT_TIMESTAMP ('YYYY-MM-DD HH:MM:SS', UTC), so it can be compared
+    with the stored timestamps. Naive datetimes are taken as UTC.
+    """
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value.strftime("%Y-%m-%d %H:%M:%S")
+
+
+# (test_case_id, changed_at) for every test case, step or screenshot row changed
+# at or after a timestamp; takes the timestamp three times as parameters
+_CHANGES_SINCE_SQL = """
+    SELECT id AS test_case_id, updated_at AS changed_at
+    FROM test_cases WHERE updated_at >= ?
+    UNION ALL
+    SELECT test_case_id, updated_at
+    FROM test_steps WHERE updated_at >= ?
+    UNION ALL
+    SELECT s.test_case_id, sc.updated_at
+    FROM step_screenshots sc
+    JOIN test_steps s ON s.id = sc.step_id
+    WHERE sc.updated_at >= ?
+"""
+
+
+def get_changed_test_cases(since) -> Dict[int, str]:
+    """
+    Find test cases whose own row, steps or screenshots changed at or after since.
+    
+    Deleting a step or screenshot updates its parent, so deletions count as
+    changes too. Timestamps have one-second resolution; a change in the same
+    second as since is included rather than missed.
+    
+    Args:
+        since: datetime or ISO 8601 string (naive values are UTC)
+    
+    Returns:
+        Dict mapping test case ID to its latest change timestamp (UTC)
+    """
+    since = to_db_timestamp(since)
     conn = get_db_connection()
-    conn.row_factory = sqlite3.Row
     cursor = conn.cursor()
-    cursor.execute("""
-        SELECT * FROM test_cases
-        WHERE project_id = ?
-        ORDER BY created_at DESC
-    """, (project_id,))
+    cursor.execute(f"""
+        SELECT test_case_id, MAX(changed_at)
+        FROM ({_CHANGES_SINCE_SQL})
+        GROUP BY test_case_id
+    """, (since, since, since))
     rows = cursor.fetchall()
     conn.close()
-    return [dict(row) for row in rows]
+    return {test_case_id: changed_at for test_case_id, changed_at in rows}
+
+
+def iter_export_rows(test_case_ids: Optional[List[int]] = None,
+                     project_ids: Optional[List[int]] = None,
+                     batch_size: int = 500,
+                     since=None) -> Iterator[Dict]:
+    """
+    Stream test cases joined with their steps and screenshots, one row at a time.
+    
+    Uses the same selection rules as create_excel_export: project_ids selects
+    every test case of those projects (intersected with test_case_ids when both
+    are given), test_case_ids alone selects those test cases, neither selects all.
+    With since, only test cases changed at or after that time are included
+    (see get_changed_test_cases).
+    
+    Rows are ordered by test case, step number and upload time, so all rows of a
+    test case (and of a step) are contiguous. Test cases without steps and steps
+    without screenshots yield a single row with the missing columns set to None.
+    The cursor is drained in batches, so memory use does not grow with the
+    number of rows.
+    """
+    conditions = []
+    params: List = []
+    if project_ids:
+        conditions.append(f"tc.project_id IN ({', '.join('?' for _ in project_ids)})")
+        params.extend(project_ids)
+    if test_case_ids:
+        conditions.append(f"tc.id IN ({', '.join('?' for _ in test_case_ids)})")
+        params.extend(test_case_ids)
+    if since is not None:
+        conditions.append(f"tc.id IN (SELECT test_case_id FROM ({_CHANGES_SINCE_SQL}))")
+        params.extend([to_db_timestamp(since)] * 3)
+    where_clause = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    
+    conn = get_db_connection(check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    try:
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            SELECT tc.id AS test_case_id,
+                   tc.test_number,
+                   tc.description AS test_case_description,
+                   tc.project_id,
+                   p.name AS project_name,
+                   tc.created_at AS test_case_created_at,
+                   s.id AS step_id,
+                   s.step_number,
+                   s.description AS step_description,
+                   s.modules,
+                   s.calculation_logic,
+                   s.configuration,
+                   s.created_at AS step_created_at,
+                   sc.id AS screenshot_id,
+                   sc.file_path,
+                   sc.screenshot_name,
+                   sc.uploaded_at
+            FROM test_cases tc
+            LEFT JOIN projects p ON p.id = tc.project_id
+            LEFT JOIN test_steps s ON s.test_case_id = tc.id
+            LEFT JOIN step_screenshots sc ON sc.step_id = s.id
+            {where_clause}
+            ORDER BY tc.project_id, tc.created_at DESC, tc.id, s.step_number, sc.uploaded_at, sc.id
+        """, params)
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            for row in rows:
+                yield dict(row)
+    finally:
+        conn.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,139 @@
+"""
+Text Export Module for Test Case Documentation Tool
+
+This module streams test cases, steps and screenshot metadata as JSON Lines
+or CSV. Unlike the Excel export, nothing is built in memory: rows come
+straight from a database cursor and are yielded as text chunks, so the
+output can be sent through a streaming HTTP response.
+"""
+
+import csv
+import io
+import json
+from shared.models import iter_export_rows
+
+
+# Flush the output buffer once it holds this many characters
+CHUNK_SIZE = 64 * 1024
+
+CSV_COLUMNS = [
+    "project_id",
+    "project_name",
+    "test_case_id",
+    "test_number",
+    "test_case_description",
+    "test_case_created_at",
+    "step_id",
+    "step_number",
+    "step_description",
+    "modules",
+    "calculation_logic",
+    "configuration",
+    "step_created_at",
+    "screenshot_id",
+    "screenshot_name",
+    "file_path",
+    "uploaded_at",
+]
+
+
+def iter_jsonl_export(selected_test_case_ids=None, selected_project_ids=None, since=None):
+    """
+    Stream the export as JSON Lines.
+
+    Each line is one record with a "type" of "test_case", "step" or
+    "screenshot". Records follow the document order: a test case, then each
+    of its steps followed by that step's screenshots.
+
+    Args:
+        selected_test_case_ids: Optional list of test case IDs to export. If None, exports all.
+        selected_project_ids: Optional list of project IDs to export.
+        since: Optional datetime; export only test cases changed at or after it
+
+    Yields:
+        str: Chunks of newline-terminated JSON records
+    """
+    buffer = io.StringIO()
+    last_test_case_id = None
+    last_step_id = None
+
+    for row in iter_export_rows(selected_test_case_ids, selected_project_ids, since=since):
+        records = []
+        if row['test_case_id'] != last_test_case_id:
+            last_test_case_id = row['test_case_id']
+            last_step_id = None
+            records.append({
+                "type": "test_case",
+                "id": row['test_case_id'],
+                "test_number": row['test_number'],
+                "description": row['test_case_description'],
+                "project_id": row['project_id'],
+                "project_name": row['project_name'],
+                "created_at": row['test_case_created_at'],
+            })
+        if row['step_id'] is not None and row['step_id'] != last_step_id:
+            last_step_id = row['step_id']
+            records.append({
+                "type": "step",
+                "id": row['step_id'],
+                "test_case_id": row['test_case_id'],
+                "step_number": row['step_number'],
+                "description": row['step_description'],
+                "modules": row['modules'],
+                "calculation_logic": row['calculation_logic'],
+                "configuration": row['configuration'],
+                "created_at": row['step_created_at'],
+            })
+        if row['screenshot_id'] is not None:
+            records.append({
+                "type": "screenshot",
+                "id": row['screenshot_id'],
+                "step_id": row['step_id'],
+                "test_case_id": row['test_case_id'],
+                "screenshot_name": row['screenshot_name'],
+                "file_path": row['file_path'],
+                "uploaded_at": row['uploaded_at'],
+            })
+
+        for record in records:
+            buffer.write(json.dumps(record, ensure_ascii=False))
+            buffer.write("\n")
+
+        if buffer.tell() >= CHUNK_SIZE:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def iter_csv_export(selected_test_case_ids=None, selected_project_ids=None, since=None):
+    """
+    Stream the export as CSV.
+
+    One row per screenshot, with the test case and step columns repeated.
+    Steps without screenshots and test cases without steps still get one
+    row, with the missing columns left empty.
+
+    Args:
+        selected_test_case_ids: Optional list of test case IDs to export. If None, exports all.
+        selected_project_ids: Optional list of project IDs to export.
+        since: Optional datetime; export only test cases changed at or after it
+
+    Yields:
+        str: Chunks of CSV text, starting with the header row
+    """
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=CSV_COLUMNS, extrasaction="ignore")
+    writer.writeheader()
+
+    for row in iter_export_rows(selected_test_case_ids, selected_project_ids, since=since):
+        writer.writerow(row)
+        if buffer.tell() >= CHUNK_SIZE:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue()
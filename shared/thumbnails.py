@@ -0,0 +1,42 @@
+"""
+Image thumbnails shared by the exporters and the backend's thumbnail cache.
+
+write_thumbnail is the one place images are shrunk: the Excel export embeds
+its result, the HTML export stores it in the bundle and the backend caches
+it on disk. Pillow is imported on first use.
+"""
+
+from typing import BinaryIO, Optional
+
+
+def write_thumbnail(source_path: str, out: BinaryIO, width: int, image_format: str = "JPEG",
+                    max_height: Optional[int] = None, **save_options):
+    """
+    Resize an image to fit width x max_height (keeping the aspect ratio) and save it to out.
+
+    JPEG sources are decoded at a reduced scale, and transparent images are
+    flattened onto white when saved as JPEG.
+
+    Args:
+        source_path: Path of the original image
+        out: Writable binary file object
+        width: Largest thumbnail width in pixels
+        image_format: Pillow format name ("JPEG", "WEBP", ...)
+        max_height: Largest thumbnail height (default 8 x width)
+        **save_options: Passed to Image.save (e.g. quality)
+    """
+    from PIL import Image
+
+    max_height = max_height or width * 8
+    with Image.open(source_path) as img:
+        img.draft("RGB", (width, max_height))
+        img.thumbnail((width, max_height), reducing_gap=2.0)
+        if image_format == "JPEG" and img.mode not in ("RGB", "L"):
+            if "A" in img.getbands() or img.mode == "P":
+                img = img.convert("RGBA")
+                background = Image.new("RGB", img.size, "white")
+                background.paste(img, mask=img.getchannel("A"))
+                img = background
+            else:
+                img = img.convert("RGB")
+        img.save(out, format=image_format, **save_options)
@@ -0,0 +1,35 @@
+"""
+ZIP streaming helper for the exporters.
+
+zipfile can write to a non-seekable stream (it then uses data descriptors),
+which lets an export be sent while the archive is still being built.
+"""
+
+import io
+
+
+class ZipStreamSink(io.RawIOBase):
+    """Write-only, non-seekable sink that zipfile writes into and a generator drains."""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        # Nothing to flush: drain() hands the data out. Also keeps a
+        # ZipFile that is garbage collected after an error from raising.
+        pass
+
+    def drain(self):
+        """Yield everything written since the last drain as one chunk (nothing if empty)."""
+        if self._chunks:
+            data = b"".join(self._chunks)
+            self._chunks = []
+            yield data